@@ -0,0 +1,175 @@
+"""
+Columnar answer log for GnanaVana quiz analytics
+
+Every submitted answer is appended as one row to growable NumPy column buffers.
+Scores, difficulty breakdowns and the results page are computed with grouped,
+vectorized pandas aggregations over the log instead of Python loops over quiz results.
+A finished quiz is summarized from the NumPy columns directly, so answering and
+finishing quizzes never load pandas; it is imported on the first aggregation.
+"""
+
+import time
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+# Column name -> NumPy dtype of its buffer
+COLUMNS = {
+    'attempt': np.int32,  # Quiz number within the log
+    'position': np.int16,  # Question number within the quiz
+    'question_id': object,
+    'subtopic_id': object,
+    'subtopic_name': object,
+    'difficulty': object,
+    'tags': object,  # Tuple of tag strings
+    'chosen_option': np.int8,  # As displayed
+    'original_option': np.int8,  # In the quiz_data file's order
+    'is_correct': np.bool_,
+    'latency': np.float32,  # Seconds from showing the question to submitting
+    'answered_at': np.float64  # Unix timestamp
+}
+
+DIFFICULTY_ORDER = ['EASY', 'MEDIUM', 'HARD']
+
+
+class AnswerLog:
+    """Append-only log of answer events stored column by column"""
+    
+    def __init__(self, capacity: int = 64):
+        self._columns: Dict[str, np.ndarray] = {
+            name: np.empty(capacity, dtype=dtype) for name, dtype in COLUMNS.items()
+        }
+        self._size = 0
+        self._next_attempt = 1
+        self._finished_attempts: List[int] = []
+        self._frame: Optional['pd.DataFrame'] = None
+    
+    def __len__(self) -> int:
+        return self._size
+    
+    def __getstate__(self) -> dict:
+        """Pickle only the filled part of each buffer and not the cached DataFrame"""
+        state = dict(self.__dict__)
+        keep = max(self._size, 1)  # An empty buffer could never grow
+        state['_columns'] = {name: column[:keep].copy() for name, column in self._columns.items()}
+        state['_frame'] = None
+        return state
+    
+    def start_attempt(self) -> int:
+        """Reserve the attempt number for a new quiz"""
+        attempt = self._next_attempt
+        self._next_attempt += 1
+        return attempt
+    
+    def finish_attempt(self, attempt: int) -> None:
+        """Mark a quiz as finished; abandoned quizzes still count towards accuracy stats"""
+        self._finished_attempts.append(attempt)
+    
+    def append(self, attempt: int, position: int, question, subtopic_id: str, subtopic_name: str,
+               chosen_option: int, is_correct: bool, latency: float,
+               answered_at: Optional[float] = None) -> None:
+        """Record one answer; `question` is a Question or ShuffledQuestion"""
+        if self._size == len(self._columns['attempt']):
+            self._grow()
+        
+        row = {
+            'attempt': attempt,
+            'position': position,
+            'question_id': question.id,
+            'subtopic_id': subtopic_id,
+            'subtopic_name': subtopic_name,
+            'difficulty': question.difficulty.value,
+            'tags': question.tags,
+            'chosen_option': chosen_option,
+            'original_option': question.original_option_index(chosen_option),
+            'is_correct': is_correct,
+            'latency': latency,
+            'answered_at': answered_at if answered_at is not None else time.time()
+        }
+        for name, value in row.items():
+            self._columns[name][self._size] = value
+        self._size += 1
+        self._frame = None
+    
+    def _grow(self) -> None:
+        """Double every column buffer (amortized O(1) appends)"""
+        for name, column in self._columns.items():
+            grown = np.empty(len(column) * 2, dtype=column.dtype)
+            grown[:self._size] = column[:self._size]
+            self._columns[name] = grown
+    
+    def to_frame(self) -> 'pd.DataFrame':
+        """View of the log as a DataFrame, cached until the next append"""
+        if self._frame is None:
+            import pandas as pd
+            self._frame = pd.DataFrame({
+                name: column[:self._size] for name, column in self._columns.items()
+            })
+        return self._frame
+    
+    def attempt_columns(self, attempt: int) -> Dict[str, np.ndarray]:
+        """All answers of one quiz as NumPy columns, in the order they were given"""
+        selected = self._columns['attempt'][:self._size] == attempt
+        return {name: column[:self._size][selected] for name, column in self._columns.items()}
+    
+    def attempt_summary(self, attempt: int) -> dict:
+        """Score, per-difficulty correct counts and missed question IDs of one quiz"""
+        rows = self.attempt_columns(attempt)
+        is_correct = rows['is_correct']
+        correct_difficulties = rows['difficulty'][is_correct]
+        return {
+            'correct': int(is_correct.sum()),
+            'answered': len(is_correct),
+            'difficulty_breakdown': {
+                difficulty: int(np.count_nonzero(correct_difficulties == difficulty))
+                for difficulty in DIFFICULTY_ORDER
+            },
+            'incorrect_question_ids': rows['question_id'][~is_correct].tolist()
+        }
+    
+    def attempt_scores(self) -> 'pd.DataFrame':
+        """One row per finished quiz: correct answers, questions answered, percentage and finish time"""
+        frame = self.to_frame()
+        frame = frame[frame['attempt'].isin(self._finished_attempts)]
+        scores = frame.groupby('attempt', sort=True).agg(
+            correct=('is_correct', 'sum'),
+            answered=('is_correct', 'size'),
+            finished_at=('answered_at', 'max')
+        )
+        scores['percentage'] = scores['correct'] / scores['answered'] * 100
+        return scores
+    
+    def accuracy_by(self, column: str) -> 'pd.DataFrame':
+        """Answers, correct answers and accuracy (%) grouped by a log column"""
+        return self._accuracy(self.to_frame(), column)
+    
+    def accuracy_by_difficulty(self) -> 'pd.DataFrame':
+        """Accuracy per difficulty, ordered EASY, MEDIUM, HARD"""
+        accuracy = self.accuracy_by('difficulty')
+        return accuracy.reindex([d for d in DIFFICULTY_ORDER if d in accuracy.index])
+    
+    def accuracy_by_tag(self, top: Optional[int] = None) -> 'pd.DataFrame':
+        """Accuracy per tag; a question counts once for each of its tags"""
+        frame = self.to_frame()[['tags', 'is_correct']].explode('tags').dropna(subset=['tags'])
+        accuracy = self._accuracy(frame.rename(columns={'tags': 'tag'}), 'tag')
+        accuracy = accuracy.sort_values('answers', ascending=False)
+        return accuracy.head(top) if top else accuracy
+    
+    def time_series(self, freq: str = 'D') -> 'pd.DataFrame':
+        """Answers, correct answers and accuracy (%) per calendar period"""
+        import pandas as pd
+        frame = self.to_frame()
+        period = pd.to_datetime(frame['answered_at'], unit='s').dt.floor(freq)
+        return self._accuracy(frame.assign(period=period), 'period')
+    
+    @staticmethod
+    def _accuracy(frame: 'pd.DataFrame', column: str) -> 'pd.DataFrame':
+        accuracy = frame.groupby(column, sort=True)['is_correct'].agg(['size', 'sum'])
+        accuracy.columns = ['answers', 'correct']
+        accuracy['accuracy'] = accuracy['correct'] / accuracy['answers'] * 100
+        return accuracy
+
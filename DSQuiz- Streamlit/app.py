@@ -4,17 +4,26 @@ A Streamlit web app for testing and improving your Data Science knowledge
 """
 
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 from typing import Optional
+import io
+import json
+import os
+import random
+import re
 import time
+import uuid
 from datetime import datetime
+from functools import partial
 
-from models import QuizSession, QuizResult, Question
-from quiz_repository import QuizRepository
-import base64
-import os
+from models import QuizSession, QuizResult, Question, QuestionDifficulty, ShuffledQuestion, new_answer_array
+from streamlit_resources import get_shared_attempt_store, get_shared_metrics_server, get_shared_repository
+from quiz_schema import QuizFileError
+from attempt_store import encode_permutation, decode_permutation
+from search_index import SearchFilters
+from question_markup import get_question_markup
+from session_manager import get_learner_session
+import metrics
+from metrics import record_session_memory, span, timed
 
 
 # Page configuration
@@ -26,7 +35,7 @@ st.set_page_config(
 )
 
 # Custom CSS for Twitch Purple theme with dark mode support
-st.markdown("""
+APP_CSS = """
 <style>
     :root {
         --twitch-purple: #9146FF;
@@ -116,7 +125,7 @@ st.markdown("""
     }
     
     /* Logo container styling */
-    .logo-container {
+    .st-key-logo_container {
         display: flex;
         justify-content: center;
         align-items: center;
@@ -127,7 +136,7 @@ st.markdown("""
         border: 1px solid #E1E5E9;
     }
     
-    .logo-container img {
+    .st-key-logo_container img {
         max-width: 100px;
         height: auto;
     }
@@ -209,28 +218,51 @@ st.markdown("""
         margin-bottom: 1rem;
     }
 </style>
-""", unsafe_allow_html=True)
+"""
+
+LOGO_PATH = "GnanaVana just logo.png"  # Keep original logo file name
+LOGO_WIDTH = 100  # Display width in the sidebar, in CSS pixels
 
 
-def get_logo_base64():
-    """Get logo as base64 string for embedding"""
-    logo_path = "GnanaVana just logo.png"  # Keep original logo file name
-    if os.path.exists(logo_path):
-        with open(logo_path, "rb") as f:
-            return base64.b64encode(f.read()).decode()
-    return ""
+@st.cache_resource(show_spinner=False)
+def get_minified_css() -> str:
+    """APP_CSS without comments and redundant whitespace, built once per process"""
+    css = re.sub(r'/\*.*?\*/', '', APP_CSS, flags=re.S)
+    css = re.sub(r'\s+', ' ', css)
+    return re.sub(r'\s*([{}:;,>])\s*', r'\1', css).strip()
+
+
+@st.cache_resource(show_spinner=False)
+def get_logo_image() -> Optional[bytes]:
+    """
+    Logo resized for the sidebar and encoded once per process.
+
+    It is rendered with st.image, so the bytes are served once through Streamlit's media
+    endpoint and reruns only send its URL instead of an inline base64 copy.
+    """
+    if not os.path.exists(LOGO_PATH):
+        return None
+    from PIL import Image  # Only needed the first time the logo is built
+    with Image.open(LOGO_PATH) as image:
+        image.thumbnail((LOGO_WIDTH * 2, LOGO_WIDTH * 2))  # 2x for high-DPI screens
+        buffer = io.BytesIO()
+        image.save(buffer, format='PNG', optimize=True)
+    return buffer.getvalue()
 
 
 def initialize_session_state():
     """Initialize session state variables"""
-    if 'repository' not in st.session_state:
-        st.session_state.repository = QuizRepository()
+    # Active quiz and answer log; compacted by the session manager while the tab is idle
+    get_learner_session()
     
-    if 'current_quiz' not in st.session_state:
-        st.session_state.current_quiz = None
+    if 'user_id' not in st.session_state:
+        # Anonymous learner ID kept in the URL so quiz history survives reloads and restarts
+        if 'learner' not in st.query_params:
+            st.query_params['learner'] = uuid.uuid4().hex
+        st.session_state.user_id = st.query_params['learner']
     
-    if 'quiz_results' not in st.session_state:
-        st.session_state.quiz_results = []
+    if 'last_attempt_id' not in st.session_state:
+        st.session_state.last_attempt_id = None
     
     if 'current_page' not in st.session_state:
         st.session_state.current_page = 'home'
@@ -246,6 +278,12 @@ def initialize_session_state():
     
     if 'quiz_start_time' not in st.session_state:
         st.session_state.quiz_start_time = None
+    
+    if 'current_attempt' not in st.session_state:
+        st.session_state.current_attempt = None
+    
+    if 'question_started_at' not in st.session_state:
+        st.session_state.question_started_at = None
 
 
 def render_compact_header():
@@ -253,17 +291,15 @@ def render_compact_header():
     st.markdown("# GnanaVriksha Quiz", help="Master Data Science Through Interactive Quizzes")
 
 
+@timed("render.sidebar")
 def render_sidebar():
     """Render the sidebar navigation"""
     with st.sidebar:
         # Logo with proper styling
-        logo_b64 = get_logo_base64()
-        if logo_b64:
-            st.markdown("""
-            <div class="logo-container">
-                <img src="data:image/png;base64,{}" alt="GnanaVana Logo">
-            </div>
-            """.format(logo_b64), unsafe_allow_html=True)
+        logo = get_logo_image()
+        if logo:
+            with st.container(key="logo_container"):
+                st.image(logo, width=LOGO_WIDTH)
         
         # Main header in sidebar
         st.markdown("""
@@ -295,24 +331,39 @@ def render_sidebar():
             st.session_state.current_page = 'select_topic'
             st.rerun()
         
+        if st.button("Search", use_container_width=True):
+            st.session_state.current_page = 'search'
+            st.rerun()
+        
         if st.button("Results", use_container_width=True):
             st.session_state.current_page = 'results'
             st.rerun()
         
+        if st.button("Leaderboard", use_container_width=True):
+            st.session_state.current_page = 'leaderboard'
+            st.rerun()
+        
         if st.button("About", use_container_width=True):
             st.session_state.current_page = 'about'
             st.rerun()
         
-        # Show current quiz progress if active
-        if st.session_state.current_quiz:
+        if metrics.ENABLED and st.button("Metrics", use_container_width=True):
+            st.session_state.current_page = 'metrics'
+            st.rerun()
+        
+        # Show current quiz progress if active; the quiz page shows it in its own fragment,
+        # which reruns without the sidebar
+        quiz = get_learner_session().current_quiz
+        if quiz and st.session_state.current_page != 'quiz':
             st.markdown("---")
             st.markdown("### Quiz Progress")
-            progress = (st.session_state.current_quiz.current_question_index + 1) / st.session_state.current_quiz.total_questions
+            progress = (quiz.current_question_index + 1) / quiz.total_questions
             st.progress(progress)
-            st.write(f"Question {st.session_state.current_quiz.current_question_index + 1} of {st.session_state.current_quiz.total_questions}")
-            st.write(f"Score: {st.session_state.current_quiz.correct_answers}/{st.session_state.current_quiz.current_question_index}")
+            st.write(f"Question {quiz.current_question_index + 1} of {quiz.total_questions}")
+            st.write(f"Score: {quiz.correct_answers}/{quiz.current_question_index}")
 
 
+@timed("render.home")
 def render_home_page():
     """Render the home page"""
     col1, col2, col3 = st.columns(3)
@@ -373,12 +424,13 @@ def render_home_page():
         st.rerun()
 
 
+@timed("render.select_topic")
 def render_topic_selection():
     """Render the topic selection page"""
     st.markdown("## Select Your Quiz Topic")
     
     # Load fields
-    fields = st.session_state.repository.get_all_fields()
+    fields = get_shared_repository().get_all_fields()
     
     if not fields:
         st.error("No quiz data found. Please check the quiz_data directory.")
@@ -420,6 +472,36 @@ def render_topic_selection():
             
             with col2:
                 shuffle_questions = st.checkbox("Shuffle Questions", value=True)
+                adaptive = st.checkbox(
+                    "Adaptive Selection", value=False,
+                    help="Review questions that are due again first, then new questions matched to your level"
+                )
+            
+            # Mixed quiz across several subtopics
+            with st.expander("Mixed Quiz"):
+                scope = st.radio("Draw questions from", ["This topic", "Whole field", "Selected subtopics"], horizontal=True)
+                field_subtopics = [s for t in selected_field.topics for s in t.subtopics]
+                if scope == "This topic":
+                    mixed_subtopics = selected_topic.subtopics
+                elif scope == "Whole field":
+                    mixed_subtopics = field_subtopics
+                else:
+                    chosen = st.multiselect(
+                        "Subtopics", range(len(field_subtopics)),
+                        format_func=lambda i: field_subtopics[i].name
+                    )
+                    mixed_subtopics = [field_subtopics[i] for i in chosen]
+                
+                equal_weights = st.radio(
+                    "Subtopic weighting", ["By number of questions", "Equal"], horizontal=True
+                ) == "Equal"
+                st.caption("Questions are spread across subtopics and difficulty levels in proportion to the weighting.")
+                
+                if st.button("Start Mixed Quiz", type="primary", disabled=not mixed_subtopics):
+                    mixed_topic = selected_topic if scope == "This topic" else None
+                    start_mixed_quiz(selected_field, mixed_topic, mixed_subtopics, num_questions,
+                                     shuffle_questions, equal_weights)
+                    return
             
             st.markdown("---")
             
@@ -438,62 +520,123 @@ def render_topic_selection():
                     
                     with col3:
                         if st.button(f"Start Quiz", key=f"quiz_{i}", type="primary"):
-                            start_quiz(selected_field, selected_topic, subtopic, num_questions, shuffle_questions)
+                            start_quiz(selected_field, selected_topic, subtopic, num_questions, shuffle_questions, adaptive)
                             return
                 
                 st.markdown("---")
 
 
-def start_quiz(field, topic, subtopic, num_questions=20, shuffle_questions=True):
+def start_quiz(field, topic, subtopic, num_questions=20, shuffle_questions=True, adaptive=False):
     """Start a new quiz"""
-    questions = st.session_state.repository.get_questions_for_subtopic(
-        field.id, topic.id, subtopic.id, shuffle=shuffle_questions, limit=num_questions
+    seed = random.randrange(2 ** 32)
+    repository = get_shared_repository()
+    select = None
+    if adaptive:
+        # Imported on first use: plain quizzes never need the selector or the answer history
+        from question_selector import select_adaptive_questions
+        # The file get_questions_for_subtopic() will draw from, for the learner's history
+        quiz_subtopic = repository.get_subtopic_by_id(field.id, topic.id, subtopic.id) or subtopic
+        select = partial(select_adaptive_questions, user_id=st.session_state.user_id,
+                         file_name=quiz_subtopic.file_name, seed=seed)
+    questions = repository.get_questions_for_subtopic(
+        field.id, topic.id, subtopic.id, shuffle=shuffle_questions, limit=num_questions, seed=seed,
+        select=select
     )
     
     if not questions:
         st.error("No questions found for this subtopic.")
         return
     
-    # Clean up any existing quiz session state
-    keys_to_remove = [key for key in st.session_state.keys() if key.startswith(('answer_submitted_', 'user_answer_', 'is_correct_'))]
-    for key in keys_to_remove:
-        del st.session_state[key]
-    
-    # Create quiz session
-    st.session_state.current_quiz = QuizSession(
+    begin_quiz(QuizSession(
         field_id=field.id,
         topic_id=topic.id,
         subtopic_id=subtopic.id,
         questions=questions,
         current_question_index=0,
-        user_answers=[None] * len(questions),
+        user_answers=new_answer_array(len(questions)),
         correct_answers=0,
         total_questions=len(questions),
-        is_completed=False
+        is_completed=False,
+        seed=seed
+    ))
+
+
+def start_mixed_quiz(field, topic, subtopics, num_questions=20, shuffle_questions=True, equal_weights=False):
+    """Start a quiz drawing questions from several subtopics; topic is None when they span topics"""
+    seed = random.randrange(2 ** 32)
+    picked = get_shared_repository().get_mixed_questions(
+        subtopics, num_questions, shuffle=shuffle_questions, seed=seed,
+        weights=[1.0] * len(subtopics) if equal_weights else None
     )
     
+    if not picked:
+        st.error("No questions found for these subtopics.")
+        return
+    
+    begin_quiz(QuizSession(
+        field_id=field.id,
+        topic_id=topic.id if topic else '',
+        subtopic_id='',
+        questions=[question for question, _ in picked],
+        current_question_index=0,
+        user_answers=new_answer_array(len(picked)),
+        correct_answers=0,
+        total_questions=len(picked),
+        is_completed=False,
+        seed=seed,
+        question_subtopics=[subtopic for _, subtopic in picked]
+    ))
+
+
+def begin_quiz(quiz):
+    """Make quiz the active session and switch to the quiz page"""
+    session = get_learner_session()
+    session.current_quiz = quiz
     st.session_state.quiz_start_time = datetime.now()
+    st.session_state.current_attempt = session.answer_log.start_attempt()
+    st.session_state.question_started_at = time.time()
     st.session_state.current_page = 'quiz'
     st.rerun()
 
 
+@timed("render.quiz")
 def render_quiz_page():
     """Render the active quiz page"""
-    if not st.session_state.current_quiz:
+    session = get_learner_session()
+    if not session.current_quiz:
+        if session.restore_failed:
+            st.warning("This quiz's questions changed while the tab was idle. Please start a new quiz.")
+            session.restore_failed = False
         st.error("No active quiz found.")
         st.session_state.current_page = 'select_topic'
         st.rerun()
         return
     
-    quiz = st.session_state.current_quiz
+    # Add some top spacing for quiz page
+    st.markdown('<div style="margin-top: 1rem;"></div>', unsafe_allow_html=True)
+    render_question_fragment()
+
+
+@st.fragment
+@timed("render.question_fragment")
+def render_question_fragment():
+    """
+    Render the metrics, question and answer region of the quiz page.
+
+    Submitting an answer or moving to the next question reruns only this fragment, not
+    the sidebar, styles and page chrome; their callbacks update the quiz before that
+    rerun, so each click costs a single run. Finishing the quiz reruns the whole app.
+    """
+    quiz = get_learner_session().current_quiz
+    if not quiz:
+        return
     current_question = quiz.get_current_question()
     
     if not current_question:
         st.error("Invalid question.")
         return
     
-    # Add some top spacing for quiz page
-    st.markdown('<div style="margin-top: 1rem;"></div>', unsafe_allow_html=True)
+    markup = get_question_markup(current_question)
     
     # Compact quiz header with proper spacing
     st.markdown('<div class="quiz-metrics">', unsafe_allow_html=True)
@@ -511,56 +654,43 @@ def render_quiz_page():
     
     # Compact question display
     st.markdown(f"**Question {quiz.current_question_index + 1}** | Difficulty: {current_question.difficulty.value}")
-    st.markdown(f"### {current_question.question}")
+    st.markdown(markup.heading)
     
     # Answer options
     st.markdown("### Select your answer:")
     
-    # Check if answer has been submitted for this question
-    answer_key = f"answer_submitted_{quiz.current_question_index}"
-    if answer_key not in st.session_state:
-        st.session_state[answer_key] = False
-    
-    if not st.session_state[answer_key]:
+    if not quiz.is_answered(quiz.current_question_index):
         # Show form for answer submission
         with st.form(key=f"question_{quiz.current_question_index}"):
-            selected_option = st.radio(
+            st.radio(
                 "Options:",
-                options=range(len(current_question.options)),
-                format_func=lambda x: f"{chr(65 + x)}. {current_question.options[x]}",
+                options=range(len(markup.option_labels)),
+                format_func=markup.option_labels.__getitem__,
                 key=f"option_{quiz.current_question_index}"
             )
             
-            submitted = st.form_submit_button("Submit Answer", type="primary", use_container_width=True)
-            
-            if submitted:
-                # Process answer
-                is_correct = quiz.answer_question(selected_option)
-                st.session_state[answer_key] = True
-                st.session_state[f"user_answer_{quiz.current_question_index}"] = selected_option
-                st.session_state[f"is_correct_{quiz.current_question_index}"] = is_correct
-                st.rerun()
+            st.form_submit_button("Submit Answer", type="primary", use_container_width=True,
+                                  on_click=submit_answer)
     
     else:
         # Show feedback and navigation after answer submission
-        user_answer = st.session_state.get(f"user_answer_{quiz.current_question_index}")
-        is_correct = st.session_state.get(f"is_correct_{quiz.current_question_index}")
+        user_answer = quiz.user_answers[quiz.current_question_index]
+        is_correct = user_answer == current_question.correct_option_index
         
         # Compact feedback display
         col1, col2 = st.columns([3, 1])
         with col1:
             if is_correct:
-                st.success(f"Correct! {chr(65 + user_answer)}. {current_question.options[user_answer]}")
+                st.success(f"Correct! {markup.option_labels[user_answer]}")
             else:
-                st.error(f"Incorrect! Your answer: {chr(65 + user_answer)}. {current_question.options[user_answer]}")
-                st.info(f"Correct: {chr(65 + current_question.correct_option_index)}. {current_question.options[current_question.correct_option_index]}")
+                st.error(f"Incorrect! Your answer: {markup.option_labels[user_answer]}")
+                st.info(f"Correct: {markup.option_labels[current_question.correct_option_index]}")
         
         with col2:
             # Navigation button
             if quiz.current_question_index < quiz.total_questions - 1:
-                if st.button("Next Question", type="primary", use_container_width=True):
-                    quiz.next_question()
-                    st.rerun()
+                st.button("Next Question", type="primary", use_container_width=True,
+                          on_click=next_question)
             else:
                 if st.button("Finish Quiz", type="primary", use_container_width=True):
                     finish_quiz()
@@ -568,22 +698,64 @@ def render_quiz_page():
         
         # Explanation section (expanded by default)
         with st.expander("Explanation", expanded=True):
-            st.markdown(current_question.explanation)
-            
-            # Show option explanations if available
-            if current_question.option_explanations:
-                st.markdown("**Option Explanations:**")
-                for i, explanation in enumerate(current_question.option_explanations):
-                    if explanation:
-                        st.markdown(f"**{chr(65 + i)}.** {explanation}")
+            st.markdown(markup.explanation)
+
 
+def submit_answer():
+    """
+    Form callback: score the selected option before the fragment reruns.
 
+    Callbacks look the quiz up instead of taking it as an argument, so the widget
+    metadata does not keep a compacted session's questions alive.
+    """
+    quiz = get_learner_session().current_quiz
+    if not quiz:
+        return
+    index = quiz.current_question_index
+    if quiz.is_answered(index):
+        return  # Double-click delivered a second submit
+    selected_option = st.session_state[f"option_{index}"]
+    question = quiz.get_current_question()
+    is_correct = quiz.answer_question(selected_option)
+    record_answer(quiz, question, selected_option, is_correct)
+
+
+def next_question():
+    """Button callback: advance to the next question before the fragment reruns"""
+    quiz = get_learner_session().current_quiz
+    if not quiz:
+        return
+    quiz.next_question()
+    st.session_state.question_started_at = time.time()
+
+
+def record_answer(quiz, question, selected_option, is_correct):
+    """Append the submitted answer to the session's answer log"""
+    if quiz.question_subtopics:
+        subtopic = quiz.question_subtopics[quiz.current_question_index]
+    else:
+        subtopic = get_shared_repository().get_subtopic_by_id(quiz.field_id, quiz.topic_id, quiz.subtopic_id)
+    started_at = st.session_state.question_started_at
+    get_learner_session().answer_log.append(
+        attempt=st.session_state.current_attempt,
+        position=quiz.current_question_index,
+        question=question,
+        subtopic_id=subtopic.id if subtopic else quiz.subtopic_id,
+        subtopic_name=subtopic.name if subtopic else "Unknown",
+        chosen_option=selected_option,
+        is_correct=is_correct,
+        latency=time.time() - started_at if started_at else 0.0
+    )
+
+
+@timed("quiz.finish")
 def finish_quiz():
     """Finish the current quiz and show results"""
-    if not st.session_state.current_quiz:
+    session = get_learner_session()
+    quiz = session.current_quiz
+    if not quiz:
         return
     
-    quiz = st.session_state.current_quiz
     quiz.is_completed = True
     
     # Calculate time taken
@@ -593,47 +765,78 @@ def finish_quiz():
         time_taken = str(elapsed).split('.')[0]  # Remove microseconds
     
     # Get topic and subtopic names
-    field = st.session_state.repository.get_field_by_id(quiz.field_id)
-    topic = st.session_state.repository.get_topic_by_id(quiz.field_id, quiz.topic_id)
-    subtopic = st.session_state.repository.get_subtopic_by_id(quiz.field_id, quiz.topic_id, quiz.subtopic_id)
-    
-    # Calculate difficulty breakdown
-    difficulty_breakdown = {'EASY': 0, 'MEDIUM': 0, 'HARD': 0}
-    incorrect_questions = []
+    repository = get_shared_repository()
+    field = repository.get_field_by_id(quiz.field_id)
+    topic = repository.get_topic_by_id(quiz.field_id, quiz.topic_id)
+    subtopic = repository.get_subtopic_by_id(quiz.field_id, quiz.topic_id, quiz.subtopic_id)
+    if quiz.question_subtopics:
+        subtopic_name = f"Mixed ({len({s.file_name for s in quiz.question_subtopics})} subtopics)"
+        topic_name = topic.name if topic else "All Topics"
+    else:
+        subtopic_name = subtopic.name if subtopic else "Unknown"
+        topic_name = topic.name if topic else "Unknown"
     
-    for i, question in enumerate(quiz.questions):
-        if quiz.user_answers[i] != question.correct_option_index:
-            incorrect_questions.append(question)
-        else:
-            difficulty_breakdown[question.difficulty.value] += 1
+    # Score and difficulty breakdown from the answer log
+    answer_log = session.answer_log
+    answer_log.finish_attempt(st.session_state.current_attempt)
+    summary = answer_log.attempt_summary(st.session_state.current_attempt)
     
     # Create result
     result = QuizResult(
         field_name=field.name if field else "Unknown",
-        topic_name=topic.name if topic else "Unknown",
-        subtopic_name=subtopic.name if subtopic else "Unknown",
+        topic_name=topic_name,
+        subtopic_name=subtopic_name,
         score=quiz.correct_answers,
         total_questions=quiz.total_questions,
         percentage=quiz.get_score_percentage(),
         time_taken=time_taken,
-        difficulty_breakdown=difficulty_breakdown,
-        incorrect_questions=incorrect_questions
+        difficulty_breakdown=summary['difficulty_breakdown'],
+        incorrect_question_ids=summary['incorrect_question_ids']
     )
     
-    # Save result
-    st.session_state.quiz_results.append(result)
-    st.session_state.current_quiz = None
+    # Save result and its answers in one batch; questions are stored by file and position
+    if quiz.question_subtopics:
+        question_files = [s.file_name for s in quiz.question_subtopics]
+    else:
+        question_files = [subtopic.file_name if subtopic else None] * len(quiz.questions)
+    rows = answer_log.attempt_columns(st.session_state.current_attempt)
+    answers = []
+    for position, question_id, chosen, original, is_correct, latency in zip(
+        rows['position'].tolist(), rows['question_id'].tolist(), rows['chosen_option'].tolist(),
+        rows['original_option'].tolist(), rows['is_correct'].tolist(), rows['latency'].tolist()
+    ):
+        file_name = question_files[position]
+        answers.append((
+            position, question_id, file_name,
+            repository.question_index(file_name, question_id) if file_name else None,
+            encode_permutation(getattr(quiz.questions[position], 'permutation', None)),
+            chosen, original, is_correct, latency
+        ))
+    st.session_state.last_attempt_id = get_shared_attempt_store().save_attempt(
+        user_id=st.session_state.user_id,
+        field_id=quiz.field_id,
+        topic_id=quiz.topic_id,
+        subtopic_id=quiz.subtopic_id,
+        result=result,
+        answers=answers,
+        finished_at=time.time(),
+        seed=quiz.seed
+    )
+    session.current_quiz = None
     st.session_state.current_page = 'quiz_result'
 
 
+@timed("render.quiz_result")
 def render_quiz_result():
     """Render quiz results page"""
-    if not st.session_state.quiz_results:
+    import charts  # Loads pandas and Plotly on the first visit to a results page
+    
+    store = get_shared_attempt_store()
+    result = store.get_attempt(st.session_state.last_attempt_id) if st.session_state.last_attempt_id else None
+    if not result:
         st.error("No quiz results found.")
         return
     
-    result = st.session_state.quiz_results[-1]  # Latest result
-    
     st.markdown("## Quiz Completed!")
     
     # Score overview
@@ -653,30 +856,8 @@ def render_quiz_result():
         st.metric("Grade", grade)
     
     # Performance visualization
-    fig = go.Figure(go.Indicator(
-        mode = "gauge+number+delta",
-        value = result.percentage,
-        domain = {'x': [0, 1], 'y': [0, 1]},
-        title = {'text': "Quiz Performance"},
-        delta = {'reference': 70},
-        gauge = {
-            'axis': {'range': [None, 100]},
-            'bar': {'color': "#9146FF"},
-            'steps': [
-                {'range': [0, 50], 'color': "#FFCCCB"},
-                {'range': [50, 80], 'color': "#FFFFCC"},
-                {'range': [80, 100], 'color': "#90EE90"}
-            ],
-            'threshold': {
-                'line': {'color': "red", 'width': 4},
-                'thickness': 0.75,
-                'value': 90
-            }
-        }
-    ))
-    
-    fig.update_layout(height=300)
-    st.plotly_chart(fig, use_container_width=True)
+    with span("chart.score_gauge"):
+        st.plotly_chart(charts.score_gauge(result.percentage), use_container_width=True)
     
     # Quiz details
     st.markdown(f"""
@@ -692,18 +873,27 @@ def render_quiz_result():
     
     # Difficulty breakdown
     if result.difficulty_breakdown:
-        df_difficulty = pd.DataFrame.from_dict(result.difficulty_breakdown, orient='index', columns=['Correct'])
-        df_difficulty.index.name = 'Difficulty'
-        
-        fig = px.bar(df_difficulty, y=df_difficulty.index, x='Correct', 
-                     title="Correct Answers by Difficulty",
-                     color_discrete_sequence=['#9146FF'])
-        st.plotly_chart(fig, use_container_width=True)
+        with span("chart.result_difficulty"):
+            st.plotly_chart(charts.difficulty_breakdown(result.difficulty_breakdown), use_container_width=True)
     
-    # Incorrect questions review
-    if result.incorrect_questions:
+    # Incorrect questions review, shown with the option order the learner saw
+    if result.incorrect_question_ids:
         st.markdown("### Review Incorrect Questions")
-        for i, question in enumerate(result.incorrect_questions):
+        repository = get_shared_repository()
+        incorrect_questions = []
+        for answer in store.get_incorrect_answers(result.attempt_id):
+            if answer['file_name'] is not None:
+                question = repository.get_question_at(answer['file_name'], answer['question_index'],
+                                                      answer['question_id'])
+            else:  # Quiz file unknown
+                question = repository.get_question(answer['question_id'])
+            permutation = decode_permutation(answer['permutation'])
+            if question and permutation and len(permutation) == len(question.options):
+                question = ShuffledQuestion(base=question, permutation=permutation)
+            if question:
+                incorrect_questions.append(question)
+        
+        for i, question in enumerate(incorrect_questions):
             with st.expander(f"Question {i+1}: {question.question[:50]}..."):
                 st.markdown(f"**Question:** {question.question}")
                 st.markdown(f"**Correct Answer:** {chr(65 + question.correct_option_index)}. {question.options[question.correct_option_index]}")
@@ -722,11 +912,67 @@ def render_quiz_result():
             st.rerun()
 
 
+@timed("render.search")
+def render_search_page():
+    """Render the question search page"""
+    st.markdown("## Search Questions")
+    
+    repository = get_shared_repository()
+    fields = repository.get_all_fields()
+    index = repository.get_search_index()
+    
+    query = st.text_input("Search", placeholder="e.g. gradient descent, attention, overfitting")
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        field_names = ["All Fields"] + [field.name for field in fields]
+        selected_field_name = st.selectbox("Field", field_names)
+    with col2:
+        difficulties = st.multiselect("Difficulty", [d.value for d in QuestionDifficulty])
+    with col3:
+        tags = st.multiselect("Tags", index.tags)
+    
+    if not query.strip() and not tags:
+        st.info("Enter keywords or pick tags to search across every subtopic.")
+        return
+    
+    selected_field = next((f for f in fields if f.name == selected_field_name), None)
+    filters = SearchFilters(
+        field_id=selected_field.id if selected_field else None,
+        difficulties=tuple(difficulties),
+        tags=tuple(tags)
+    )
+    
+    start = time.perf_counter()
+    results = repository.search(query, filters, limit=50)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    st.caption(f"{len(results)} questions ({elapsed_ms:.1f} ms)")
+    
+    for question, subtopic, score in results:
+        with st.expander(f"{question.id}: {question.question[:80]}"):
+            st.markdown(f"**Subtopic:** {subtopic.name} · **Difficulty:** {question.difficulty.value}")
+            st.markdown(f"**Question:** {question.question}")
+            for i, option in enumerate(question.options):
+                correct = " **(Correct)**" if i == question.correct_option_index else ""
+                st.markdown(f"{chr(65 + i)}. {option}{correct}")
+            st.markdown(f"**Explanation:** {question.explanation}")
+            if question.tags:
+                st.caption("Tags: " + ", ".join(question.tags))
+
+
+@timed("render.results")
 def render_results_page():
     """Render the results history page"""
+    import charts
+    import pandas as pd
+    
     st.markdown("## Quiz Results History")
     
-    if not st.session_state.quiz_results:
+    store = get_shared_attempt_store()
+    user_id = st.session_state.user_id
+    total_quizzes = store.count_attempts(user_id)
+    
+    if not total_quizzes:
         st.info("No quiz results yet. Take a quiz to see your performance!")
         if st.button("Start Quiz", type="primary"):
             st.session_state.current_page = 'select_topic'
@@ -734,10 +980,10 @@ def render_results_page():
         return
     
     # Results summary
-    total_quizzes = len(st.session_state.quiz_results)
-    avg_score = sum(r.percentage for r in st.session_state.quiz_results) / total_quizzes
-    total_questions = sum(r.total_questions for r in st.session_state.quiz_results)
-    total_correct = sum(r.score for r in st.session_state.quiz_results)
+    summary = store.get_summary(user_id)
+    avg_score = summary['average_score']
+    total_questions = summary['total_questions']
+    total_correct = summary['total_correct']
     
     col1, col2, col3, col4 = st.columns(4)
     with col1:
@@ -749,11 +995,16 @@ def render_results_page():
     with col4:
         st.metric("Overall Accuracy", f"{(total_correct/total_questions)*100:.1f}%")
     
-    # Results table
+    # Results table, one page at a time
+    page_size = 20
+    page_count = (total_quizzes + page_size - 1) // page_size
+    page = st.number_input("Page", min_value=1, max_value=page_count, value=page_count) if page_count > 1 else 1
+    offset = (page - 1) * page_size
+    
     results_data = []
-    for i, result in enumerate(st.session_state.quiz_results):
+    for i, result in enumerate(store.get_attempts(user_id, limit=page_size, offset=offset)):
         results_data.append({
-            'Quiz #': i + 1,
+            'Quiz #': offset + i + 1,
             'Topic': result.topic_name,
             'Subtopic': result.subtopic_name,
             'Score': f"{result.score}/{result.total_questions}",
@@ -762,18 +1013,114 @@ def render_results_page():
         })
     
     df = pd.DataFrame(results_data)
-    st.dataframe(df, use_container_width=True)
+    st.dataframe(df, use_container_width=True, hide_index=True)
     
     # Performance trend
-    if len(st.session_state.quiz_results) > 1:
-        scores = [r.percentage for r in st.session_state.quiz_results]
-        fig = px.line(x=list(range(1, len(scores) + 1)), y=scores,
-                      title="Performance Trend",
-                      labels={'x': 'Quiz Number', 'y': 'Score (%)'})
-        fig.update_traces(line_color='#9146FF')
-        st.plotly_chart(fig, use_container_width=True)
+    scores = store.get_score_history(user_id)
+    if len(scores) > 1:
+        first_quiz = total_quizzes - len(scores) + 1
+        with span("chart.score_trend"):
+            st.plotly_chart(charts.score_trend(first_quiz, scores), use_container_width=True)
+    
+    answer_log = get_learner_session().answer_log
+    if not len(answer_log):
+        return
+    
+    # Accuracy breakdowns over every answer given in this session
+    st.markdown("### This Session")
+    col1, col2 = st.columns(2)
+    with col1:
+        by_difficulty = answer_log.accuracy_by_difficulty()
+        with span("chart.accuracy_by_difficulty"):
+            st.plotly_chart(charts.accuracy_by_difficulty(by_difficulty), use_container_width=True)
+    
+    with col2:
+        by_subtopic = answer_log.accuracy_by('subtopic_name')
+        with span("chart.accuracy_by_subtopic"):
+            st.plotly_chart(charts.accuracy_bars(by_subtopic, "Accuracy by Subtopic", 'Subtopic'),
+                            use_container_width=True)
+    
+    by_tag = answer_log.accuracy_by_tag(top=15)
+    if not by_tag.empty:
+        with span("chart.accuracy_by_tag"):
+            st.plotly_chart(charts.accuracy_bars(by_tag, "Accuracy by Tag (most answered)", 'Tag'),
+                            use_container_width=True)
+    
+    over_time = answer_log.time_series()
+    if len(over_time) > 1:
+        with span("chart.accuracy_over_time"):
+            st.plotly_chart(charts.accuracy_over_time(over_time), use_container_width=True)
+
+
+@timed("render.leaderboard")
+def render_leaderboard_page():
+    """Render cohort statistics and top learners, overall or for one subtopic"""
+    import charts
+    import pandas as pd
+    
+    st.markdown("## Leaderboard")
+    
+    store = get_shared_attempt_store()
+    repository = get_shared_repository()
+    user_id = st.session_state.user_id
+    
+    # Overall, then every subtopic that has finished quizzes, most attempted first
+    scopes = [('', '', '')] + [scope for scope, _ in store.get_leaderboard_scopes()]
+    
+    def scope_label(scope) -> str:
+        if not scope[2]:
+            return "All quizzes"
+        subtopic = repository.get_subtopic_by_id(*scope)
+        return subtopic.name if subtopic else scope[2]
+    
+    scope = st.selectbox("Scope", scopes, format_func=scope_label)
+    stats = store.get_cohort_stats(scope)
+    if stats is None:
+        st.info("No finished quizzes yet. Be the first on the board!")
+        return
+    
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Attempts", stats.attempts)
+    with col2:
+        st.metric("Learners", stats.learners)
+    with col3:
+        st.metric("Average Score", f"{stats.mean:.1f}%", help=f"Standard deviation {stats.stddev:.1f} points")
+    with col4:
+        st.metric("Overall Accuracy", f"{stats.accuracy:.1f}%")
+    
+    columns = st.columns(len(stats.percentiles))
+    for column, (p, value) in zip(columns, stats.percentiles.items()):
+        with column:
+            st.metric(f"{p}th Percentile", f"{value:.0f}%")
+    
+    # Overall, rank by correct answers so one lucky short quiz does not top the board
+    order = 'best' if scope[2] else 'correct'
+    leaders = store.get_leaderboard(scope, limit=10, order=order)
+    st.markdown("### Top Learners")
+    leaders_data = []
+    for entry in leaders:
+        leaders_data.append({
+            'Rank': entry.rank,
+            'Learner': "You" if entry.user_id == user_id else f"Learner {entry.user_id[:6]}",
+            'Best Score': f"{entry.best_percentage:.1f}%",
+            'Average Score': f"{entry.average_percentage:.1f}%",
+            'Correct Answers': f"{entry.correct}/{entry.answered}",
+            'Quizzes': entry.attempts
+        })
+    st.dataframe(pd.DataFrame(leaders_data), use_container_width=True, hide_index=True)
+    
+    rank = store.get_learner_rank(user_id, scope, order)
+    if rank is None:
+        st.caption("Finish a quiz here to appear on the leaderboard.")
+    elif rank > len(leaders):
+        st.caption(f"Your rank: #{rank} of {stats.learners}")
+    
+    with span("chart.score_distribution"):
+        st.plotly_chart(charts.score_distribution(stats.histogram), use_container_width=True)
 
 
+@timed("render.about")
 def render_about_page():
     """Render the about page"""
     st.markdown("""
@@ -824,10 +1171,82 @@ def render_about_page():
     """)
 
 
+def render_metrics_page():
+    """Render the instrumentation admin page (only reachable with GNANAVANA_METRICS=1)"""
+    import pandas as pd
+    
+    st.markdown("## Metrics")
+    
+    registry = metrics.REGISTRY
+    snapshot = registry.snapshot()
+    server = get_shared_metrics_server()
+    if server:
+        host, port = server.server_address[:2]
+        st.caption(f"Prometheus endpoint: http://{host}:{port}/metrics · JSON: http://{host}:{port}/metrics.json")
+    
+    gauges = snapshot['gauges']
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Uptime", f"{snapshot['uptime_seconds'] / 60:.1f} min")
+    with col2:
+        st.metric("Sessions Tracked", int(gauges['sessions.tracked']))
+    with col3:
+        st.metric("Largest Session", f"{gauges['sessions.memory_bytes_max'] / 1024:.0f} KiB")
+    
+    st.markdown("### Timers")
+    if snapshot['timers']:
+        timers = pd.DataFrame.from_dict(snapshot['timers'], orient='index').sort_values('total_ms', ascending=False)
+        timers.index.name = 'Span'
+        st.dataframe(timers, use_container_width=True)
+    else:
+        st.info("Nothing timed yet.")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("### Counters")
+        counters = pd.DataFrame(list(snapshot['counters'].items()), columns=['Counter', 'Value'])
+        st.dataframe(counters, use_container_width=True, hide_index=True)
+    with col2:
+        st.markdown("### Gauges")
+        gauge_rows = pd.DataFrame(list(gauges.items()), columns=['Gauge', 'Value'])
+        st.dataframe(gauge_rows, use_container_width=True, hide_index=True)
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button("Download Prometheus Text", registry.to_prometheus(), file_name="metrics.txt",
+                           mime="text/plain", use_container_width=True)
+    with col2:
+        st.download_button("Download JSON", json.dumps(snapshot, indent=2), file_name="metrics.json",
+                           mime="application/json", use_container_width=True)
+
+
+def render_quiz_file_error(error: QuizFileError):
+    """Stop with the schema problems of a quiz file instead of serving a partial bank"""
+    st.error(f"Quiz file {error.file_name} is invalid; run `python quiz_schema.py` for a full report.")
+    st.markdown("\n".join(f"- `{problem}`" for problem in error.errors))
+
+
+@timed("rerun")
 def main():
     """Main application function"""
+    if metrics.ENABLED:
+        get_shared_metrics_server()
+    repository = get_shared_repository()
+    try:
+        repository.get_all_fields()
+        # Pick up edited quiz_data files; in-progress quizzes keep the questions they started with
+        repository.refresh_if_due()
+    except QuizFileError as e:
+        render_quiz_file_error(e)
+        st.stop()
+    # Styles are re-sent on full reruns only; quiz answer clicks rerun just their fragment
+    st.markdown(get_minified_css(), unsafe_allow_html=True)
     initialize_session_state()
     render_sidebar()
+    if repository.bank_error:
+        st.warning(f"Compiled quiz bank unavailable, using JSON files: {repository.bank_error}")
+    for error in repository.load_errors.values():
+        st.warning(f"Skipped an update to {error.file_name}, still serving its previous version: {error.errors[0]}")
     
     # Show compact header for all pages except quiz
     if st.session_state.current_page != 'quiz':
@@ -842,10 +1261,18 @@ def main():
         render_quiz_page()
     elif st.session_state.current_page == 'quiz_result':
         render_quiz_result()
+    elif st.session_state.current_page == 'search':
+        render_search_page()
     elif st.session_state.current_page == 'results':
         render_results_page()
+    elif st.session_state.current_page == 'leaderboard':
+        render_leaderboard_page()
     elif st.session_state.current_page == 'about':
         render_about_page()
+    elif st.session_state.current_page == 'metrics' and metrics.ENABLED:
+        render_metrics_page()
+    
+    record_session_memory(st.session_state.user_id, st.session_state)
 
 
 if __name__ == "__main__":
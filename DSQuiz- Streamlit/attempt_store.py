@@ -0,0 +1,263 @@
+"""
+Persistent attempt store for GnanaVana
+
+Finished quizzes are written to a local SQLite database (WAL mode) in one batch at
+quiz end, so history survives restarts and sessions do not keep every QuizResult and
+its Question objects in memory. Answers reference questions by quiz file and position
+in that file (IDs repeat across files); the ID is kept too. The same transaction
+updates the cohort aggregates in leaderboard.py.
+"""
+
+import json
+import sqlite3
+import threading
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import leaderboard
+from models import QuizResult
+
+
+DEFAULT_DB_PATH = "quiz_history.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS attempts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    field_id TEXT NOT NULL,
+    topic_id TEXT NOT NULL,
+    subtopic_id TEXT NOT NULL,
+    field_name TEXT NOT NULL,
+    topic_name TEXT NOT NULL,
+    subtopic_name TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    total_questions INTEGER NOT NULL,
+    percentage REAL NOT NULL,
+    time_taken TEXT,
+    difficulty_breakdown TEXT NOT NULL,
+    seed INTEGER,
+    finished_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_attempts_user ON attempts (user_id, finished_at);
+CREATE INDEX IF NOT EXISTS idx_attempts_user_id ON attempts (user_id, id);
+
+CREATE TABLE IF NOT EXISTS answers (
+    attempt_id INTEGER NOT NULL REFERENCES attempts (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    question_id TEXT NOT NULL,
+    permutation TEXT,
+    chosen_option INTEGER,
+    original_option INTEGER,
+    is_correct INTEGER NOT NULL,
+    latency REAL,
+    file_name TEXT,
+    question_index INTEGER,
+    PRIMARY KEY (attempt_id, position)
+);
+CREATE INDEX IF NOT EXISTS idx_answers_question ON answers (question_id);
+"""
+
+# A question as stored with answers: (quiz file name, position in that file)
+ItemKey = Tuple[str, int]
+
+# (position, question_id, file_name, question_index, permutation, chosen_option,
+#  original_option, is_correct, latency); question_index is the position in file_name
+AnswerRow = Tuple[int, str, Optional[str], Optional[int], Optional[str], Optional[int], Optional[int],
+                  bool, Optional[float]]
+
+
+def encode_permutation(permutation: Optional[Sequence[int]]) -> Optional[str]:
+    """Store an option permutation as text, e.g. (2, 0, 3, 1) -> '2,0,3,1'"""
+    return ','.join(str(i) for i in permutation) if permutation is not None else None
+
+
+def decode_permutation(value: Optional[str]) -> Optional[Tuple[int, ...]]:
+    return tuple(int(i) for i in value.split(',')) if value else None
+
+
+class AttemptStore:
+    """SQLite-backed history of finished quizzes, safe to share between session threads"""
+    
+    def __init__(self, db_path: str = DEFAULT_DB_PATH):
+        self.db_path = db_path
+        self._local = threading.local()
+        with self._connect() as connection:
+            connection.executescript(SCHEMA)
+        leaderboard.ensure_schema(self._connect())
+    
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread; Streamlit runs each session's script on its own thread"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.db_path, timeout=10)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute("PRAGMA foreign_keys=ON")
+            self._local.connection = connection
+        return connection
+    
+    def save_attempt(self, user_id: str, field_id: str, topic_id: str, subtopic_id: str,
+                     result: QuizResult, answers: Iterable[AnswerRow], finished_at: float,
+                     seed: Optional[int] = None) -> int:
+        """Write a finished quiz and all of its answers in a single transaction"""
+        connection = self._connect()
+        with connection:
+            cursor = connection.execute(
+                """INSERT INTO attempts (user_id, field_id, topic_id, subtopic_id, field_name,
+                       topic_name, subtopic_name, score, total_questions, percentage, time_taken,
+                       difficulty_breakdown, seed, finished_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                (user_id, field_id, topic_id, subtopic_id, result.field_name, result.topic_name,
+                 result.subtopic_name, result.score, result.total_questions, result.percentage,
+                 result.time_taken, json.dumps(result.difficulty_breakdown), seed, finished_at)
+            )
+            attempt_id = cursor.lastrowid
+            connection.executemany(
+                """INSERT INTO answers (attempt_id, position, question_id, file_name,
+                       question_index, permutation, chosen_option, original_option, is_correct,
+                       latency)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                [(attempt_id, *answer) for answer in answers]
+            )
+            leaderboard.record_attempt(connection, user_id, field_id, topic_id, subtopic_id,
+                                       result.percentage, result.score, result.total_questions,
+                                       finished_at)
+        return attempt_id
+    
+    def _row_to_result(self, row: sqlite3.Row, incorrect_question_ids: List[str]) -> QuizResult:
+        return QuizResult(
+            field_name=row['field_name'],
+            topic_name=row['topic_name'],
+            subtopic_name=row['subtopic_name'],
+            score=row['score'],
+            total_questions=row['total_questions'],
+            percentage=row['percentage'],
+            time_taken=row['time_taken'],
+            difficulty_breakdown=json.loads(row['difficulty_breakdown']),
+            incorrect_question_ids=incorrect_question_ids,
+            attempt_id=row['id']
+        )
+    
+    def get_attempt(self, attempt_id: int) -> Optional[QuizResult]:
+        """Load one finished quiz with the IDs of the questions answered incorrectly"""
+        connection = self._connect()
+        row = connection.execute("SELECT * FROM attempts WHERE id = ?", (attempt_id,)).fetchone()
+        if row is None:
+            return None
+        return self._row_to_result(row, [answer['question_id'] for answer in self.get_incorrect_answers(attempt_id)])
+    
+    def get_incorrect_answers(self, attempt_id: int) -> List[sqlite3.Row]:
+        """Incorrect answers of a quiz in question order, with the option permutation shown"""
+        return self._connect().execute(
+            """SELECT position, question_id, file_name, question_index, permutation, chosen_option,
+                      original_option
+               FROM answers WHERE attempt_id = ? AND is_correct = 0 ORDER BY position""",
+            (attempt_id,)
+        ).fetchall()
+    
+    def count_attempts(self, user_id: str) -> int:
+        return self._connect().execute(
+            "SELECT COUNT(*) FROM attempts WHERE user_id = ?", (user_id,)
+        ).fetchone()[0]
+    
+    def get_attempts(self, user_id: str, limit: int = 20, offset: int = 0) -> List[QuizResult]:
+        """A page of a user's finished quizzes, oldest first (incorrect IDs are not loaded)"""
+        rows = self._connect().execute(
+            """SELECT * FROM attempts WHERE user_id = ?
+               ORDER BY finished_at, id LIMIT ? OFFSET ?""",
+            (user_id, limit, offset)
+        ).fetchall()
+        return [self._row_to_result(row, []) for row in rows]
+    
+    def get_summary(self, user_id: str) -> dict:
+        """Totals over all of a user's finished quizzes"""
+        row = self._connect().execute(
+            """SELECT COUNT(*) AS quizzes, AVG(percentage) AS average_score,
+                      COALESCE(SUM(total_questions), 0) AS total_questions,
+                      COALESCE(SUM(score), 0) AS total_correct
+               FROM attempts WHERE user_id = ?""",
+            (user_id,)
+        ).fetchone()
+        return dict(row)
+    
+    def get_score_history(self, user_id: str, limit: int = 200) -> List[float]:
+        """Percentages of the user's most recent quizzes, oldest first"""
+        rows = self._connect().execute(
+            """SELECT percentage FROM (
+                   SELECT percentage, finished_at, id FROM attempts WHERE user_id = ?
+                   ORDER BY finished_at DESC, id DESC LIMIT ?
+               ) ORDER BY finished_at, id""",
+            (user_id, limit)
+        ).fetchall()
+        return [row['percentage'] for row in rows]
+    
+    def get_answer_events(self, user_id: Optional[str] = None, after_rowid: int = 0) -> List[tuple]:
+        """
+        Answers as (rowid, file_name, question_index, is_correct, quiz percentage,
+        finished_at) tuples; file_name and question_index are None when the quiz file
+        was unknown.
+
+        Filtered to one user when user_id is given; after_rowid lets callers read only
+        answers saved since their last call.
+        """
+        query = """SELECT a.rowid, a.file_name, a.question_index, a.is_correct, t.percentage,
+                          t.finished_at
+                   FROM answers a JOIN attempts t ON t.id = a.attempt_id
+                   WHERE a.rowid > ?"""
+        params: list = [after_rowid]
+        if user_id is not None:
+            query += " AND t.user_id = ?"
+            params.append(user_id)
+        rows = self._connect().execute(query + " ORDER BY a.rowid", params).fetchall()
+        return [tuple(row) for row in rows]
+    
+    def get_learner_answers(self, user_id: str, after_attempt_id: int = 0) -> List[tuple]:
+        """
+        One learner's answers as (attempt_id, file_name, question_index, is_correct,
+        finished_at) tuples, from quizzes saved after after_attempt_id, in saving order.
+
+        Reads only the new attempts through the (user_id, id) index, however long the
+        learner's history is.
+        """
+        rows = self._connect().execute(
+            """SELECT t.id, a.file_name, a.question_index, a.is_correct, t.finished_at
+               FROM attempts t JOIN answers a ON a.attempt_id = t.id
+               WHERE t.user_id = ? AND t.id > ? ORDER BY t.id, a.position""",
+            (user_id, after_attempt_id)
+        ).fetchall()
+        return [tuple(row) for row in rows]
+    
+    def get_item_events(self, after_rowid: int = 0, limit: int = 100_000) -> List[tuple]:
+        """
+        Answers as (rowid, file_name, question_index, question_id, original_option,
+        chosen_option, permutation, is_correct, quiz score, quiz length) tuples, for item
+        analysis.
+
+        Reads at most `limit` answers saved after after_rowid, in rowid order.
+        """
+        rows = self._connect().execute(
+            """SELECT a.rowid, a.file_name, a.question_index, a.question_id, a.original_option,
+                      a.chosen_option, a.permutation, a.is_correct, t.score, t.total_questions
+               FROM answers a JOIN attempts t ON t.id = a.attempt_id
+               WHERE a.rowid > ? ORDER BY a.rowid LIMIT ?""",
+            (after_rowid, limit)
+        ).fetchall()
+        return [tuple(row) for row in rows]
+    
+    def max_answer_rowid(self) -> int:
+        return self._connect().execute("SELECT COALESCE(MAX(rowid), 0) FROM answers").fetchone()[0]
+    
+    def get_cohort_stats(self, scope: leaderboard.Scope = leaderboard.OVERALL) -> Optional[leaderboard.CohortStats]:
+        """Score distribution of everyone's quizzes in a subtopic, or overall"""
+        return leaderboard.get_cohort_stats(self._connect(), scope)
+    
+    def get_leaderboard(self, scope: leaderboard.Scope = leaderboard.OVERALL, limit: int = 10,
+                        order: str = 'best') -> List[leaderboard.LeaderboardEntry]:
+        return leaderboard.get_top_learners(self._connect(), scope, limit, order)
+    
+    def get_learner_rank(self, user_id: str, scope: leaderboard.Scope = leaderboard.OVERALL,
+                         order: str = 'best') -> Optional[int]:
+        return leaderboard.get_learner_rank(self._connect(), user_id, scope, order)
+    
+    def get_leaderboard_scopes(self) -> List[Tuple[leaderboard.Scope, int]]:
+        return leaderboard.get_scopes(self._connect())
@@ -0,0 +1,329 @@
+"""
+Micro-benchmarks for the GnanaVana repository and model hot paths
+
+Times the paths that grow with content (loading the hierarchy cold and warm, parsing a
+subtopic, sampling quiz questions, shuffling options, scoring a finished quiz, search
+and mixed quizzes) against the real quiz_data/ and against synthetic banks made by
+replicating it 10x or 100x. Each benchmark reports per-call time (min/median/mean) and
+the peak traced memory of one call; results can be saved as JSON and compared against
+an earlier run to catch regressions.
+
+The startup profile runs in fresh interpreters: the time to `import app` (what every
+cold worker pays) with a -X importtime breakdown of its direct imports, the first runs
+of the home, topic and quiz pages, and which heavy modules (pandas, Plotly Express)
+each of them loaded. Its peak memory is the child's max RSS.
+
+Usage:
+    python benchmarks.py [--scales 1,10] [--output bench.json] [--compare old.json]
+    python benchmarks.py --startup-only
+
+A 100x bank is about 780 MB of JSON and takes minutes to generate and compile.
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Tuple
+
+from answer_log import AnswerLog
+from quiz_repository import QuizRepository
+from search_index import SearchFilters
+
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(APP_DIR, "quiz_data")
+LINKED_FILES = ["quiz_data", "GnanaVana just logo.png", ".streamlit"]
+
+# Modules the home, topic and quiz pages should not need
+HEAVY_MODULES = ("pandas", "plotly.express", "charts", "question_selector")
+
+# Time budget per benchmark; fast paths run many times, slow ones at least MIN_RUNS times
+TARGET_SECONDS = 0.5
+MIN_RUNS = 3
+
+
+def make_synthetic_bank(source_dir: str, target_dir: str, scale: int) -> None:
+    """Write `scale` copies of every quiz file with distinct subtopic and question IDs"""
+    for filename in sorted(os.listdir(source_dir)):
+        if not filename.endswith('.json') or filename.startswith('.'):
+            continue
+        with open(os.path.join(source_dir, filename), 'r', encoding='utf-8') as file:
+            data = json.load(file)
+        for copy in range(scale):
+            replica = dict(data)
+            replica['subtopicId'] = f"{data['subtopicId']}{copy:03d}"
+            replica['subtopicName'] = f"{data['subtopicName']} #{copy}"
+            replica['questions'] = [{**q, 'id': f"{q['id']}_{copy}"} for q in data['questions']]
+            name = filename[:-len('.json')] + f"{copy:03d}.json"  # ..._STC_LRG -> ..._STC_LRG007
+            with open(os.path.join(target_dir, name), 'w', encoding='utf-8') as file:
+                json.dump(replica, file, separators=(',', ':'))
+
+
+class Benchmark:
+    """Runs callables for a time budget and records time and peak memory per call"""
+    
+    def __init__(self, label: str):
+        self.label = label
+        self.results: Dict[str, dict] = {}
+    
+    def run(self, name: str, func: Callable[[], object], setup: Optional[Callable[[], None]] = None) -> None:
+        times: List[float] = []
+        deadline = time.perf_counter() + TARGET_SECONDS
+        while len(times) < MIN_RUNS or time.perf_counter() < deadline:
+            if setup:
+                setup()
+            start = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - start)
+        
+        if setup:
+            setup()
+        tracemalloc.start()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        
+        self.results[name] = {
+            'runs': len(times),
+            'min_ms': round(min(times) * 1000, 4),
+            'median_ms': round(statistics.median(times) * 1000, 4),
+            'mean_ms': round(statistics.fmean(times) * 1000, 4),
+            'peak_kib': round(peak / 1024, 1)
+        }
+        result = self.results[name]
+        print(f"  {name:<40} {result['median_ms']:>11.3f} ms  (min {result['min_ms']:.3f}, "
+              f"{result['runs']} runs)  peak {result['peak_kib']:>9.1f} KiB")
+
+
+def run_suite(data_dir: str, label: str) -> Dict[str, dict]:
+    bench = Benchmark(label)
+    print(f"\n{label}")
+    
+    # Compile the bank and manifest once so "cold" measures opening them, not building them
+    QuizRepository(data_dir).get_all_fields()
+    QuizRepository(data_dir, use_bank=False).get_all_fields()
+    
+    bench.run("get_all_fields cold (bank)", lambda: QuizRepository(data_dir).get_all_fields())
+    bench.run("get_all_fields cold (JSON manifest)",
+              lambda: QuizRepository(data_dir, use_bank=False).get_all_fields())
+    
+    repository = QuizRepository(data_dir)
+    fields = repository.get_all_fields()
+    bench.run("get_all_fields warm", repository.get_all_fields)
+    
+    subtopics = [s for field in fields for topic in field.topics for s in topic.subtopics]
+    subtopic = subtopics[0]
+    bench.run("load_subtopic_from_file cold (bank)",
+              lambda: repository.load_subtopic_from_file(subtopic.file_name),
+              setup=repository._subtopics_cache.clear)
+    json_repository = QuizRepository(data_dir, use_bank=False)
+    json_repository.get_all_fields()
+    bench.run("load_subtopic_from_file cold (JSON)",
+              lambda: json_repository.load_subtopic_from_file(subtopic.file_name),
+              setup=json_repository._subtopics_cache.clear)
+    bench.run("load_subtopic_from_file warm", lambda: repository.load_subtopic_from_file(subtopic.file_name))
+    
+    ids = (subtopic.field_id, subtopic.topic_id, subtopic.id)
+    bench.run("get_questions_for_subtopic shuffle",
+              lambda: repository.get_questions_for_subtopic(*ids, shuffle=True, limit=20))
+    bench.run("get_questions_for_subtopic no shuffle",
+              lambda: repository.get_questions_for_subtopic(*ids, shuffle=False, limit=20))
+    
+    questions = list(repository.get_subtopic_questions(subtopic))
+    rng = random.Random(1)
+    bench.run("Question.shuffle_options x100", lambda: [q.shuffle_options(rng) for q in questions[:100]])
+    
+    quiz = repository.get_questions_for_subtopic(*ids, shuffle=True, limit=20, seed=1)
+    
+    def score_quiz() -> dict:
+        log = AnswerLog()
+        attempt = log.start_attempt()
+        for position, question in enumerate(quiz):
+            chosen = rng.randrange(len(question.options))
+            log.append(attempt, position, question, subtopic.id, subtopic.name, chosen,
+                       chosen == question.correct_option_index, 1.0)
+        log.finish_attempt(attempt)
+        return log.attempt_summary(attempt)
+    
+    bench.run("finish_quiz scoring (20 answers)", score_quiz)
+    
+    bench.run("get_mixed_questions field-wide (20)",
+              lambda: repository.get_mixed_questions(subtopics, 20, seed=rng.randrange(2 ** 32)))
+    
+    index_repository = QuizRepository(data_dir)
+    index_repository.get_all_fields()
+    bench.run("search index build", lambda: index_repository.get_search_index(),
+              setup=lambda: setattr(index_repository, '_search_index', None))
+    repository.get_search_index()
+    bench.run("search 'gradient descent'", lambda: repository.search("gradient descent"))
+    bench.run("search tag filter", lambda: repository.search("", SearchFilters(tags=("overfitting",))))
+    
+    return bench.results
+
+
+# Run in a fresh interpreter: time `import app` and report what it loaded
+IMPORT_PROBE = r"""
+import json, resource, sys, time
+sys.path.insert(0, sys.argv[1])
+start = time.perf_counter()
+import app
+seconds = time.perf_counter() - start
+print(json.dumps({'import app': {'seconds': seconds,
+                                 'loaded': [m for m in sys.argv[2].split(',') if m in sys.modules],
+                                 'max_rss_kib': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}}))
+"""
+
+# Run in a fresh interpreter: time the first run of each page a new learner sees
+PAGE_PROBE = r"""
+import json, os, resource, sys, time
+from streamlit.testing.v1 import AppTest
+heavy = sys.argv[2].split(',')
+at = AppTest.from_file(os.path.join(sys.argv[1], 'app.py'), default_timeout=120)
+report = {}
+def visit(page, action):
+    start = time.perf_counter()
+    action.run()
+    report[f'first run {page}'] = {'seconds': time.perf_counter() - start,
+                                   'loaded': [m for m in heavy if m in sys.modules],
+                                   'max_rss_kib': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}
+    if at.exception:
+        raise SystemExit(f'{page}: {at.exception[0].value}')
+visit('home', at)
+visit('select_topic', next(b for b in at.sidebar.button if b.label == 'Start Quiz').click())
+visit('quiz', next(b for b in at.button if b.key == 'quiz_0').click())
+print(json.dumps(report))
+"""
+
+
+def _run_probe(probe: str, work_dir: str, importtime: bool = False) -> subprocess.CompletedProcess:
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", probe,
+                                                                                 APP_DIR, ','.join(HEAVY_MODULES)]
+    result = subprocess.run(command, cwd=work_dir, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Startup probe failed: {result.stderr.strip().splitlines()[-1:]}")
+    return result
+
+
+def import_breakdown(stderr: str, top: int = 15) -> List[Tuple[str, float]]:
+    """Cumulative milliseconds of each module app.py imports directly, slowest first"""
+    children = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        if depth == 1:  # Imported by app itself
+            children.append((name.strip(), int(cumulative) / 1000))
+    children.sort(key=lambda child: -child[1])
+    return children[:top]
+
+
+def profile_startup(runs: int) -> Tuple[Dict[str, dict], List[Tuple[str, float]]]:
+    """Startup timings in the same shape as run_suite's results, plus the import breakdown"""
+    print("\nstartup")
+    work_dir = tempfile.mkdtemp(prefix="gnanavana-startup-")
+    try:
+        for name in LINKED_FILES:
+            if os.path.exists(os.path.join(APP_DIR, name)):
+                os.symlink(os.path.join(APP_DIR, name), os.path.join(work_dir, name))
+        _run_probe(PAGE_PROBE, work_dir)  # Untimed: compiles the bank if the JSON files changed
+        
+        samples: Dict[str, List[dict]] = {}
+        for _ in range(runs):
+            for probe in (IMPORT_PROBE, PAGE_PROBE):
+                for name, sample in json.loads(_run_probe(probe, work_dir).stdout.splitlines()[-1]).items():
+                    samples.setdefault(name, []).append(sample)
+        breakdown = import_breakdown(_run_probe(IMPORT_PROBE, work_dir, importtime=True).stderr)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    
+    results: Dict[str, dict] = {}
+    for name, runs_of_step in samples.items():
+        times = [sample['seconds'] for sample in runs_of_step]
+        results[name] = {
+            'runs': len(times),
+            'min_ms': round(min(times) * 1000, 4),
+            'median_ms': round(statistics.median(times) * 1000, 4),
+            'mean_ms': round(statistics.fmean(times) * 1000, 4),
+            'peak_kib': float(max(sample['max_rss_kib'] for sample in runs_of_step)),
+            'loaded': runs_of_step[-1]['loaded']
+        }
+        result = results[name]
+        print(f"  {name:<40} {result['median_ms']:>11.3f} ms  (min {result['min_ms']:.3f}, "
+              f"{result['runs']} runs)  loaded: {', '.join(result['loaded']) or '-'}")
+    print("  import app, slowest direct imports:")
+    for module, milliseconds in breakdown:
+        print(f"    {module:<38} {milliseconds:>11.3f} ms")
+    return results, breakdown
+
+
+def compare(current: Dict[str, Dict[str, dict]], baseline: Dict[str, Dict[str, dict]],
+            threshold: float) -> int:
+    """Print median time and peak memory ratios; returns the number of regressions"""
+    regressions = 0
+    print(f"\nCompared with baseline (regression if ratio > {threshold:.2f})")
+    for label, results in current.items():
+        for name, result in results.items():
+            old = baseline.get(label, {}).get(name)
+            if not old:
+                continue
+            time_ratio = result['median_ms'] / old['median_ms'] if old['median_ms'] else 1.0
+            memory_ratio = result['peak_kib'] / old['peak_kib'] if old['peak_kib'] else 1.0
+            flag = "REGRESSION" if max(time_ratio, memory_ratio) > threshold else ""
+            regressions += bool(flag)
+            print(f"  {label:<6} {name:<40} time x{time_ratio:5.2f}  memory x{memory_ratio:5.2f}  {flag}")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark repository and model hot paths")
+    parser.add_argument("--scales", default="1,10", help="Comma-separated bank sizes relative to quiz_data")
+    parser.add_argument("--output", default=None, help="Write results as JSON")
+    parser.add_argument("--compare", default=None, help="Earlier --output file to compare against")
+    parser.add_argument("--threshold", type=float, default=1.25, help="Ratio that counts as a regression")
+    parser.add_argument("--startup-runs", type=int, default=3, help="Fresh interpreters per startup step (0 to skip)")
+    parser.add_argument("--startup-only", action="store_true", help="Only profile startup")
+    args = parser.parse_args()
+    
+    results: Dict[str, Dict[str, dict]] = {}
+    breakdown: List[Tuple[str, float]] = []
+    if args.startup_runs > 0:
+        results['startup'], breakdown = profile_startup(args.startup_runs)
+    for scale in ([] if args.startup_only else [int(s) for s in args.scales.split(',')]):
+        label = f"{scale}x"
+        work_dir = tempfile.mkdtemp(prefix=f"gnanavana-bench-{label}-")
+        try:
+            if scale == 1:
+                data_dir = os.path.join(work_dir, "quiz_data")
+                shutil.copytree(DATA_DIR, data_dir, ignore=shutil.ignore_patterns('.*'))
+            else:
+                data_dir = work_dir
+                print(f"\nGenerating {label} synthetic bank...")
+                make_synthetic_bank(DATA_DIR, data_dir, scale)
+            results[label] = run_suite(data_dir, label)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump({'python': sys.version.split()[0], 'results': results,
+                       'import_breakdown_ms': dict(breakdown)}, file, indent=2)
+        print(f"\nResults written to {args.output}")
+    
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as file:
+            baseline = json.load(file)['results']
+        return 1 if compare(results, baseline, args.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
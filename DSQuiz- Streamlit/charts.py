@@ -0,0 +1,94 @@
+"""
+Plotly chart builders for the GnanaVana result pages
+
+pandas and Plotly take most of a cold start, and only the quiz result, results history,
+leaderboard and metrics pages draw charts or tables. app.py imports this module inside those pages,
+so the home, topic and quiz pages render without loading the plotting stack.
+"""
+
+from typing import Dict, Sequence
+
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+
+PURPLE = '#9146FF'
+
+
+def score_gauge(percentage: float) -> go.Figure:
+    """Gauge of one quiz's percentage, with the 70% reference and 90% threshold"""
+    fig = go.Figure(go.Indicator(
+        mode = "gauge+number+delta",
+        value = percentage,
+        domain = {'x': [0, 1], 'y': [0, 1]},
+        title = {'text': "Quiz Performance"},
+        delta = {'reference': 70},
+        gauge = {
+            'axis': {'range': [None, 100]},
+            'bar': {'color': PURPLE},
+            'steps': [
+                {'range': [0, 50], 'color': "#FFCCCB"},
+                {'range': [50, 80], 'color': "#FFFFCC"},
+                {'range': [80, 100], 'color': "#90EE90"}
+            ],
+            'threshold': {
+                'line': {'color': "red", 'width': 4},
+                'thickness': 0.75,
+                'value': 90
+            }
+        }
+    ))
+    
+    fig.update_layout(height=300)
+    return fig
+
+
+def difficulty_breakdown(breakdown: Dict[str, int]) -> go.Figure:
+    """Correct answers per difficulty of one quiz"""
+    df_difficulty = pd.DataFrame.from_dict(breakdown, orient='index', columns=['Correct'])
+    df_difficulty.index.name = 'Difficulty'
+    return px.bar(df_difficulty, y=df_difficulty.index, x='Correct',
+                  title="Correct Answers by Difficulty",
+                  color_discrete_sequence=[PURPLE])
+
+
+def score_trend(first_quiz: int, scores: Sequence[float]) -> go.Figure:
+    """Score of each recent quiz, numbered from first_quiz"""
+    fig = px.line(x=list(range(first_quiz, first_quiz + len(scores))), y=scores,
+                  title="Performance Trend",
+                  labels={'x': 'Quiz Number', 'y': 'Score (%)'})
+    fig.update_traces(line_color=PURPLE)
+    return fig
+
+
+def accuracy_by_difficulty(accuracy: pd.DataFrame) -> go.Figure:
+    return px.bar(accuracy, x=accuracy.index, y='accuracy',
+                  title="Accuracy by Difficulty", hover_data=['answers'],
+                  labels={'x': 'Difficulty', 'accuracy': 'Accuracy (%)'},
+                  color_discrete_sequence=[PURPLE])
+
+
+def accuracy_bars(accuracy: pd.DataFrame, title: str, label: str) -> go.Figure:
+    """Horizontal accuracy bars, e.g. per subtopic or tag"""
+    return px.bar(accuracy, x='accuracy', y=accuracy.index, orientation='h',
+                  title=title, hover_data=['answers'],
+                  labels={'y': label, 'accuracy': 'Accuracy (%)'},
+                  color_discrete_sequence=[PURPLE])
+
+
+def accuracy_over_time(over_time: pd.DataFrame) -> go.Figure:
+    fig = px.line(over_time, x=over_time.index, y='accuracy',
+                  title="Accuracy Over Time", hover_data=['answers'],
+                  labels={'period': 'Day', 'accuracy': 'Accuracy (%)'})
+    fig.update_traces(line_color=PURPLE)
+    return fig
+
+
+def score_distribution(histogram: Sequence[int]) -> go.Figure:
+    """Attempts per 10-point score band, from a 101-bucket (0-100%) histogram"""
+    bands = [f"{low}-{low + 9}" if low < 90 else "90-100" for low in range(0, 100, 10)]
+    counts = [sum(histogram[low:low + 10]) for low in range(0, 90, 10)] + [sum(histogram[90:])]
+    return px.bar(x=bands, y=counts, title="Score Distribution",
+                  labels={'x': 'Score (%)', 'y': 'Attempts'},
+                  color_discrete_sequence=[PURPLE])
@@ -0,0 +1,489 @@
+"""
+Offline content packs for GnanaVana clients
+
+build_packs() turns quiz_data/ into one gzip pack per subtopic plus a manifest, for
+clients that keep the bank offline (such as the Android app the models mirror). A pack
+is the subtopic's quiz file re-serialized canonically: compact JSON with one question
+per line, so it has the same schema as quiz_data/ files and its SHA-256 only changes
+when the content does. Packs are keyed by the FLD_/TPC_/STC_ IDs of their file name,
+plus the file's rank segment because two files may share all three IDs.
+
+When a rebuild changes a pack, binary deltas are written from each of its last few
+versions to the new one. A delta is a list of COPY (byte range of the old version) and
+ADD (new bytes) instructions, aligned on the question lines and then trimmed to the
+changed bytes within each line, so editing one question costs a client a few hundred
+bytes instead of the whole pack. Files no longer referenced by the manifest are removed.
+
+Output directory layout:
+    manifest.json                       current version of every pack and its deltas
+    packs/<key>.<hash>.json.gz          content-addressed packs
+    deltas/<key>.<from>.<to>.gvd        delta between two versions of one pack
+
+Delta file layout (little-endian):
+    MAGIC (8 bytes) | base SHA-256 (32 bytes) | target SHA-256 (32 bytes) | target length (u32)
+    zlib-compressed instructions: COPY = 0x01, offset (u32), length (u32)
+                                  ADD  = 0x02, length (u32), bytes
+
+Usage:
+    python content_packs.py build [--data-dir quiz_data] [--output content_packs]
+    python content_packs.py verify [--data-dir quiz_data] [--output content_packs]
+    python content_packs.py roundtrip [--data-dir quiz_data]
+"""
+
+import difflib
+import gzip
+import hashlib
+import json
+import os
+import struct
+import time
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+from quiz_repository import parse_quiz_filename
+from quiz_schema import QuizFile, decode_quiz_file
+
+
+FORMAT_VERSION = 1
+MANIFEST_FILENAME = "manifest.json"
+PACKS_DIR = "packs"
+DELTAS_DIR = "deltas"
+
+# Earlier versions of a pack that deltas are kept from
+MAX_DELTA_BASES = 4
+
+DELTA_MAGIC = b"GVDELTA\x01"
+_DELTA_HEADER = struct.Struct('<8s32s32sI')
+_COPY = struct.Struct('<BII')
+_ADD = struct.Struct('<BI')
+OP_COPY = 0x01
+OP_ADD = 0x02
+
+
+class DeltaError(ValueError):
+    """A delta that does not apply to the given base or does not produce its target"""
+
+
+def pack_key(filename: str) -> Optional[str]:
+    """e.g. FLD_DSC_TPC_MLG_150_STC_LRG.json -> FLD_DSC/TPC_MLG/STC_LRG/150"""
+    info = parse_quiz_filename(filename)
+    if not info:
+        return None
+    return f"{info['field_id']}/{info['topic_id']}/{info['subtopic_id']}/{info['rank']}"
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+
+def canonical_content(quiz_file: QuizFile) -> bytes:
+    """Compact JSON in the quiz_data/ schema, one question per line so deltas align on questions"""
+    header = _dumps({
+        'fieldId': quiz_file.field_id,
+        'fieldName': quiz_file.field_name,
+        'topicId': quiz_file.topic_id,
+        'topicName': quiz_file.topic_name,
+        'subtopicId': quiz_file.subtopic_id,
+        'subtopicName': quiz_file.subtopic_name,
+        'str': quiz_file.str_value,
+        'description': quiz_file.description
+    })
+    questions = [
+        _dumps({
+            'id': question.id,
+            'question': question.question,
+            'options': list(question.options),
+            'correctOptionIndex': question.correct_option_index,
+            'explanation': question.explanation,
+            'optionExplanations': list(question.option_explanations),
+            'difficulty': question.difficulty.value,
+            'tags': list(question.tags)
+        })
+        for question in quiz_file.questions
+    ]
+    lines = [header[:-1] + ',"questions":[', ",\n".join(questions), "]}"]
+    return "\n".join(lines).encode('utf-8')
+
+
+def _sha256(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+def compress_pack(content: bytes) -> bytes:
+    """gzip with a fixed timestamp, so the same content always compresses to the same bytes"""
+    return gzip.compress(content, compresslevel=9, mtime=0)
+
+
+def make_delta(base: bytes, target: bytes) -> bytes:
+    """Encode target as COPY/ADD instructions against base"""
+    base_lines = base.splitlines(keepends=True)
+    target_lines = target.splitlines(keepends=True)
+    base_offsets = [0]
+    for line in base_lines:
+        base_offsets.append(base_offsets[-1] + len(line))
+    
+    ops: List[Tuple[int, object, int]] = []  # (OP_COPY, offset, length) or (OP_ADD, bytes, 0)
+    
+    def copy(offset: int, length: int) -> None:
+        if length <= 0:
+            return
+        if ops and ops[-1][0] == OP_COPY and ops[-1][1] + ops[-1][2] == offset:
+            ops[-1] = (OP_COPY, ops[-1][1], ops[-1][2] + length)
+        else:
+            ops.append((OP_COPY, offset, length))
+    
+    def add(data: bytes) -> None:
+        if not data:
+            return
+        if ops and ops[-1][0] == OP_ADD:
+            ops[-1] = (OP_ADD, ops[-1][1] + data, 0)
+        else:
+            ops.append((OP_ADD, data, 0))
+    
+    matcher = difflib.SequenceMatcher(None, base_lines, target_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            copy(base_offsets[i1], base_offsets[i2] - base_offsets[i1])
+        elif tag == 'replace' and i2 - i1 == j2 - j1:
+            # Edited lines: keep their unchanged prefix and suffix, send only the middle
+            for i, j in zip(range(i1, i2), range(j1, j2)):
+                old, new = base_lines[i], target_lines[j]
+                prefix = len(os.path.commonprefix([old, new]))
+                limit = min(len(old), len(new)) - prefix
+                suffix = 0
+                while suffix < limit and old[-1 - suffix] == new[-1 - suffix]:
+                    suffix += 1
+                copy(base_offsets[i], prefix)
+                add(new[prefix:len(new) - suffix])
+                copy(base_offsets[i + 1] - suffix, suffix)
+        elif tag in ('replace', 'insert'):
+            add(b"".join(target_lines[j1:j2]))
+    
+    body = bytearray()
+    for op, value, length in ops:
+        if op == OP_COPY:
+            body.extend(_COPY.pack(OP_COPY, value, length))
+        else:
+            body.extend(_ADD.pack(OP_ADD, len(value)))
+            body.extend(value)
+    header = _DELTA_HEADER.pack(DELTA_MAGIC, hashlib.sha256(base).digest(),
+                                hashlib.sha256(target).digest(), len(target))
+    return header + zlib.compress(bytes(body), 9)
+
+
+def apply_delta(base: bytes, delta: bytes) -> bytes:
+    """Rebuild the target of a delta from its base; raises DeltaError on any mismatch"""
+    if len(delta) < _DELTA_HEADER.size:
+        raise DeltaError("Delta is truncated")
+    magic, base_hash, target_hash, target_length = _DELTA_HEADER.unpack_from(delta)
+    if magic != DELTA_MAGIC:
+        raise DeltaError("Not a GnanaVana delta")
+    if hashlib.sha256(base).digest() != base_hash:
+        raise DeltaError("Delta was made for a different base version")
+    try:
+        body = zlib.decompress(delta[_DELTA_HEADER.size:])
+    except zlib.error as e:
+        raise DeltaError(f"Corrupt delta: {e}") from None
+    
+    target = bytearray()
+    position = 0
+    while position < len(body):
+        op = body[position]
+        if op == OP_COPY:
+            _, offset, length = _COPY.unpack_from(body, position)
+            if offset + length > len(base):
+                raise DeltaError("COPY beyond the end of the base")
+            target.extend(base[offset:offset + length])
+            position += _COPY.size
+        elif op == OP_ADD:
+            _, length = _ADD.unpack_from(body, position)
+            position += _ADD.size
+            target.extend(body[position:position + length])
+            position += length
+        else:
+            raise DeltaError(f"Unknown instruction {op:#x}")
+    
+    if len(target) != target_length or hashlib.sha256(target).digest() != target_hash:
+        raise DeltaError("Delta did not reproduce its target")
+    return bytes(target)
+
+
+def _file_stem(key: str) -> str:
+    return key.replace('/', '.')
+
+
+def _pack_path(key: str, sha256: str) -> str:
+    return f"{PACKS_DIR}/{_file_stem(key)}.{sha256[:16]}.json.gz"
+
+
+def load_manifest(output_dir: str) -> Optional[dict]:
+    try:
+        with open(os.path.join(output_dir, MANIFEST_FILENAME), 'r', encoding='utf-8') as file:
+            manifest = json.load(file)
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get('format') == FORMAT_VERSION else None
+
+
+def read_pack(output_dir: str, relative_path: str) -> bytes:
+    with open(os.path.join(output_dir, relative_path), 'rb') as file:
+        return gzip.decompress(file.read())
+
+
+def _read(path: str) -> bytes:
+    with open(path, 'rb') as file:
+        return file.read()
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as file:
+        file.write(data)
+    os.replace(tmp_path, path)
+
+
+def build_packs(data_dir: str, output_dir: str) -> dict:
+    """Write packs, deltas from earlier versions and the manifest; returns the manifest"""
+    os.makedirs(os.path.join(output_dir, PACKS_DIR), exist_ok=True)
+    os.makedirs(os.path.join(output_dir, DELTAS_DIR), exist_ok=True)
+    previous = load_manifest(output_dir) or {'version': 0, 'packs': {}}
+    
+    packs: Dict[str, dict] = {}
+    for filename in sorted(os.listdir(data_dir)):
+        key = pack_key(filename) if filename.endswith('.json') and not filename.startswith('.') else None
+        if key is None:
+            continue
+        with open(os.path.join(data_dir, filename), 'rb') as file:
+            quiz_file = decode_quiz_file(file.read(), filename)
+        content = canonical_content(quiz_file)
+        sha256 = _sha256(content)
+        
+        old = previous['packs'].get(key)
+        if old and old['sha256'] == sha256:
+            packs[key] = old
+            continue
+        
+        path = _pack_path(key, sha256)
+        compressed = compress_pack(content)
+        _write_atomic(os.path.join(output_dir, path), compressed)
+        entry = {
+            'file': path,
+            'sha256': sha256,
+            'size': len(compressed),
+            'rawSize': len(content),
+            'sourceFile': filename,
+            'subtopicName': quiz_file.subtopic_name,
+            'questions': len(quiz_file.questions),
+            'history': [],
+            'deltas': {}
+        }
+        if old:
+            entry['history'] = ([old['sha256']] + old['history'])[:MAX_DELTA_BASES]
+            for base_sha in entry['history']:
+                try:
+                    base = read_pack(output_dir, _pack_path(key, base_sha))
+                except OSError:
+                    continue  # Removed by hand; clients at that version download the pack
+                delta = make_delta(base, content)
+                delta_path = f"{DELTAS_DIR}/{_file_stem(key)}.{base_sha[:16]}.{sha256[:16]}.gvd"
+                _write_atomic(os.path.join(output_dir, delta_path), delta)
+                entry['deltas'][base_sha] = {'file': delta_path, 'size': len(delta)}
+        packs[key] = entry
+    
+    changed = packs != previous['packs']
+    manifest = {
+        'format': FORMAT_VERSION,
+        'version': previous['version'] + 1 if changed else previous['version'],
+        'bankHash': _sha256("\n".join(f"{key}:{entry['sha256']}" for key, entry in sorted(packs.items()))
+                            .encode('utf-8')),
+        'builtAt': time.time() if changed else previous.get('builtAt'),
+        'packs': packs
+    }
+    if changed:
+        _write_atomic(os.path.join(output_dir, MANIFEST_FILENAME),
+                      json.dumps(manifest, indent=1, sort_keys=True).encode('utf-8'))
+    _prune(output_dir, packs)
+    return manifest
+
+
+def _prune(output_dir: str, packs: Dict[str, dict]) -> None:
+    """Remove pack and delta files the manifest no longer refers to"""
+    referenced = set()
+    for key, entry in packs.items():
+        referenced.add(entry['file'])
+        referenced.update(_pack_path(key, sha256) for sha256 in entry['history'])
+        referenced.update(delta['file'] for delta in entry['deltas'].values())
+    for directory in (PACKS_DIR, DELTAS_DIR):
+        for name in os.listdir(os.path.join(output_dir, directory)):
+            if f"{directory}/{name}" not in referenced:
+                os.remove(os.path.join(output_dir, directory, name))
+
+
+def verify_packs(data_dir: str, output_dir: str) -> List[str]:
+    """
+    Check every pack against its hash and its quiz_data/ file and every delta against its
+    base and target. Returns the problems found.
+    """
+    manifest = load_manifest(output_dir)
+    if manifest is None:
+        return [f"No manifest in {output_dir}"]
+    problems = []
+    for key, entry in sorted(manifest['packs'].items()):
+        try:
+            content = read_pack(output_dir, entry['file'])
+        except (OSError, EOFError, gzip.BadGzipFile) as e:
+            problems.append(f"{key}: cannot read {entry['file']}: {e}")
+            continue
+        if _sha256(content) != entry['sha256']:
+            problems.append(f"{key}: content does not match its hash")
+        try:
+            with open(os.path.join(data_dir, entry['sourceFile']), 'rb') as file:
+                source = decode_quiz_file(file.read(), entry['sourceFile'])
+            packed = decode_quiz_file(content, entry['sourceFile'])
+            if packed.metadata() != source.metadata() or packed.questions != source.questions:
+                problems.append(f"{key}: differs from {entry['sourceFile']} (rebuild the packs)")
+        except (OSError, ValueError) as e:
+            problems.append(f"{key}: {e}")
+        for base_sha, delta in entry['deltas'].items():
+            try:
+                with open(os.path.join(output_dir, delta['file']), 'rb') as file:
+                    rebuilt = apply_delta(read_pack(output_dir, _pack_path(key, base_sha)), file.read())
+                if rebuilt != content:
+                    problems.append(f"{key}: delta {delta['file']} does not rebuild the pack")
+            except (OSError, DeltaError) as e:
+                problems.append(f"{key}: delta {delta['file']}: {e}")
+    return problems
+
+
+def sync_client(output_dir: str, client_dir: str) -> dict:
+    """
+    Bring a client's local copy up to date the way an offline client would: unchanged
+    packs are skipped, packs with a delta from the local version are patched and the
+    rest are downloaded in full. Returns the bytes transferred.
+    """
+    manifest = load_manifest(output_dir)
+    os.makedirs(client_dir, exist_ok=True)
+    state_path = os.path.join(client_dir, "state.json")
+    try:
+        with open(state_path, 'r', encoding='utf-8') as file:
+            local = json.load(file)
+    except (OSError, ValueError):
+        local = {}
+    
+    transferred = {'manifest': os.path.getsize(os.path.join(output_dir, MANIFEST_FILENAME)),
+                   'packs': 0, 'deltas': 0, 'full_downloads': 0, 'patched': 0}
+    for key, entry in manifest['packs'].items():
+        local_sha = local.get(key)
+        if local_sha == entry['sha256']:
+            continue
+        local_path = os.path.join(client_dir, f"{_file_stem(key)}.json")
+        delta = entry['deltas'].get(local_sha)
+        content = None
+        if delta is not None:
+            with open(os.path.join(output_dir, delta['file']), 'rb') as file:
+                data = file.read()
+            transferred['deltas'] += len(data)
+            with open(local_path, 'rb') as file:
+                try:
+                    content = apply_delta(file.read(), data)
+                    transferred['patched'] += 1
+                except DeltaError:
+                    content = None  # Local copy damaged; fall back to the full pack
+        if content is None:
+            with open(os.path.join(output_dir, entry['file']), 'rb') as file:
+                data = file.read()
+            transferred['packs'] += len(data)
+            transferred['full_downloads'] += 1
+            content = gzip.decompress(data)
+        if _sha256(content) != entry['sha256']:
+            raise DeltaError(f"{key}: synced content does not match the manifest")
+        _write_atomic(local_path, content)
+        local[key] = entry['sha256']
+    
+    for key in set(local) - set(manifest['packs']):
+        del local[key]
+        try:
+            os.remove(os.path.join(client_dir, f"{_file_stem(key)}.json"))
+        except OSError:
+            pass
+    _write_atomic(state_path, json.dumps(local).encode('utf-8'))
+    return transferred
+
+
+def roundtrip(data_dir: str) -> dict:
+    """
+    Local end-to-end check: build packs, sync a fresh client, edit one question in a
+    copy of the bank, rebuild, sync again through the delta and compare every client
+    file with the rebuilt packs.
+    """
+    import shutil
+    import tempfile
+    
+    work = tempfile.mkdtemp(prefix="gnanavana-packs-")
+    try:
+        source_dir = os.path.join(work, "quiz_data")
+        output_dir = os.path.join(work, "packs")
+        client_dir = os.path.join(work, "client")
+        shutil.copytree(data_dir, source_dir, ignore=shutil.ignore_patterns('.*'))
+        
+        first = build_packs(source_dir, output_dir)
+        initial_sync = sync_client(output_dir, client_dir)
+        
+        key, entry = sorted(first['packs'].items())[0]
+        edited_path = os.path.join(source_dir, entry['sourceFile'])
+        with open(edited_path, 'r', encoding='utf-8') as file:
+            data = json.load(file)
+        data['questions'][0]['explanation'] += " (Revised.)"
+        with open(edited_path, 'w', encoding='utf-8') as file:
+            json.dump(data, file, indent=2, ensure_ascii=False)
+        
+        second = build_packs(source_dir, output_dir)
+        update_sync = sync_client(output_dir, client_dir)
+        
+        mismatched = [
+            k for k, e in second['packs'].items()
+            if not os.path.exists(os.path.join(client_dir, f"{_file_stem(k)}.json"))
+            or _read(os.path.join(client_dir, f"{_file_stem(k)}.json")) != read_pack(output_dir, e['file'])
+        ]
+        source_bytes = sum(os.path.getsize(os.path.join(data_dir, name)) for name in os.listdir(data_dir)
+                           if name.endswith('.json') and not name.startswith('.'))
+        return {
+            'packs': len(second['packs']),
+            'source_json_bytes': source_bytes,
+            'pack_bytes': sum(e['size'] for e in second['packs'].values()),
+            'edited_pack': key,
+            'versions': [first['version'], second['version']],
+            'initial_sync': initial_sync,
+            'update_sync': update_sync,
+            'problems': verify_packs(source_dir, output_dir) + [f"{k}: client copy differs" for k in mismatched]
+        }
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+    
+    parser = argparse.ArgumentParser(description="Build and check offline content packs")
+    parser.add_argument("command", choices=["build", "verify", "roundtrip"])
+    parser.add_argument("--data-dir", default="quiz_data", help="Directory containing the quiz JSON files")
+    parser.add_argument("--output", default="content_packs", help="Directory the packs are written to")
+    args = parser.parse_args()
+    
+    if args.command == "build":
+        manifest = build_packs(args.data_dir, args.output)
+        total = sum(entry['size'] for entry in manifest['packs'].values())
+        deltas = sum(len(entry['deltas']) for entry in manifest['packs'].values())
+        print(f"Version {manifest['version']}: {len(manifest['packs'])} packs, {total / 1024:.1f} KiB, "
+              f"{deltas} deltas in {args.output}")
+        sys.exit(0)
+    problems = verify_packs(args.data_dir, args.output) if args.command == "verify" else None
+    if args.command == "roundtrip":
+        report = roundtrip(args.data_dir)
+        print(json.dumps(report, indent=2))
+        problems = report['problems']
+    for problem in problems:
+        print(problem)
+    print("OK" if not problems else f"{len(problems)} problems")
+    sys.exit(1 if problems else 0)
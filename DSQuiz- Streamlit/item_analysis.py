@@ -0,0 +1,355 @@
+"""
+Item analysis of the GnanaVana answer history
+
+Every saved answer is folded into per-question sufficient statistics, keyed by quiz
+file and position in it since question IDs repeat across files: answer and
+correct counts, the sums needed for the point-biserial correlation between answering
+correctly and the rest of the quiz (the quiz score without this question), and
+per-option selection counts. Options are counted by their index in the quiz_data file:
+answers store the option as shown, and it is mapped back through the quiz's shuffle
+permutation. Updates are grouped bincounts over whole batches, and the statistics are
+plain sums, so refresh() only reads answers saved since the last call and the state
+can be saved between runs.
+
+The report gives each question's difficulty (p-value, the share answered correctly),
+discrimination, and selection rate and mean rest score per option, and flags questions
+that are too easy or too hard, do not discriminate, have unused distractors, or have a
+distractor that attracts stronger learners than the key (often a second correct answer).
+
+Usage:
+    python item_analysis.py [--db quiz_history.db] [--data-dir quiz_data]
+                            [--state item_analysis_state.npz] [--min-answers 30]
+                            [--output item_analysis.json]
+"""
+
+import json
+import os
+import threading
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from attempt_store import AttemptStore, ItemKey, decode_permutation
+from quiz_schema import QuizFile, load_quiz_files, report_skipped_files
+
+
+# Questions with fewer answers are reported but not flagged
+DEFAULT_MIN_ANSWERS = 30
+
+# Flag thresholds, in the usual classical test theory ranges
+TOO_EASY = 0.95  # p-value above
+TOO_HARD = 0.25  # p-value below
+LOW_DISCRIMINATION = 0.15  # Point-biserial below
+UNUSED_DISTRACTOR = 0.05  # Selection rate below
+STRONG_DISTRACTOR = 0.10  # Selection rate at least, with choosers stronger than the key's...
+STRONG_DISTRACTOR_MARGIN = 0.05  # ...by this much rest score
+# Authored difficulty label -> p-values it is consistent with
+LABEL_RANGES = {'EASY': (0.5, 1.0), 'HARD': (0.0, 0.9)}
+
+# Rows of ItemAnalysis._sums
+SUMS = ('answers', 'correct', 'scored', 'scored_correct', 'rest', 'rest_sq', 'rest_correct')
+
+
+class ItemAnalysis:
+    """
+    Per-question sufficient statistics for item analysis, keyed by (file, position).
+
+    Only answers from quizzes of two or more questions have a rest score, so the
+    discrimination sums count those ('scored') separately from the p-value counts.
+    Answers whose quiz file is unknown are attributed by question ID when the ID belongs
+    to a single file, and otherwise only counted in `unattributed`.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+    
+    def _reset(self) -> None:
+        self.items: List[ItemKey] = []
+        self.index: Dict[ItemKey, int] = {}
+        self.last_rowid = 0
+        self.unattributed = 0
+        self._sums = np.zeros((len(SUMS), 0))
+        # Questions x original option: times chosen, rest-score sum and scored count of choosers
+        self._options = np.zeros((3, 0, 0))
+    
+    @property
+    def answers(self) -> np.ndarray:
+        return self._sums[0]
+    
+    def refresh(self, store: AttemptStore, id_locations: Optional[Dict[str, ItemKey]] = None,
+                batch_size: int = 100_000) -> int:
+        """
+        Fold in answers saved since the last refresh; returns how many were read.
+
+        id_locations maps question IDs to their item for answers saved without a file
+        (see unique_locations()).
+        """
+        id_locations = id_locations or {}
+        with self._lock:
+            if store.max_answer_rowid() < self.last_rowid:  # A different or rebuilt database
+                self._reset()
+            added = 0
+            while True:
+                events = store.get_item_events(after_rowid=self.last_rowid, limit=batch_size)
+                if not events:
+                    return added
+                (rowids, files, positions, question_ids, original, chosen, permutations,
+                 is_correct, scores, lengths) = zip(*events)
+                files, positions = list(files), list(positions)
+                for i in range(len(events)):
+                    if files[i] is None:
+                        files[i], positions[i] = id_locations.get(question_ids[i], (None, None))
+                known = np.array([file is not None for file in files], dtype=bool)
+                self.unattributed += int((~known).sum())
+                if known.any():
+                    self.update(np.asarray(files, dtype=object)[known], np.array(positions, dtype=object)[known],
+                                original_options(original, chosen, permutations)[known],
+                                np.array(is_correct, dtype=bool)[known], np.array(scores)[known],
+                                np.array(lengths)[known])
+                self.last_rowid = rowids[-1]
+                added += len(events)
+    
+    def update(self, files: Sequence[str], positions: Sequence[int], options: np.ndarray,
+               is_correct: np.ndarray, scores: np.ndarray, lengths: np.ndarray) -> None:
+        """
+        Add a batch of answers.
+
+        Parallel sequences with one entry per answer: the quiz file and position of the
+        question, the chosen option's index in the quiz_data file (-1 if unknown), whether
+        it was correct, and the correct answers and questions of the quiz it belongs to.
+        """
+        positions = np.asarray(positions, dtype=np.int64)
+        unique_files, file_codes = np.unique(np.asarray(files, dtype=object), return_inverse=True)
+        width = int(positions.max(initial=0)) + 1
+        unique_codes, inverse = np.unique(file_codes * width + positions, return_inverse=True)
+        keys = [(unique_files[code // width], int(code % width)) for code in unique_codes]
+        for key in keys:
+            if key not in self.index:
+                self.index[key] = len(self.items)
+                self.items.append(key)
+        item = np.array([self.index[key] for key in keys], dtype=np.int64)[inverse]
+        n_items = len(self.items)
+        n_options = max(self._options.shape[2], int(options.max(initial=-1)) + 1)
+        
+        x = is_correct.astype(np.float64)
+        scored = (lengths > 1).astype(np.float64)
+        # Share of the other questions in the quiz answered correctly
+        rest = np.where(scored > 0, (scores - x) / np.maximum(lengths - 1, 1), 0.0)
+        
+        sums = np.zeros((len(SUMS), n_items))
+        sums[:, :self._sums.shape[1]] = self._sums
+        for row, weights in enumerate([None, x, scored, scored * x, rest, rest * rest, rest * x]):
+            sums[row] += np.bincount(item, weights=weights, minlength=n_items)
+        self._sums = sums
+        
+        option_sums = np.zeros((3, n_items, n_options))
+        option_sums[:, :self._options.shape[1], :self._options.shape[2]] = self._options
+        known = options >= 0
+        cell = item[known] * n_options + options[known]
+        for row, weights in enumerate([None, rest[known], scored[known]]):
+            option_sums[row] += np.bincount(cell, weights=weights,
+                                            minlength=n_items * n_options).reshape(n_items, n_options)
+        self._options = option_sums
+    
+    def p_values(self) -> np.ndarray:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return self._sums[1] / self._sums[0]
+    
+    def point_biserial(self) -> np.ndarray:
+        """Correlation of answering correctly with the rest score; NaN without variation"""
+        n, sum_x, sum_y, sum_yy, sum_xy = self._sums[2:]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return (n * sum_xy - sum_x * sum_y) / np.sqrt(
+                (n * sum_x - sum_x ** 2) * (n * sum_yy - sum_y ** 2)
+            )
+    
+    def option_rates(self) -> np.ndarray:
+        """Questions x options: share of answers that chose each option"""
+        chosen = self._options[0]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return chosen / chosen.sum(axis=1, keepdims=True)
+    
+    def option_rest_means(self) -> np.ndarray:
+        """Questions x options: mean rest score of the learners who chose each option"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return self._options[1] / self._options[2]
+    
+    def save(self, path: str) -> None:
+        with self._lock:
+            np.savez_compressed(path, item_files=np.array([file for file, _ in self.items], dtype=str),
+                                item_positions=np.array([position for _, position in self.items], dtype=np.int64),
+                                last_rowid=self.last_rowid, unattributed=self.unattributed,
+                                sums=self._sums, options=self._options)
+    
+    @classmethod
+    def load(cls, path: str) -> 'ItemAnalysis':
+        """Restore statistics written by save()"""
+        analysis = cls()
+        with np.load(path) as state:
+            analysis.items = list(zip(state['item_files'].tolist(), state['item_positions'].tolist()))
+            analysis.last_rowid = int(state['last_rowid'])
+            analysis.unattributed = int(state['unattributed'])
+            analysis._sums = state['sums']
+            analysis._options = state['options']
+        analysis.index = {key: i for i, key in enumerate(analysis.items)}
+        return analysis
+
+
+def original_options(original: Sequence[Optional[int]], chosen: Sequence[Optional[int]],
+                     permutations: Sequence[Optional[str]]) -> np.ndarray:
+    """
+    The chosen option's index in the quiz_data file for each answer, or -1.
+
+    Answers normally store it already; older rows without it are mapped through their
+    saved permutation (shown position -> original index).
+    """
+    result = np.array([-1 if value is None else value for value in original], dtype=np.int64)
+    for i in np.flatnonzero(result < 0):
+        if chosen[i] is None or chosen[i] < 0:
+            continue
+        permutation = decode_permutation(permutations[i])
+        if permutation is None:
+            result[i] = chosen[i]
+        elif chosen[i] < len(permutation):
+            result[i] = permutation[chosen[i]]
+    return result
+
+
+def unique_locations(quiz_files: Sequence[QuizFile]) -> Dict[str, ItemKey]:
+    """Item of every question ID that appears in only one quiz file"""
+    locations: Dict[str, Optional[ItemKey]] = {}
+    for quiz_file in quiz_files:
+        for position, question in enumerate(quiz_file.questions):
+            locations[question.id] = None if question.id in locations else (quiz_file.file_name, position)
+    return {question_id: key for question_id, key in locations.items() if key is not None}
+
+
+def question_flags(p_value: float, discrimination: float, rates: np.ndarray, rest_means: np.ndarray,
+                   key: int, difficulty: str) -> List[str]:
+    """Problems with one question, given its statistics over the options it has"""
+    flags = []
+    if p_value > TOO_EASY:
+        flags.append(f"too easy: {p_value:.0%} answer correctly")
+    if p_value < 1 / len(rates) and discrimination < LOW_DISCRIMINATION:
+        flags.append(f"below chance: {p_value:.0%} answer correctly with {len(rates)} options; check the key")
+    elif p_value < TOO_HARD:
+        flags.append(f"too hard: {p_value:.0%} answer correctly")
+    low, high = LABEL_RANGES.get(difficulty, (0.0, 1.0))
+    if not low <= p_value <= high:
+        flags.append(f"labeled {difficulty} but {p_value:.0%} answer correctly")
+    if discrimination < 0:
+        flags.append(f"negative discrimination ({discrimination:.2f}): weaker learners do better; check the key")
+    elif discrimination < LOW_DISCRIMINATION:
+        flags.append(f"low discrimination ({discrimination:.2f})")
+    for option, rate in enumerate(rates):
+        if option == key:
+            continue
+        if rate < UNUSED_DISTRACTOR:
+            flags.append(f"option {option} is rarely chosen ({rate:.0%})")
+        elif rate >= STRONG_DISTRACTOR and rest_means[option] > rest_means[key] + STRONG_DISTRACTOR_MARGIN:
+            flags.append(f"option {option} draws stronger learners than the key "
+                         f"({rest_means[option]:.0%} vs {rest_means[key]:.0%} rest score); "
+                         f"it may also be correct")
+    return flags
+
+
+def build_report(analysis: ItemAnalysis, quiz_files: Sequence[QuizFile],
+                 min_answers: int = DEFAULT_MIN_ANSWERS) -> dict:
+    """Per-question statistics and flags for every question of quiz_files with answers"""
+    p_values = analysis.p_values()
+    discrimination = analysis.point_biserial()
+    rates = analysis.option_rates()
+    rest_means = analysis.option_rest_means()
+    
+    items = []
+    reported = set()
+    for quiz_file in quiz_files:
+        for position, question in enumerate(quiz_file.questions):
+            row = analysis.index.get((quiz_file.file_name, position))
+            if row is None or not analysis.answers[row]:
+                continue
+            reported.add((quiz_file.file_name, position))
+            n_options = len(question.options)
+            option_rates = np.zeros(n_options)
+            option_means = np.full(n_options, np.nan)
+            width = min(n_options, rates.shape[1])
+            option_rates[:width] = np.nan_to_num(rates[row, :width])
+            option_means[:width] = rest_means[row, :width]
+            
+            answers = int(analysis.answers[row])
+            r = float(discrimination[row])
+            flags = []
+            if answers >= min_answers:
+                flags = question_flags(float(p_values[row]), np.nan_to_num(r, nan=0.0), option_rates,
+                                       np.nan_to_num(option_means, nan=0.0), question.correct_option_index,
+                                       question.difficulty.value)
+            items.append({
+                'questionId': question.id,
+                'file': quiz_file.file_name,
+                'index': position,
+                'subtopicId': quiz_file.subtopic_id,
+                'difficulty': question.difficulty.value,
+                'answers': answers,
+                'pValue': round(float(p_values[row]), 4),
+                'pointBiserial': None if np.isnan(r) else round(r, 4),
+                'options': [
+                    {
+                        'index': option,
+                        'isKey': option == question.correct_option_index,
+                        'rate': round(float(option_rates[option]), 4),
+                        'meanRestScore': None if np.isnan(option_means[option])
+                        else round(float(option_means[option]), 4)
+                    }
+                    for option in range(n_options)
+                ],
+                'flags': flags
+            })
+    
+    items.sort(key=lambda item: (-len(item['flags']), -item['answers']))
+    return {
+        'answers': int(analysis.answers.sum()),
+        'questions': len(items),
+        'flagged': sum(bool(item['flags']) for item in items),
+        'minAnswers': min_answers,
+        'unattributedAnswers': analysis.unattributed,
+        'unknownItems': [{'file': file, 'index': position}
+                         for file, position in sorted(set(analysis.items) - reported)],
+        'items': items
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+    import time
+    from attempt_store import DEFAULT_DB_PATH
+    
+    parser = argparse.ArgumentParser(description="Report question difficulty, discrimination and distractors")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="Attempt store to analyse")
+    parser.add_argument("--data-dir", default="quiz_data", help="Directory containing the quiz JSON files")
+    parser.add_argument("--state", default="item_analysis_state.npz",
+                        help="Statistics saved between runs, so only new answers are read ('' to disable)")
+    parser.add_argument("--min-answers", type=int, default=DEFAULT_MIN_ANSWERS,
+                        help="Answers a question needs before it is flagged")
+    parser.add_argument("--output", default="item_analysis.json", help="Where to write the JSON report")
+    args = parser.parse_args()
+    
+    start = time.perf_counter()
+    analysis = ItemAnalysis.load(args.state) if args.state and os.path.exists(args.state) else ItemAnalysis()
+    quiz_files, skipped = load_quiz_files(args.data_dir)
+    added = analysis.refresh(AttemptStore(args.db), unique_locations(quiz_files))
+    if args.state:
+        analysis.save(args.state)
+    report = build_report(analysis, quiz_files, args.min_answers)
+    report['skippedFiles'] = report_skipped_files(skipped)
+    with open(args.output, 'w', encoding='utf-8') as file:
+        json.dump(report, file, indent=2)
+    
+    print(f"Analysed {report['answers']} answers ({added} new) to {report['questions']} questions "
+          f"in {time.perf_counter() - start:.1f}s: {report['flagged']} flagged")
+    for item in report['items'][:10]:
+        if item['flags']:
+            print(f"  {item['questionId']} ({item['file']} #{item['index']}): {'; '.join(item['flags'])}")
+    print(f"Report written to {args.output}")
+    sys.exit(1 if skipped else 0)
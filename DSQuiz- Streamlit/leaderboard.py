@@ -0,0 +1,281 @@
+"""
+Cohort statistics and leaderboards for GnanaVana
+
+AttemptStore.save_attempt() calls record_attempt() in the same transaction that saves a
+finished quiz, so these aggregates always agree with the attempts table. Each update
+adds to running totals with UPSERTs instead of reading values back, so any number of
+processes (Streamlit workers, the quiz service) can write one database: SQLite
+serializes the transactions and none of them can lose another's increment. The UPSERTs
+name their conflict targets, which SQLite 3.24 and later support (omitting them needs 3.35).
+
+Readers never scan attempts. A scope's mean, spread and percentiles come from one stats
+row and its score histogram, and the top learners from an index on their best scores
+or correct answers, so the leaderboard costs the same with ten attempts or ten million.
+
+Percentages are bounded to 0-100, so the streaming quantile sketch is a fixed histogram
+with one bucket per percentage point: exact for whole-number scores, otherwise within
+one point. Every attempt counts towards the overall scope (all IDs empty) and, unless it
+was a mixed quiz, towards its subtopic.
+"""
+
+import math
+import sqlite3
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+# Bumped when the aggregate tables change; older databases are rebuilt from attempts
+AGGREGATES_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cohort_stats (
+    field_id TEXT NOT NULL,
+    topic_id TEXT NOT NULL,
+    subtopic_id TEXT NOT NULL,
+    attempts INTEGER NOT NULL,
+    learners INTEGER NOT NULL,
+    sum_pct REAL NOT NULL,
+    sum_sq_pct REAL NOT NULL,
+    min_pct REAL NOT NULL,
+    max_pct REAL NOT NULL,
+    correct INTEGER NOT NULL,
+    answered INTEGER NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (field_id, topic_id, subtopic_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS cohort_histogram (
+    field_id TEXT NOT NULL,
+    topic_id TEXT NOT NULL,
+    subtopic_id TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (field_id, topic_id, subtopic_id, bucket)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS learner_stats (
+    field_id TEXT NOT NULL,
+    topic_id TEXT NOT NULL,
+    subtopic_id TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    attempts INTEGER NOT NULL,
+    sum_pct REAL NOT NULL,
+    best_pct REAL NOT NULL,
+    best_at REAL NOT NULL,
+    correct INTEGER NOT NULL,
+    answered INTEGER NOT NULL,
+    last_at REAL NOT NULL,
+    PRIMARY KEY (field_id, topic_id, subtopic_id, user_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_learner_best
+    ON learner_stats (field_id, topic_id, subtopic_id, best_pct DESC, best_at);
+CREATE INDEX IF NOT EXISTS idx_learner_correct
+    ON learner_stats (field_id, topic_id, subtopic_id, correct DESC, last_at);
+"""
+
+# (field_id, topic_id, subtopic_id); all empty for the overall scope
+Scope = Tuple[str, str, str]
+OVERALL: Scope = ('', '', '')
+
+# Leaderboard orderings: best score in the scope, or total correct answers. Ties go to
+# whoever got there first, then by user ID, which the indexes also hold as the key's tail
+ORDER_BY = {
+    'best': "best_pct DESC, best_at, user_id",
+    'correct': "correct DESC, last_at, user_id"
+}
+
+
+@dataclass(frozen=True)
+class CohortStats:
+    """Score distribution of every finished quiz in one scope"""
+    attempts: int
+    learners: int
+    mean: float
+    stddev: float
+    minimum: float
+    maximum: float
+    accuracy: float  # Correct answers / answers, in %
+    percentiles: Dict[int, float]
+    histogram: Tuple[int, ...]  # Attempts per whole percentage point, 0-100
+
+
+@dataclass(frozen=True)
+class LeaderboardEntry:
+    rank: int
+    user_id: str
+    attempts: int
+    best_percentage: float
+    average_percentage: float
+    correct: int
+    answered: int
+
+
+def ensure_schema(connection: sqlite3.Connection) -> None:
+    """Create the aggregate tables, rebuilding them from attempts once if they are new or outdated"""
+    connection.executescript(SCHEMA)
+    if connection.execute("PRAGMA user_version").fetchone()[0] >= AGGREGATES_VERSION:
+        return
+    connection.execute("BEGIN IMMEDIATE")  # Only one process rebuilds
+    try:
+        if connection.execute("PRAGMA user_version").fetchone()[0] < AGGREGATES_VERSION:
+            rebuild(connection)
+            connection.execute(f"PRAGMA user_version = {AGGREGATES_VERSION}")
+        connection.commit()
+    except BaseException:
+        connection.rollback()
+        raise
+
+
+def rebuild(connection: sqlite3.Connection) -> None:
+    """Recompute every aggregate from the attempts table, inside the caller's transaction"""
+    for table in ("cohort_stats", "cohort_histogram", "learner_stats"):
+        connection.execute(f"DELETE FROM {table}")
+    rows = connection.execute(
+        """SELECT user_id, field_id, topic_id, subtopic_id, percentage, score, total_questions,
+                  finished_at
+           FROM attempts ORDER BY id"""
+    )
+    for row in rows.fetchall():
+        record_attempt(connection, *row)
+
+
+def record_attempt(connection: sqlite3.Connection, user_id: str, field_id: str, topic_id: str,
+                   subtopic_id: str, percentage: float, correct: int, answered: int,
+                   finished_at: float) -> None:
+    """Add one finished quiz to its scopes; call inside the transaction that saves it"""
+    scopes = [OVERALL]
+    if subtopic_id:
+        scopes.append((field_id, topic_id, subtopic_id))
+    bucket = min(100, max(0, int(percentage)))
+    for scope in scopes:
+        new_learner = connection.execute(
+            """INSERT INTO learner_stats VALUES (?, ?, ?, ?, 0, 0, -1, ?, 0, 0, ?)
+               ON CONFLICT (field_id, topic_id, subtopic_id, user_id) DO NOTHING""",
+            (*scope, user_id, finished_at, finished_at)
+        ).rowcount == 1
+        # Every right-hand side sees the row as it was before this UPDATE
+        connection.execute(
+            """UPDATE learner_stats
+               SET attempts = attempts + 1,
+                   sum_pct = sum_pct + :pct,
+                   best_at = CASE WHEN :pct > best_pct THEN :at ELSE best_at END,
+                   best_pct = MAX(best_pct, :pct),
+                   correct = correct + :correct,
+                   answered = answered + :answered,
+                   last_at = MAX(last_at, :at)
+               WHERE field_id = :field AND topic_id = :topic AND subtopic_id = :subtopic
+                     AND user_id = :user""",
+            {'pct': percentage, 'at': finished_at, 'correct': correct, 'answered': answered,
+             'field': scope[0], 'topic': scope[1], 'subtopic': scope[2], 'user': user_id}
+        )
+        connection.execute(
+            """INSERT INTO cohort_stats VALUES (?, ?, ?, 1, ?, ?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT (field_id, topic_id, subtopic_id) DO UPDATE SET
+                   attempts = attempts + 1,
+                   learners = learners + excluded.learners,
+                   sum_pct = sum_pct + excluded.sum_pct,
+                   sum_sq_pct = sum_sq_pct + excluded.sum_sq_pct,
+                   min_pct = MIN(min_pct, excluded.min_pct),
+                   max_pct = MAX(max_pct, excluded.max_pct),
+                   correct = correct + excluded.correct,
+                   answered = answered + excluded.answered,
+                   updated_at = MAX(updated_at, excluded.updated_at)""",
+            (*scope, int(new_learner), percentage, percentage * percentage, percentage, percentage,
+             correct, answered, finished_at)
+        )
+        connection.execute(
+            """INSERT INTO cohort_histogram VALUES (?, ?, ?, ?, 1)
+               ON CONFLICT (field_id, topic_id, subtopic_id, bucket) DO UPDATE SET count = count + 1""",
+            (*scope, bucket)
+        )
+
+
+def _quantile(histogram: Sequence[int], total: int, q: float) -> float:
+    """Nearest-rank quantile: the bucket holding the ceil(q * total)-th smallest score"""
+    target = max(1, math.ceil(q * total))
+    seen = 0
+    for bucket, count in enumerate(histogram):
+        seen += count
+        if seen >= target:
+            return float(bucket)
+    return 100.0
+
+
+def get_cohort_stats(connection: sqlite3.Connection, scope: Scope = OVERALL,
+                     percentiles: Sequence[int] = (25, 50, 75, 90)) -> Optional[CohortStats]:
+    row = connection.execute(
+        """SELECT attempts, learners, sum_pct, sum_sq_pct, min_pct, max_pct, correct, answered
+           FROM cohort_stats WHERE field_id = ? AND topic_id = ? AND subtopic_id = ?""",
+        scope
+    ).fetchone()
+    if row is None:
+        return None
+    attempts, learners, sum_pct, sum_sq_pct, min_pct, max_pct, correct, answered = tuple(row)
+    histogram = [0] * 101
+    for bucket, count in connection.execute(
+        """SELECT bucket, count FROM cohort_histogram
+           WHERE field_id = ? AND topic_id = ? AND subtopic_id = ?""",
+        scope
+    ):
+        histogram[bucket] = count
+    mean = sum_pct / attempts
+    return CohortStats(
+        attempts=attempts,
+        learners=learners,
+        mean=mean,
+        stddev=math.sqrt(max(0.0, sum_sq_pct / attempts - mean * mean)),
+        minimum=min_pct,
+        maximum=max_pct,
+        accuracy=correct / answered * 100 if answered else 0.0,
+        percentiles={p: _quantile(histogram, attempts, p / 100) for p in percentiles},
+        histogram=tuple(histogram)
+    )
+
+
+def get_top_learners(connection: sqlite3.Connection, scope: Scope = OVERALL, limit: int = 10,
+                     order: str = 'best') -> List[LeaderboardEntry]:
+    """The first `limit` learners of a scope, read straight from the ordering's index"""
+    rows = connection.execute(
+        f"""SELECT user_id, attempts, best_pct, sum_pct, correct, answered FROM learner_stats
+            WHERE field_id = ? AND topic_id = ? AND subtopic_id = ?
+            ORDER BY {ORDER_BY[order]} LIMIT ?""",
+        (*scope, limit)
+    ).fetchall()
+    return [
+        LeaderboardEntry(rank, user_id, attempts, best_pct, sum_pct / attempts, correct, answered)
+        for rank, (user_id, attempts, best_pct, sum_pct, correct, answered) in enumerate(rows, start=1)
+    ]
+
+
+def get_learner_rank(connection: sqlite3.Connection, user_id: str, scope: Scope = OVERALL,
+                     order: str = 'best') -> Optional[int]:
+    """1-based position of a learner in a scope's leaderboard, or None if they have no attempts there"""
+    row = connection.execute(
+        """SELECT best_pct, best_at, correct, last_at FROM learner_stats
+           WHERE field_id = ? AND topic_id = ? AND subtopic_id = ? AND user_id = ?""",
+        (*scope, user_id)
+    ).fetchone()
+    if row is None:
+        return None
+    best_pct, best_at, correct, last_at = tuple(row)
+    # Learners ahead under ORDER_BY, so the rank matches the position in get_top_learners
+    if order == 'best':
+        ahead = "best_pct > ? OR (best_pct = ? AND (best_at < ? OR (best_at = ? AND user_id < ?)))"
+        params = (best_pct, best_pct, best_at, best_at, user_id)
+    else:
+        ahead = "correct > ? OR (correct = ? AND (last_at < ? OR (last_at = ? AND user_id < ?)))"
+        params = (correct, correct, last_at, last_at, user_id)
+    return 1 + connection.execute(
+        f"""SELECT COUNT(*) FROM learner_stats
+            WHERE field_id = ? AND topic_id = ? AND subtopic_id = ? AND ({ahead})""",
+        (*scope, *params)
+    ).fetchone()[0]
+
+
+def get_scopes(connection: sqlite3.Connection) -> List[Tuple[Scope, int]]:
+    """Every subtopic with finished quizzes and its attempt count, most attempted first"""
+    rows = connection.execute(
+        """SELECT field_id, topic_id, subtopic_id, attempts FROM cohort_stats
+           WHERE subtopic_id != '' ORDER BY attempts DESC"""
+    ).fetchall()
+    return [((field_id, topic_id, subtopic_id), attempts) for field_id, topic_id, subtopic_id, attempts in rows]
@@ -0,0 +1,240 @@
+"""
+Load test for the GnanaVana quiz app
+
+Simulates concurrent learners with Streamlit's AppTest: each one opens the app, goes to
+topic selection, starts a quiz on a random subtopic, answers every question, finishes
+and opens the results page. Every rerun is timed. The report (JSON) has p50/p90/p99
+rerun latency overall and per step, throughput, and memory per session.
+
+AppTest is not thread-safe, so concurrent sessions are interleaved on one thread: up
+to --concurrency sessions are open at once and take turns, one rerun each. That matches
+one Streamlit worker, whose reruns are serialized by the GIL anyway; latencies are
+per-rerun service times and throughput is what a single worker sustains.
+
+The app runs in a temporary working directory with a copy of quiz_data/, so the load
+test never writes to the real quiz_history.db or leaves a compiled bank or manifest in
+quiz_data/. AppTest reruns the whole script for clicks inside fragments, so quiz-page
+latencies are an upper bound.
+
+Usage:
+    python load_test.py [--sessions 20] [--concurrency 4] [--questions 10] [--output load_test.json]
+"""
+
+import argparse
+import json
+import os
+import random
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict, deque
+from typing import Dict, Iterator, List, Optional
+
+from streamlit.testing.v1 import AppTest
+
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_PATH = os.path.join(APP_DIR, "app.py")
+LINKED_FILES = ["GnanaVana just logo.png", ".streamlit"]  # Read-only, so linked rather than copied
+
+
+class Learner:
+    """One simulated browser session driving the app through AppTest"""
+    
+    def __init__(self, questions: int, seed: int, timeout: float):
+        self.questions = questions
+        self.rng = random.Random(seed)
+        self.at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+        self.timings: Dict[str, List[float]] = defaultdict(list)
+        self.answers = 0
+    
+    def _run(self, step: str, action=None) -> None:
+        """Time one rerun, triggered by `action` (a widget interaction) or a plain run"""
+        start = time.perf_counter()
+        (action or self.at).run()
+        self.timings[step].append(time.perf_counter() - start)
+        if self.at.exception:
+            raise RuntimeError(f"{step}: {self.at.exception[0].value}")
+    
+    def _button(self, label: str, sidebar: bool = False):
+        buttons = self.at.sidebar.button if sidebar else self.at.button
+        return next(b for b in buttons if b.label == label)
+    
+    def journey(self) -> Iterator[str]:
+        """Walk through one quiz, yielding after every rerun so sessions can be interleaved"""
+        self._run('home')
+        yield 'home'
+        self._run('select_topic', self._button("Start Quiz", sidebar=True).click())
+        yield 'select_topic'
+        self._run('configure', self.at.slider[0].set_value(self.questions))
+        yield 'configure'
+        
+        subtopic_buttons = [b for b in self.at.button if b.key and b.key.startswith('quiz_')]
+        self._run('start_quiz', self.rng.choice(subtopic_buttons).click())
+        yield 'start_quiz'
+        
+        while self.at.session_state.current_page == 'quiz':
+            quiz = self.at.session_state.learner_session.current_quiz
+            index = quiz.current_question_index
+            choice = self.rng.randrange(len(quiz.questions[index].options))
+            self.at.radio(key=f"option_{index}").set_value(choice)
+            self._run('answer', self._button("Submit Answer").click())
+            self.answers += 1
+            yield 'answer'
+            if index < quiz.total_questions - 1:
+                self._run('next_question', self._button("Next Question").click())
+                yield 'next_question'
+            else:
+                self._run('finish_quiz', self._button("Finish Quiz").click())
+                yield 'finish_quiz'
+        
+        self._run('results', self._button("Results", sidebar=True).click())
+        yield 'results'
+    
+    def run_journey(self) -> None:
+        for _ in self.journey():
+            pass
+
+
+def percentiles(samples: List[float]) -> dict:
+    """p50/p90/p99/max/mean of latencies in milliseconds"""
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+    
+    def at(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))] * 1000
+    
+    return {
+        'count': len(ordered),
+        'p50': round(at(0.50), 2),
+        'p90': round(at(0.90), 2),
+        'p99': round(at(0.99), 2),
+        'max': round(ordered[-1] * 1000, 2),
+        'mean': round(statistics.fmean(ordered) * 1000, 2)
+    }
+
+
+def measure_session_memory(sessions: int, questions: int, timeout: float) -> Optional[float]:
+    """
+    Traced Python memory (KiB) retained per finished session, measured separately from
+    latency. It includes AppTest's own element tree, so it is an upper bound.
+    """
+    if sessions <= 0:
+        return None
+    # Warm up shared caches (repository, bank, markup) so they are not charged to sessions
+    Learner(questions, 0, timeout).run_journey()
+    
+    tracemalloc.start()
+    baseline = tracemalloc.take_snapshot()
+    learners = []  # Keep sessions alive so their state is still allocated at the snapshot
+    for i in range(sessions):
+        learner = Learner(questions, 10_000 + i, timeout)
+        learner.run_journey()
+        learners.append(learner)
+    retained = sum(stat.size_diff for stat in tracemalloc.take_snapshot().compare_to(baseline, 'filename'))
+    tracemalloc.stop()
+    return round(retained / sessions / 1024, 1)
+
+
+def run_load_test(sessions: int, concurrency: int, questions: int, timeout: float,
+                  memory_sessions: int, seed: int) -> dict:
+    timings: Dict[str, List[float]] = defaultdict(list)
+    errors: List[str] = []
+    answers = 0
+    
+    # One untimed session loads the bank and fills process-wide caches, like a warm worker
+    Learner(questions, seed - 1, timeout).run_journey()
+    
+    pending = deque(range(sessions))
+    active: deque = deque()
+    start = time.perf_counter()
+    while pending or active:
+        while pending and len(active) < concurrency:
+            i = pending.popleft()
+            learner = Learner(questions, seed + i, timeout)
+            active.append((i, learner, learner.journey()))
+        
+        i, learner, steps = active.popleft()
+        try:
+            next(steps)
+            active.append((i, learner, steps))
+            continue
+        except StopIteration:
+            pass
+        except Exception as e:  # Report and keep going; one failed session should not stop the run
+            errors.append(f"session {i}: {e!r}")
+        for step, samples in learner.timings.items():
+            timings[step].extend(samples)
+        answers += learner.answers
+    elapsed = time.perf_counter() - start
+    
+    all_reruns = [sample for samples in timings.values() for sample in samples]
+    return {
+        'config': {
+            'sessions': sessions,
+            'concurrency': concurrency,
+            'questions_per_quiz': questions,
+            'seed': seed,
+            'python': sys.version.split()[0]
+        },
+        'elapsed_seconds': round(elapsed, 3),
+        'throughput': {
+            'reruns_per_second': round(len(all_reruns) / elapsed, 2),
+            'answers_per_second': round(answers / elapsed, 2),
+            'quizzes_per_second': round((sessions - len(errors)) / elapsed, 3)
+        },
+        'latency_ms': percentiles(all_reruns),
+        'latency_ms_by_step': {step: percentiles(samples) for step, samples in sorted(timings.items())},
+        'memory': {
+            'per_session_kib': measure_session_memory(memory_sessions, questions, timeout),
+            'max_rss_mib': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+        },
+        'errors': errors
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Simulate concurrent learners against app.py")
+    parser.add_argument("--sessions", type=int, default=20, help="Number of simulated learners")
+    parser.add_argument("--concurrency", type=int, default=4,
+                        help="Learners with an open session at the same time (interleaved)")
+    parser.add_argument("--questions", type=int, default=10, help="Questions per quiz (5-50)")
+    parser.add_argument("--memory-sessions", type=int, default=5,
+                        help="Sessions used to measure memory per session (0 to skip)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Seconds allowed per rerun")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default=None, help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+    
+    workdir = tempfile.mkdtemp(prefix="gnanavana-load-")
+    cwd = os.getcwd()
+    try:
+        # Copied without generated dot-files; the app compiles its own bank in the copy
+        shutil.copytree(os.path.join(APP_DIR, "quiz_data"), os.path.join(workdir, "quiz_data"),
+                        ignore=shutil.ignore_patterns('.*'))
+        for name in LINKED_FILES:
+            if os.path.exists(os.path.join(APP_DIR, name)):
+                os.symlink(os.path.join(APP_DIR, name), os.path.join(workdir, name))
+        os.chdir(workdir)
+        report = run_load_test(args.sessions, args.concurrency, args.questions, args.timeout,
+                               args.memory_sessions, args.seed)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+    
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+    return 1 if report['errors'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,312 @@
+"""
+Lightweight timing and counter instrumentation for GnanaVana
+
+Hot paths are wrapped with `timed` (functions) or `span` (blocks), caches report hits
+and misses with `increment`, and each rerun records an estimate of its session's
+memory. Everything is aggregated in one process-wide registry that can be exported as
+Prometheus text or JSON, served on a local HTTP port and shown on the app's Metrics page.
+
+Instrumentation is off unless GNANAVANA_METRICS=1 is set before the app starts. When
+it is off, `timed` returns the function unchanged, `span` returns a shared no-op context
+manager and `increment` returns immediately, so the overhead is a flag check at most.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+
+from models import Field, Question, Subtopic, Topic
+
+
+ENABLED = os.environ.get("GNANAVANA_METRICS", "").lower() in ("1", "true", "yes", "on")
+# Local port of the /metrics endpoint while instrumentation is on; 0 disables the server
+METRICS_PORT = int(os.environ.get("GNANAVANA_METRICS_PORT", "9464"))
+
+PREFIX = "gnanavana"
+
+# Upper bounds of the latency histogram buckets, in seconds
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Sessions whose latest memory estimate is kept for the Metrics page
+MAX_TRACKED_SESSIONS = 1000
+
+# Shared bank objects are referenced by many sessions and not charged to any of them
+SHARED_TYPES = (Question, Subtopic, Topic, Field)
+
+_DISABLED_SPAN = nullcontext()
+
+
+class Timer:
+    """Count, total, maximum and histogram of one timed operation"""
+    
+    __slots__ = ('count', 'total', 'maximum', 'buckets')
+    
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+        self.buckets = [0] * (len(BUCKETS) + 1)  # Last bucket is +Inf
+    
+    def observe(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.maximum = max(self.maximum, seconds)
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+                return
+        self.buckets[-1] += 1
+    
+    def quantile(self, q: float) -> float:
+        """Upper bucket bound below which a fraction q of the observations fall"""
+        target = q * self.count
+        seen = 0
+        for i, count in enumerate(self.buckets[:-1]):
+            seen += count
+            if seen >= target:
+                return BUCKETS[i]
+        return self.maximum
+
+
+class MetricsRegistry:
+    """Thread-safe store of timers, counters and gauges shared by every session"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        self.timers: Dict[str, Timer] = {}
+        self.counters: Dict[str, int] = {}
+        self.gauges: Dict[str, Callable[[], float]] = {}
+        self.session_bytes: "OrderedDict[str, int]" = OrderedDict()
+    
+    def observe(self, name: str, seconds: float) -> None:
+        with self._lock:
+            timer = self.timers.get(name)
+            if timer is None:
+                timer = self.timers[name] = Timer()
+            timer.observe(seconds)
+    
+    def increment(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+    
+    def register_gauge(self, name: str, read: Callable[[], float]) -> None:
+        """Gauge whose value is read when metrics are exported, e.g. a cache size"""
+        with self._lock:
+            self.gauges[name] = read
+    
+    def record_session(self, session_id: str, size: int) -> None:
+        with self._lock:
+            self.session_bytes[session_id] = size
+            self.session_bytes.move_to_end(session_id)
+            while len(self.session_bytes) > MAX_TRACKED_SESSIONS:
+                self.session_bytes.popitem(last=False)
+    
+    def _gauge_values(self) -> Dict[str, float]:
+        """
+        Read every gauge. Called without the registry lock held: gauges may take other
+        locks (e.g. the repository's) whose holders call increment().
+        """
+        with self._lock:
+            gauges = list(self.gauges.items())
+            sizes = list(self.session_bytes.values())
+        values = {}
+        for name, read in gauges:
+            try:
+                values[name] = float(read())
+            except Exception:  # A failing gauge must not break the export
+                continue
+        values['sessions.tracked'] = len(sizes)
+        values['sessions.memory_bytes_total'] = sum(sizes)
+        values['sessions.memory_bytes_max'] = max(sizes, default=0)
+        return values
+    
+    def snapshot(self) -> dict:
+        """Everything recorded so far as plain data, for JSON and the Metrics page"""
+        gauges = self._gauge_values()
+        with self._lock:
+            timers = {
+                name: {
+                    'count': timer.count,
+                    'total_ms': round(timer.total * 1000, 3),
+                    'mean_ms': round(timer.total / timer.count * 1000, 3) if timer.count else 0.0,
+                    'p50_ms': round(timer.quantile(0.5) * 1000, 3),
+                    'p90_ms': round(timer.quantile(0.9) * 1000, 3),
+                    'max_ms': round(timer.maximum * 1000, 3)
+                }
+                for name, timer in sorted(self.timers.items())
+            }
+            return {
+                'enabled': ENABLED,
+                'uptime_seconds': round(time.time() - self.started_at, 1),
+                'timers': timers,
+                'counters': dict(sorted(self.counters.items())),
+                'gauges': dict(sorted(gauges.items())),
+                'sessions': dict(self.session_bytes)
+            }
+    
+    def to_prometheus(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines: List[str] = []
+        gauges = self._gauge_values()
+        with self._lock:
+            for name, timer in sorted(self.timers.items()):
+                metric = f"{PREFIX}_{_metric_name(name)}_seconds"
+                lines.append(f"# TYPE {metric} histogram")
+                cumulative = 0
+                for bound, count in zip(BUCKETS, timer.buckets):
+                    cumulative += count
+                    lines.append(f'{metric}_bucket{{le="{bound}"}} {cumulative}')
+                lines.append(f'{metric}_bucket{{le="+Inf"}} {timer.count}')
+                lines.append(f"{metric}_sum {timer.total:.6f}")
+                lines.append(f"{metric}_count {timer.count}")
+            for name, value in sorted(self.counters.items()):
+                metric = f"{PREFIX}_{_metric_name(name)}_total"
+                lines.append(f"# TYPE {metric} counter")
+                lines.append(f"{metric} {value}")
+            for name, value in sorted(gauges.items()):
+                metric = f"{PREFIX}_{_metric_name(name)}"
+                lines.append(f"# TYPE {metric} gauge")
+                lines.append(f"{metric} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+def _metric_name(name: str) -> str:
+    return name.replace('.', '_').replace('-', '_')
+
+
+REGISTRY = MetricsRegistry()
+
+
+def timed(name: str) -> Callable:
+    """Decorator recording the duration of every call; returns the function as is when disabled"""
+    def decorate(func: Callable) -> Callable:
+        if not ENABLED:
+            return func
+        
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                REGISTRY.observe(name, time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+
+@contextmanager
+def _span(name: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        REGISTRY.observe(name, time.perf_counter() - start)
+
+
+def span(name: str):
+    """Context manager timing a block, e.g. building one chart"""
+    return _span(name) if ENABLED else _DISABLED_SPAN
+
+
+def increment(name: str, amount: int = 1) -> None:
+    """Add to a counter, e.g. a cache hit"""
+    if ENABLED:
+        REGISTRY.increment(name, amount)
+
+
+def register_gauge(name: str, read: Callable[[], float]) -> None:
+    if ENABLED:
+        REGISTRY.register_gauge(name, read)
+
+
+def estimate_size(obj, seen: Optional[set] = None) -> int:
+    """
+    Approximate deep size in bytes of a session's objects.
+
+    Containers, dataclasses and slotted objects are followed; NumPy arrays count their
+    buffers. Questions and hierarchy objects belong to the shared bank and count zero,
+    so a ShuffledQuestion is charged for its permutation only.
+    """
+    seen = set() if seen is None else seen
+    if id(obj) in seen or isinstance(obj, SHARED_TYPES) or isinstance(obj, type):
+        return 0
+    seen.add(id(obj))
+    
+    if isinstance(obj, np.ndarray):
+        size = sys.getsizeof(obj)
+        if obj.dtype == object:
+            size += sum(estimate_size(item, seen) for item in obj.ravel())
+        return size
+    
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(estimate_size(k, seen) + estimate_size(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(item, seen) for item in obj)
+    elif isinstance(obj, (str, bytes, int, float, bool)) or obj is None:
+        pass
+    else:
+        if hasattr(obj, '__dict__'):
+            size += estimate_size(vars(obj), seen)
+        for slot in getattr(type(obj), '__slots__', ()):
+            if hasattr(obj, slot):
+                size += estimate_size(getattr(obj, slot), seen)
+    return size
+
+
+def record_session_memory(session_id: str, state) -> None:
+    """Record the estimated memory held by one session's state"""
+    if not ENABLED:
+        return
+    with span("session.memory_estimate"):
+        size = sum(estimate_size(value) for value in state.to_dict().values())
+    REGISTRY.record_session(session_id, size)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """GET /metrics (Prometheus text) and /metrics.json"""
+    
+    def do_GET(self):
+        if self.path.split('?')[0] == '/metrics':
+            body = REGISTRY.to_prometheus().encode('utf-8')
+            content_type = 'text/plain; version=0.0.4; charset=utf-8'
+        elif self.path.split('?')[0] == '/metrics.json':
+            body = json.dumps(REGISTRY.snapshot()).encode('utf-8')
+            content_type = 'application/json'
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        pass  # Scrapes every few seconds would flood the app's log
+
+
+def start_metrics_server() -> Optional[ThreadingHTTPServer]:
+    """
+    Start the local metrics endpoint on 127.0.0.1:GNANAVANA_METRICS_PORT.
+
+    Returns None when instrumentation is off, the port is 0 or already in use.
+    """
+    if not ENABLED or not METRICS_PORT:
+        return None
+    try:
+        server = ThreadingHTTPServer(('127.0.0.1', METRICS_PORT), _MetricsHandler)
+    except OSError:
+        return None  # Another process (or a second app instance) owns the port
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
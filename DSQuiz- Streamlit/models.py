@@ -3,10 +3,21 @@ Data models for GnanaVana Quiz Application
 Mirrors the Android app's data structure
 """
 
+from array import array
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import List, Optional, Sequence, Tuple
 from enum import Enum
 import random
+import sys
+
+
+# Entry of QuizSession.user_answers for a question that has not been answered yet
+UNANSWERED = -1
+
+
+def new_answer_array(count: int) -> array:
+    """One signed byte per question, all UNANSWERED"""
+    return array('b', [UNANSWERED]) * count
 
 
 class QuestionDifficulty(Enum):
@@ -15,47 +26,121 @@ class QuestionDifficulty(Enum):
     HARD = "HARD"
 
 
-@dataclass
+@dataclass(frozen=True)
 class Question:
-    """Represents a multiple-choice question in GnanaVana"""
+    """
+    Represents a multiple-choice question in GnanaVana
+
+    Questions are shared by every session, so they are immutable and slotted: options,
+    option explanations and tags are stored as tuples (lists are converted on
+    construction) and tags are interned, since the same labels repeat across the bank.
+    """
+    __slots__ = ('id', 'question', 'options', 'correct_option_index', 'explanation',
+                 'option_explanations', 'difficulty', 'tags')
+    
     id: str
     question: str
-    options: List[str]
+    options: Tuple[str, ...]
     correct_option_index: int
     explanation: str
-    option_explanations: List[str]
+    option_explanations: Tuple[str, ...]
     difficulty: QuestionDifficulty
-    tags: List[str]
-    
-    def shuffle_options(self) -> 'Question':
-        """Returns a shuffled version of this question with options in random order"""
-        shuffled_indices = list(range(len(self.options)))
-        random.shuffle(shuffled_indices)
-        
-        shuffled_options = [self.options[i] for i in shuffled_indices]
-        shuffled_explanations = []
-        if len(self.option_explanations) == len(self.options):
-            shuffled_explanations = [self.option_explanations[i] for i in shuffled_indices]
-        else:
-            shuffled_explanations = self.option_explanations
-            
-        new_correct_index = shuffled_indices.index(self.correct_option_index)
-        
-        return Question(
-            id=self.id,
-            question=self.question,
-            options=shuffled_options,
-            correct_option_index=new_correct_index,
-            explanation=self.explanation,
-            option_explanations=shuffled_explanations,
-            difficulty=self.difficulty,
-            tags=self.tags
-        )
+    tags: Tuple[str, ...]
+    
+    def __post_init__(self):
+        object.__setattr__(self, 'options', tuple(self.options))
+        object.__setattr__(self, 'option_explanations', tuple(self.option_explanations))
+        object.__setattr__(self, 'tags', tuple(sys.intern(tag) for tag in self.tags))
+    
+    def __reduce__(self):
+        # Frozen slotted instances cannot be restored attribute by attribute
+        return (Question, (self.id, self.question, self.options, self.correct_option_index,
+                           self.explanation, self.option_explanations, self.difficulty, self.tags))
+    
+    def shuffle_options(self, rng: Optional[random.Random] = None) -> 'ShuffledQuestion':
+        """Returns this question with options in random order, as a view sharing its data"""
+        permutation = list(range(len(self.options)))
+        (rng or random).shuffle(permutation)
+        return ShuffledQuestion(base=self, permutation=tuple(permutation))
+    
+    def original_option_index(self, option_index: int) -> int:
+        """Map a displayed option index back to its index in the quiz_data file"""
+        return option_index
+
+
+@dataclass(frozen=True)
+class ShuffledQuestion:
+    """
+    A Question presented with its options permuted
+
+    Exposes the same attributes as Question, computed through the permutation
+    (displayed position -> original option index) instead of copying the question.
+    The displayed index of the correct option is found once, when the view is created,
+    and the permuted options tuple on first use.
+    """
+    # correct_option_index and _options are derived slots, not dataclass fields
+    __slots__ = ('base', 'permutation', 'correct_option_index', '_options')
+    
+    base: Question
+    permutation: Tuple[int, ...]
+    
+    def __post_init__(self):
+        object.__setattr__(self, 'correct_option_index', self.permutation.index(self.base.correct_option_index))
+        object.__setattr__(self, '_options', None)
+    
+    def __reduce__(self):
+        return (ShuffledQuestion, (self.base, self.permutation))
+    
+    @property
+    def id(self) -> str:
+        return self.base.id
+    
+    @property
+    def question(self) -> str:
+        return self.base.question
+    
+    @property
+    def explanation(self) -> str:
+        return self.base.explanation
+    
+    @property
+    def difficulty(self) -> QuestionDifficulty:
+        return self.base.difficulty
+    
+    @property
+    def tags(self) -> Tuple[str, ...]:
+        return self.base.tags
+    
+    @property
+    def options(self) -> Tuple[str, ...]:
+        options = self._options
+        if options is None:
+            options = tuple(self.base.options[i] for i in self.permutation)
+            object.__setattr__(self, '_options', options)
+        return options
+    
+    @property
+    def option_explanations(self) -> Tuple[str, ...]:
+        explanations = self.base.option_explanations
+        if len(explanations) == len(self.permutation):
+            return tuple(explanations[i] for i in self.permutation)
+        return explanations
+    
+    def shuffle_options(self, rng: Optional[random.Random] = None) -> 'ShuffledQuestion':
+        """Returns the underlying question with a fresh option order"""
+        return self.base.shuffle_options(rng)
+    
+    def original_option_index(self, option_index: int) -> int:
+        """Map a displayed option index back to its index in the quiz_data file"""
+        return self.permutation[option_index]
 
 
 @dataclass
 class Subtopic:
     """Represents a Subtopic (Leaf) in the GnanaVana knowledge hierarchy"""
+    __slots__ = ('id', 'name', 'topic_id', 'field_id', 'str_value', 'description',
+                 'total_questions', 'file_name', 'questions')
+    
     id: str
     name: str
     topic_id: str
@@ -64,7 +149,7 @@ class Subtopic:
     description: str
     total_questions: int
     file_name: str
-    questions: List[Question]
+    questions: Sequence[Question]
 
 
 @dataclass
@@ -94,10 +179,12 @@ class QuizSession:
     subtopic_id: str
     questions: List[Question]
     current_question_index: int
-    user_answers: List[Optional[int]]
+    user_answers: array  # Chosen option (as displayed) per question, or UNANSWERED
     correct_answers: int
     total_questions: int
     is_completed: bool
+    seed: Optional[int] = None  # Reproduces the question sample and option order
+    question_subtopics: Optional[List[Subtopic]] = None  # Subtopic of each question in a mixed quiz
     
     def get_current_question(self) -> Optional[Question]:
         """Get the current question"""
@@ -105,6 +192,9 @@ class QuizSession:
             return self.questions[self.current_question_index]
         return None
     
+    def is_answered(self, index: int) -> bool:
+        return self.user_answers[index] != UNANSWERED
+    
     def answer_question(self, answer_index: int) -> bool:
         """Answer the current question and return if correct"""
         if self.current_question_index < len(self.questions):
@@ -142,4 +232,5 @@ class QuizResult:
     percentage: float
     time_taken: Optional[str]
     difficulty_breakdown: dict
-    incorrect_questions: List[Question] 
\ No newline at end of file
+    incorrect_question_ids: List[str]
+    attempt_id: Optional[int] = None 
\ No newline at end of file
@@ -0,0 +1,185 @@
+"""
+Near-duplicate question detection for GnanaVana
+
+Every question is reduced to a set of word shingles over its question and option text
+and summarized by a MinHash signature. Locality-sensitive hashing over bands of the
+signatures only pairs up questions that share a band, so the work grows with the number
+of questions instead of with the number of pairs. Candidate pairs are then checked
+against the exact Jaccard similarity of their shingle sets.
+
+Usage:
+    python near_duplicates.py [--data-dir quiz_data] [--threshold 0.6] [--output near_duplicates.json]
+"""
+
+import json
+import re
+import zlib
+from collections import defaultdict
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Sequence, Set, Tuple
+
+import numpy as np
+
+from models import Question
+from quiz_schema import QuizFile, load_quiz_files, report_skipped_files
+
+
+SHINGLE_SIZE = 3
+NUM_PERMUTATIONS = 128
+DEFAULT_THRESHOLD = 0.6
+
+_SHIFT = np.uint64(32)
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+@dataclass(frozen=True)
+class QuestionRef:
+    """Where a question lives in quiz_data/"""
+    file_name: str
+    index: int
+    question_id: str
+    subtopic_id: str
+    text: str
+
+
+@dataclass(frozen=True)
+class DuplicatePair:
+    first: QuestionRef
+    second: QuestionRef
+    similarity: float  # Jaccard similarity of the shingle sets
+
+
+def shingles(question: Question, size: int = SHINGLE_SIZE) -> Set[int]:
+    """32-bit hashes of the word n-grams of the question text and its options"""
+    shingle_set: Set[int] = set()
+    for text in (question.question, *question.options):
+        words = _WORD.findall(text.lower())
+        if len(words) < size:
+            words = words + [''] * (size - len(words))  # Short options still count once
+        for i in range(len(words) - size + 1):
+            shingle_set.add(zlib.crc32(' '.join(words[i:i + size]).encode('utf-8')))
+    return shingle_set
+
+
+def choose_bands(threshold: float, num_permutations: int = NUM_PERMUTATIONS) -> Tuple[int, int]:
+    """
+    Pick (bands, rows) so the LSH S-curve rises well below the threshold.
+
+    Two questions with similarity s become candidates with probability
+    1 - (1 - s^rows)^bands, which is about one half at s = (1 / bands)^(1 / rows).
+    Aiming that midpoint at 70% of the threshold keeps false negatives rare; the
+    exact Jaccard check removes the extra candidates.
+    """
+    options = [(num_permutations // rows, rows) for rows in range(1, num_permutations + 1)]
+    target = threshold * 0.7
+    return min(options, key=lambda option: abs((1 / option[0]) ** (1 / option[1]) - target))
+
+
+class MinHasher:
+    """
+    Vectorized MinHash over a fixed family of random hash functions.
+
+    Each function is multiply-shift hashing, h(x) = ((a * x + b) mod 2^64) >> 32 with a
+    random odd a, which relies on uint64 arithmetic wrapping around.
+    """
+    
+    def __init__(self, num_permutations: int = NUM_PERMUTATIONS, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(0, np.iinfo(np.uint64).max, size=num_permutations, dtype=np.uint64) | np.uint64(1)
+        self.b = rng.integers(0, np.iinfo(np.uint64).max, size=num_permutations, dtype=np.uint64)
+    
+    def signature(self, shingle_set: Set[int]) -> np.ndarray:
+        if not shingle_set:
+            return np.full(len(self.a), np.iinfo(np.uint32).max, dtype=np.uint64)
+        x = np.fromiter(shingle_set, dtype=np.uint64, count=len(shingle_set))
+        hashes = (self.a[:, None] * x[None, :] + self.b[:, None]) >> _SHIFT
+        return hashes.min(axis=1)
+
+
+def find_near_duplicates(refs: Sequence[QuestionRef], shingle_sets: Sequence[Set[int]],
+                         threshold: float = DEFAULT_THRESHOLD,
+                         num_permutations: int = NUM_PERMUTATIONS) -> List[DuplicatePair]:
+    """Pairs of questions whose shingle sets have Jaccard similarity >= threshold"""
+    hasher = MinHasher(num_permutations)
+    signatures = np.stack([hasher.signature(s) for s in shingle_sets]) if shingle_sets else np.empty((0, num_permutations))
+    bands, rows = choose_bands(threshold, num_permutations)
+    
+    candidates: Set[Tuple[int, int]] = set()
+    for band in range(bands):
+        buckets: Dict[bytes, List[int]] = defaultdict(list)
+        band_values = signatures[:, band * rows:(band + 1) * rows]
+        for i, values in enumerate(band_values):
+            buckets[values.tobytes()].append(i)
+        for members in buckets.values():
+            for j, first in enumerate(members):
+                for second in members[j + 1:]:
+                    candidates.add((first, second))
+    
+    pairs = []
+    for first, second in candidates:
+        a, b = shingle_sets[first], shingle_sets[second]
+        similarity = len(a & b) / len(a | b) if a or b else 1.0
+        if similarity >= threshold:
+            pairs.append(DuplicatePair(refs[first], refs[second], round(similarity, 4)))
+    pairs.sort(key=lambda pair: (-pair.similarity, pair.first.question_id, pair.second.question_id))
+    return pairs
+
+
+def load_questions(quiz_files: Sequence[QuizFile]) -> Tuple[List[QuestionRef], List[Set[int]]]:
+    """Shingle every question of the quiz files"""
+    refs: List[QuestionRef] = []
+    shingle_sets: List[Set[int]] = []
+    for quiz_file in quiz_files:
+        for index, question in enumerate(quiz_file.questions):
+            refs.append(QuestionRef(quiz_file.file_name, index, question.id, quiz_file.subtopic_id, question.question))
+            shingle_sets.append(shingles(question))
+    return refs, shingle_sets
+
+
+def build_report(refs: Sequence[QuestionRef], pairs: Sequence[DuplicatePair], threshold: float) -> dict:
+    """Summary counts plus every pair, ready to be written as JSON"""
+    files_involved: Dict[str, int] = defaultdict(int)
+    for pair in pairs:
+        files_involved[pair.first.file_name] += 1
+        if pair.second.file_name != pair.first.file_name:
+            files_involved[pair.second.file_name] += 1
+    return {
+        'threshold': threshold,
+        'questions': len(refs),
+        'pairs': len(pairs),
+        'crossFilePairs': sum(pair.first.file_name != pair.second.file_name for pair in pairs),
+        'pairsByFile': dict(sorted(files_involved.items(), key=lambda item: -item[1])),
+        'duplicates': [asdict(pair) for pair in pairs]
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+    import time
+    
+    parser = argparse.ArgumentParser(description="Report near-duplicate questions across quiz_data files")
+    parser.add_argument("--data-dir", default="quiz_data", help="Directory containing the quiz JSON files")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Minimum Jaccard similarity of question and option shingles")
+    parser.add_argument("--permutations", type=int, default=NUM_PERMUTATIONS, help="MinHash signature length")
+    parser.add_argument("--output", default="near_duplicates.json", help="Where to write the JSON report")
+    args = parser.parse_args()
+    
+    start = time.perf_counter()
+    # Read the JSON files directly: a QuizRepository would write its bank and manifest into data_dir
+    quiz_files, skipped = load_quiz_files(args.data_dir)
+    refs, shingle_sets = load_questions(quiz_files)
+    pairs = find_near_duplicates(refs, shingle_sets, args.threshold, args.permutations)
+    report = build_report(refs, pairs, args.threshold)
+    report['skippedFiles'] = report_skipped_files(skipped)
+    with open(args.output, 'w', encoding='utf-8') as file:
+        json.dump(report, file, indent=2, ensure_ascii=False)
+    
+    print(f"Compared {report['questions']} questions in {time.perf_counter() - start:.1f}s: "
+          f"{report['pairs']} near-duplicate pairs ({report['crossFilePairs']} across files)")
+    for pair in pairs[:10]:
+        print(f"  {pair.similarity:.2f}  {pair.first.question_id} ({pair.first.file_name}) ~ "
+              f"{pair.second.question_id} ({pair.second.file_name})")
+    print(f"Report written to {args.output}")
+    sys.exit(1 if skipped else 0)
@@ -0,0 +1,103 @@
+"""
+Pre-rendered quiz question markup for GnanaVana
+
+The quiz page shows the same question on every rerun until it is answered, and every
+learner who gets the same question and option order sees identical text. The markdown
+for a question is therefore built once and shared by all sessions through a bounded
+process-wide cache keyed by the question and its option permutation.
+"""
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Hashable, Optional, Tuple
+
+import streamlit as st
+
+from metrics import register_gauge
+from models import Question
+
+
+DEFAULT_MAX_CACHED_QUESTIONS = 4096
+
+
+@dataclass(frozen=True)
+class QuestionMarkup:
+    """Everything the quiz page renders for one question, ready to hand to Streamlit"""
+    heading: str
+    option_labels: Tuple[str, ...]  # "A. ..." in display order
+    explanation: str  # Explanation followed by the option explanations, as one markdown block
+
+
+def build_question_markup(question: Question) -> QuestionMarkup:
+    """Format the heading, option labels and explanation of a question in display order"""
+    option_labels = tuple(f"{chr(65 + i)}. {option}" for i, option in enumerate(question.options))
+    
+    explanation = question.explanation
+    option_explanations = [
+        f"**{chr(65 + i)}.** {text}" for i, text in enumerate(question.option_explanations) if text
+    ]
+    if option_explanations:
+        explanation += "\n\n**Option Explanations:**\n\n" + "\n\n".join(option_explanations)
+    
+    return QuestionMarkup(
+        heading=f"### {question.question}",
+        option_labels=option_labels,
+        explanation=explanation
+    )
+
+
+class QuestionMarkupCache:
+    """Thread-safe LRU of QuestionMarkup shared by every session in the process"""
+    
+    def __init__(self, max_size: int = DEFAULT_MAX_CACHED_QUESTIONS):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, QuestionMarkup]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def key(question: Question) -> Hashable:
+        """
+        The underlying question itself plus the option permutation. Questions are frozen
+        and compare by value, so an edited (hot-reloaded) question or a duplicated ID
+        never serves another question's text.
+        """
+        permutation: Optional[Tuple[int, ...]] = getattr(question, 'permutation', None)
+        return getattr(question, 'base', question), permutation
+    
+    def get(self, question: Question) -> QuestionMarkup:
+        key = self.key(question)
+        with self._lock:
+            markup = self._entries.get(key)
+            if markup is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return markup
+        
+        markup = build_question_markup(question)
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = markup
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return markup
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+@st.cache_resource(show_spinner=False)
+def get_shared_markup_cache() -> QuestionMarkupCache:
+    """Get the process-wide question markup cache shared by every session"""
+    cache = QuestionMarkupCache()
+    register_gauge("markup_cache.size", cache.__len__)
+    register_gauge("markup_cache.hits", lambda: cache.hits)
+    register_gauge("markup_cache.misses", lambda: cache.misses)
+    return cache
+
+
+def get_question_markup(question: Question) -> QuestionMarkup:
+    """Get the markup of a question (Question or ShuffledQuestion) from the shared cache"""
+    return get_shared_markup_cache().get(question)
@@ -0,0 +1,321 @@
+"""
+Adaptive question selection for GnanaVana
+
+Per-question parameters are precomputed from the attempt store into NumPy arrays:
+difficulty b (logit of the smoothed error rate, shrunk towards the authored EASY/MEDIUM/
+HARD label) and discrimination a (from the point-biserial correlation between answering
+an item correctly and the quiz score). Picking a quiz is then a handful of vectorized
+operations over the candidate questions:
+
+1. Questions the learner has seen and that are due again under a Leitner spaced
+   repetition schedule come first, most overdue first.
+2. Unseen questions follow, ordered by 2PL item information at the learner's estimated
+   ability, so the quiz targets what they are ready to learn.
+3. Seen questions that are not due yet only fill the remaining slots.
+
+Item statistics and each learner's schedule are running sums, advanced with only the
+answers saved since they were last read.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import streamlit as st
+
+from attempt_store import AttemptStore, ItemKey
+from metrics import timed
+from models import Question, QuestionDifficulty
+from streamlit_resources import get_shared_attempt_store
+
+
+DAY = 24 * 60 * 60
+
+# Leitner box -> seconds until a question is due again; a wrong answer resets to box 0
+REVIEW_INTERVALS = np.array([0, 1, 3, 7, 21, 60], dtype=np.float64) * DAY
+
+# Authored difficulty labels as a prior on b, worth this many observed answers
+DIFFICULTY_PRIOR = {
+    QuestionDifficulty.EASY: -1.0,
+    QuestionDifficulty.MEDIUM: 0.0,
+    QuestionDifficulty.HARD: 1.0
+}
+PRIOR_WEIGHT = 5.0
+
+# Learners whose spaced-repetition state is kept in memory per process
+DEFAULT_MAX_LEARNERS = 1000
+
+# Discrimination is only estimated once an item has this many answers
+MIN_ANSWERS_FOR_DISCRIMINATION = 10
+DEFAULT_DISCRIMINATION = 1.0
+
+
+@dataclass(frozen=True)
+class ItemParameters:
+    """
+    One immutable version of the item statistics.
+
+    ItemStats.update() builds a new one and swaps it in with a single assignment, so
+    parameters() never sees an index that is ahead of the arrays it points into.
+    """
+    index: Dict[ItemKey, int]
+    # Rows: answers, correct, sum of scores, sum of correct * score, sum of score^2
+    sums: np.ndarray
+    difficulty: np.ndarray
+    discrimination: np.ndarray
+    
+    @property
+    def answers(self) -> np.ndarray:
+        return self.sums[0]
+
+
+def estimate_parameters(index: Dict[ItemKey, int], sums: np.ndarray) -> ItemParameters:
+    """Difficulty and discrimination of every item from its sufficient statistics"""
+    n, sum_x, sum_y, sum_xy, sum_yy = sums
+    
+    # Empirical difficulty: logit of the Laplace-smoothed error rate
+    p_correct = (sum_x + 1) / (n + 2)
+    difficulty = np.log((1 - p_correct) / p_correct)
+    
+    # Point-biserial correlation, mapped to a 2PL discrimination
+    with np.errstate(divide='ignore', invalid='ignore'):
+        r = (n * sum_xy - sum_x * sum_y) / np.sqrt(
+            (n * sum_x - sum_x ** 2) * (n * sum_yy - sum_y ** 2)
+        )
+    r = np.clip(np.nan_to_num(r, nan=0.0), -0.95, 0.95)
+    discrimination = np.clip(1.7 * r / np.sqrt(1 - r ** 2), 0.2, 2.5)
+    discrimination[n < MIN_ANSWERS_FOR_DISCRIMINATION] = DEFAULT_DISCRIMINATION
+    
+    return ItemParameters(index, sums, difficulty, discrimination)
+
+
+class ItemStats:
+    """
+    Difficulty and discrimination for every question that appears in the history, keyed
+    by (quiz file, position) since question IDs repeat across files.
+    
+    Only per-item sufficient statistics are kept (answer count and the sums needed for
+    the point-biserial correlation), so refresh() folds in answers saved since the last
+    call without rereading the rest of the history. Answers whose quiz file is unknown
+    are skipped.
+    
+    Sessions read the current ItemParameters without locking; writers hold the lock.
+    """
+    
+    def __init__(self):
+        self.last_rowid = 0
+        self.current = estimate_parameters({}, np.zeros((5, 0)))
+        self._lock = threading.Lock()
+    
+    def refresh(self, store: AttemptStore) -> None:
+        """Fold in answers saved to the store since the last refresh"""
+        with self._lock:
+            events = store.get_answer_events(after_rowid=self.last_rowid)
+            if not events:
+                return
+            rowids, files, positions, is_correct, scores, _ = zip(*events)
+            known = [i for i, file_name in enumerate(files) if file_name is not None]
+            if known:
+                self._update([(files[i], positions[i]) for i in known],
+                             np.array(is_correct)[known], np.array(scores)[known])
+            self.last_rowid = max(rowids)
+    
+    def update(self, keys: Sequence[ItemKey], is_correct: np.ndarray, scores: np.ndarray) -> None:
+        """
+        Add answer events and re-estimate item parameters.
+        
+        keys, is_correct and scores (the percentage of the quiz the answer belongs to)
+        are parallel sequences with one entry per answer.
+        """
+        with self._lock:
+            self._update(keys, is_correct, scores)
+    
+    def _update(self, keys: Sequence[ItemKey], is_correct: np.ndarray, scores: np.ndarray) -> None:
+        current = self.current
+        index = dict(current.index)
+        for key in keys:
+            if key not in index:
+                index[key] = len(index)
+        n_items = len(index)
+        item = np.array([index[key] for key in keys], dtype=np.int64)
+        x = is_correct.astype(np.float64)
+        y = scores.astype(np.float64)
+        
+        sums = np.zeros((5, n_items))
+        sums[:, :current.sums.shape[1]] = current.sums
+        for row, weights in enumerate([None, x, y, x * y, y * y]):
+            sums[row] += np.bincount(item, weights=weights, minlength=n_items)
+        self.current = estimate_parameters(index, sums)
+    
+    def parameters(self, questions: Sequence[Question], keys: Sequence[ItemKey]) -> tuple:
+        """(a, b) arrays for the given questions, falling back to the authored label prior"""
+        current = self.current
+        prior = np.array([DIFFICULTY_PRIOR[q.difficulty] for q in questions])
+        rows = np.array([current.index.get(key, -1) for key in keys], dtype=np.int64)
+        known = rows >= 0
+        
+        a = np.full(len(questions), DEFAULT_DISCRIMINATION)
+        b = prior.copy()
+        if known.any():
+            observed = current.answers[rows[known]]
+            a[known] = current.discrimination[rows[known]]
+            b[known] = (observed * current.difficulty[rows[known]] + PRIOR_WEIGHT * prior[known]) / (
+                observed + PRIOR_WEIGHT
+            )
+        return a, b
+
+
+class LearnerState:
+    """
+    A learner's answers and spaced-repetition schedule per question.
+    
+    Each question keeps running counts (answers, correct answers, the Leitner streak of
+    correct answers since the last mistake, last answer time), so refresh() only reads
+    quizzes saved since the last call instead of the learner's whole history.
+    """
+    
+    def __init__(self, user_id: str):
+        self.user_id = user_id
+        self.last_attempt_id = 0
+        # Question -> [answers, correct, streak, last answered at]
+        self.items: Dict[ItemKey, list] = {}
+        self._lock = threading.Lock()
+    
+    def refresh(self, store: AttemptStore) -> None:
+        """Fold in the learner's quizzes saved since the last refresh"""
+        with self._lock:
+            events = store.get_learner_answers(self.user_id, after_attempt_id=self.last_attempt_id)
+            if not events:
+                return
+            for _, file_name, position, is_correct, answered_at in events:
+                if file_name is not None:  # None when the quiz file was unknown
+                    self.record((file_name, position), bool(is_correct), answered_at)
+            self.last_attempt_id = events[-1][0]
+    
+    def record(self, key: ItemKey, is_correct: bool, answered_at: float) -> None:
+        """Add one answer; a wrong one sends the question back to Leitner box 0"""
+        state = self.items.get(key)
+        if state is None:
+            state = self.items[key] = [0, 0, 0, answered_at]
+        state[0] += 1
+        state[1] += is_correct
+        state[2] = state[2] + 1 if is_correct else 0
+        state[3] = max(state[3], answered_at)
+    
+    def schedule(self, keys: Sequence[ItemKey]) -> Tuple[np.ndarray, np.ndarray]:
+        """(due_at, interval) arrays for the given questions, NaN where never answered"""
+        due_at = np.full(len(keys), np.nan)
+        interval = np.full(len(keys), np.nan)
+        for i, key in enumerate(keys):
+            state = self.items.get(key)
+            if state is not None:
+                interval[i] = REVIEW_INTERVALS[min(state[2], len(REVIEW_INTERVALS) - 1)]
+                due_at[i] = state[3] + interval[i]
+        return due_at, interval
+    
+    def estimate_ability(self, stats: ItemStats, questions: Sequence[Question], keys: Sequence[ItemKey],
+                         iterations: int = 10) -> float:
+        """MAP estimate of ability under a 2PL model with a standard normal prior"""
+        answered = [i for i, key in enumerate(keys) if key in self.items]
+        if not answered:
+            return 0.0
+        a, b = stats.parameters([questions[i] for i in answered], [keys[i] for i in answered])
+        n = np.array([self.items[keys[i]][0] for i in answered], dtype=np.float64)
+        x = np.array([self.items[keys[i]][1] for i in answered], dtype=np.float64)
+        
+        # Repeated answers to a question share its (a, b), so they enter as counts
+        theta = 0.0
+        for _ in range(iterations):
+            p = 1 / (1 + np.exp(-a * (theta - b)))
+            gradient = np.sum(a * (x - n * p)) - theta
+            hessian = -np.sum(n * a ** 2 * p * (1 - p)) - 1
+            theta -= gradient / hessian
+        return float(theta)
+
+
+class LearnerStates:
+    """The states of recently active learners, least recently used dropped first"""
+    
+    def __init__(self, max_learners: int = DEFAULT_MAX_LEARNERS):
+        self.max_learners = max_learners
+        self._states: "OrderedDict[str, LearnerState]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, store: AttemptStore, user_id: str) -> LearnerState:
+        """A learner's state, brought up to date with the store"""
+        with self._lock:
+            state = self._states.pop(user_id, None) or LearnerState(user_id)
+            self._states[user_id] = state
+            while len(self._states) > self.max_learners:
+                self._states.popitem(last=False)
+        state.refresh(store)
+        return state
+
+
+class QuestionSelector:
+    """Picks quiz questions from a learner's history using precomputed item statistics"""
+    
+    def __init__(self, stats: ItemStats):
+        self.stats = stats
+    
+    def select(self, questions: Sequence[Question], keys: Sequence[ItemKey], count: int,
+               learner: LearnerState, now: Optional[float] = None, seed: Optional[int] = None) -> List[Question]:
+        """
+        Choose `count` questions: due reviews first, then the most informative new ones.
+
+        keys gives the (quiz file, position) of each question.
+        """
+        if not questions:
+            return []
+        now = time.time() if now is None else now
+        rng = np.random.default_rng(seed)
+        count = min(count, len(questions))
+        
+        due_at, interval = learner.schedule(keys)
+        seen = ~np.isnan(due_at)
+        due = seen & (due_at <= now)
+        
+        # Information at the learner's ability, for ranking unseen questions
+        theta = learner.estimate_ability(self.stats, questions, keys)
+        a, b = self.stats.parameters(questions, keys)
+        p = 1 / (1 + np.exp(-a * (theta - b)))
+        information = a ** 2 * p * (1 - p)
+        
+        tier = np.where(due, 2, np.where(seen, 0, 1))
+        overdue = np.where(due, (now - due_at) / np.maximum(interval, DAY), 0.0)
+        secondary = np.select([due, ~seen], [overdue, information], default=-(due_at - now) / DAY)
+        # A little noise so equally ranked questions vary between quizzes
+        secondary = secondary + rng.gumbel(scale=0.05, size=len(questions))
+        
+        order = np.lexsort((-secondary, -tier))
+        return [questions[i] for i in order[:count]]
+
+
+@st.cache_resource(show_spinner=False)
+def get_shared_item_stats() -> ItemStats:
+    """Get the process-wide item statistics, built up from every learner's history"""
+    return ItemStats()
+
+
+@st.cache_resource(show_spinner=False)
+def get_shared_learner_states() -> LearnerStates:
+    """Get the process-wide learner states, kept up to date incrementally"""
+    return LearnerStates()
+
+
+@timed("selection.adaptive")
+def select_adaptive_questions(questions: Sequence[Question], count: int, user_id: str, file_name: str,
+                              seed: Optional[int] = None) -> List[Question]:
+    """
+    Adaptive selection for one learner, using the shared store, item statistics and
+    learner states. questions are every question of file_name, in file order.
+    """
+    store = get_shared_attempt_store()
+    stats = get_shared_item_stats()
+    stats.refresh(store)
+    learner = get_shared_learner_states().get(store, user_id)
+    keys = [(file_name, position) for position in range(len(questions))]
+    return QuestionSelector(stats).select(questions, keys, count, learner, seed=seed)
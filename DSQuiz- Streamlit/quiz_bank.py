@@ -0,0 +1,377 @@
+"""
+Compiled binary question bank for GnanaVana
+
+The JSON files in quiz_data/ remain the source of truth. compile_bank() turns them
+into a single read-only artifact that every worker process can mmap, so questions are
+decoded on demand instead of each process holding its own parsed copy of the bank.
+
+Layout (little-endian):
+    MAGIC (8 bytes) | meta length (u32) | meta JSON
+    string table: one (offset u32, length u32) pair per unique string
+    string blob: UTF-8 data referenced by the string table
+    per subtopic: question offset table (u32 per question)
+    question records: difficulty id (u32), correct index (i16), option count (u16),
+                      option explanation count (u16), tag count (u16), followed by u32
+                      string ids for id, question, explanation, options,
+                      option explanations and tags
+"""
+
+import array
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from typing import Dict, Iterable, List, Optional
+
+from models import Question, QuestionDifficulty
+from quiz_schema import decode_quiz_file, json_loads
+
+
+BANK_FILENAME = ".quiz_bank.bin"
+MAGIC = b"GVQBANK\x00"
+FORMAT_VERSION = 3
+
+_META_LEN = struct.Struct('<I')
+_STRING_REF = struct.Struct('<II')
+_OFFSET = struct.Struct('<I')
+_RECORD_HEADER = struct.Struct('<IhHHH')
+
+
+def file_sha256(file_path: str) -> str:
+    with open(file_path, 'rb') as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+
+def _file_fingerprint(file_path: str, content: Optional[bytes] = None) -> dict:
+    """mtime, size and content hash used to detect changed source files"""
+    stat = os.stat(file_path)
+    return {
+        'mtime_ns': stat.st_mtime_ns,
+        'size': stat.st_size,
+        'sha256': hashlib.sha256(content).hexdigest() if content is not None else file_sha256(file_path)
+    }
+
+
+class _StringPool:
+    """Deduplicating string table; repeated tags and difficulty labels are stored once"""
+    
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._blob = bytearray()
+        self._refs: List[tuple] = []
+    
+    def add(self, value) -> int:
+        value = value if isinstance(value, str) else str(value)
+        string_id = self._ids.get(value)
+        if string_id is None:
+            encoded = value.encode('utf-8')
+            string_id = len(self._refs)
+            self._refs.append((len(self._blob), len(encoded)))
+            self._blob.extend(encoded)
+            self._ids[value] = string_id
+        return string_id
+    
+    def table_bytes(self) -> bytes:
+        return b''.join(_STRING_REF.pack(offset, length) for offset, length in self._refs)
+    
+    def blob_bytes(self) -> bytes:
+        return bytes(self._blob)
+    
+    def __len__(self) -> int:
+        return len(self._refs)
+
+
+def _encode_question(question: Question, pool: _StringPool) -> bytes:
+    """Encode one validated question record"""
+    string_ids = [
+        pool.add(question.id),
+        pool.add(question.question),
+        pool.add(question.explanation)
+    ]
+    string_ids.extend(pool.add(option) for option in question.options)
+    string_ids.extend(pool.add(explanation) for explanation in question.option_explanations)
+    string_ids.extend(pool.add(tag) for tag in question.tags)
+    
+    header = _RECORD_HEADER.pack(
+        pool.add(question.difficulty.value),
+        question.correct_option_index,
+        len(question.options),
+        len(question.option_explanations),
+        len(question.tags)
+    )
+    return header + struct.pack(f'<{len(string_ids)}I', *string_ids)
+
+
+def compile_bank(data_dir: str, filenames: Iterable[str], output_path: str) -> str:
+    """
+    Compile the given quiz JSON files into a binary bank, replacing output_path atomically.
+
+    Every file is validated first; an invalid one raises QuizFileError and no bank is written.
+    """
+    pool = _StringPool()
+    sources: Dict[str, dict] = {}
+    subtopics: List[dict] = []
+    question_tables: List[List[bytes]] = []
+    
+    for filename in filenames:
+        file_path = os.path.join(data_dir, filename)
+        with open(file_path, 'rb') as file:
+            content = file.read()
+        quiz_file = decode_quiz_file(content, filename)
+        
+        sources[filename] = _file_fingerprint(file_path, content)
+        subtopics.append({'fileName': filename, **quiz_file.metadata()})
+        question_tables.append([_encode_question(question, pool) for question in quiz_file.questions])
+    
+    string_table = pool.table_bytes()
+    string_blob = pool.blob_bytes()
+    
+    # All offsets are relative to the body, which starts right after the meta block
+    body = bytearray(string_table)
+    body.extend(string_blob)
+    for subtopic, records in zip(subtopics, question_tables):
+        table_offset = len(body)
+        subtopic['questionTable'] = table_offset
+        body.extend(b'\x00' * (_OFFSET.size * len(records)))
+        for i, record in enumerate(records):
+            _OFFSET.pack_into(body, table_offset + i * _OFFSET.size, len(body))
+            body.extend(record)
+    
+    meta = {
+        'version': FORMAT_VERSION,
+        'sources': sources,
+        'stringCount': len(pool),
+        'stringTable': 0,
+        'stringBlob': len(string_table),
+        'subtopics': subtopics
+    }
+    meta_bytes = json.dumps(meta, separators=(',', ':')).encode('utf-8')
+    
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as file:
+            file.write(MAGIC)
+            file.write(_META_LEN.pack(len(meta_bytes)))
+            file.write(meta_bytes)
+            file.write(body)
+        os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return output_path
+
+
+def _read_meta(path: str) -> Optional[dict]:
+    """Read only the meta block of a compiled bank, or None if it is missing or invalid"""
+    try:
+        with open(path, 'rb') as file:
+            if file.read(len(MAGIC)) != MAGIC:
+                return None
+            (meta_len,) = _META_LEN.unpack(file.read(_META_LEN.size))
+            meta = json_loads(file.read(meta_len))
+    except (OSError, ValueError, struct.error):
+        return None
+    if meta.get('version') != FORMAT_VERSION:
+        return None
+    return meta
+
+
+def current_sources(data_dir: str, filenames: Iterable[str], sources: Dict[str, dict]) -> Optional[Dict[str, dict]]:
+    """
+    Source fingerprints brought up to date, or None if any file's content changed.
+
+    A file whose mtime or size changed is only considered modified if its content hash
+    differs too, so touching a file or checking it out again does not force a rebuild;
+    its fingerprint comes back with the new mtime and size so it is not hashed again.
+    """
+    filenames = list(filenames)
+    if set(filenames) != set(sources):
+        return None
+    
+    updated = dict(sources)
+    for filename in filenames:
+        file_path = os.path.join(data_dir, filename)
+        recorded = sources[filename]
+        stat = os.stat(file_path)
+        if stat.st_mtime_ns == recorded['mtime_ns'] and stat.st_size == recorded['size']:
+            continue
+        if file_sha256(file_path) != recorded['sha256']:
+            return None
+        updated[filename] = {**recorded, 'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+    return updated
+
+
+def is_bank_stale(data_dir: str, filenames: Iterable[str], bank_path: str) -> bool:
+    """Check whether the compiled bank is out of date with the JSON sources"""
+    meta = _read_meta(bank_path)
+    return meta is None or current_sources(data_dir, filenames, meta['sources']) is None
+
+
+class QuizBank:
+    """Read-only, memory-mapped view over a compiled question bank"""
+    
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as file:
+            self._mm = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        
+        if self._mm[:len(MAGIC)] != MAGIC:
+            self._mm.close()
+            raise ValueError(f"Not a compiled quiz bank: {path}")
+        (meta_len,) = _META_LEN.unpack_from(self._mm, len(MAGIC))
+        meta_start = len(MAGIC) + _META_LEN.size
+        meta = json_loads(self._mm[meta_start:meta_start + meta_len])
+        if meta.get('version') != FORMAT_VERSION:
+            self._mm.close()
+            raise ValueError(f"Unsupported quiz bank version in {path}")
+        
+        self._meta = meta
+        self._body = meta_start + meta_len
+        self._string_table = self._body + meta['stringTable']
+        self._string_blob = self._body + meta['stringBlob']
+        # String table as flat (offset, length, offset, length, ...) u32s, read in place
+        table_end = self._string_table + meta['stringCount'] * _STRING_REF.size
+        if sys.byteorder == 'little':
+            self._refs = memoryview(self._mm)[self._string_table:table_end].cast('I')
+        else:
+            self._refs = array.array('I', self._mm[self._string_table:table_end])
+            self._refs.byteswap()
+        self.sources: Dict[str, dict] = meta['sources']
+        self.entries: Dict[str, dict] = {s['fileName']: s for s in meta['subtopics']}
+        self._difficulties: Dict[int, QuestionDifficulty] = {}  # Difficulty label string id -> enum
+    
+    def _string(self, string_id: int) -> str:
+        start = self._string_blob + self._refs[2 * string_id]
+        return self._mm[start:start + self._refs[2 * string_id + 1]].decode('utf-8')
+    
+    def _difficulty(self, string_id: int) -> QuestionDifficulty:
+        difficulty = self._difficulties.get(string_id)
+        if difficulty is None:
+            try:
+                difficulty = QuestionDifficulty(self._string(string_id))
+            except ValueError:
+                difficulty = QuestionDifficulty.MEDIUM
+            self._difficulties[string_id] = difficulty
+        return difficulty
+    
+    def _decode_question(self, record_offset: int) -> Question:
+        mm = self._mm
+        start = self._body + record_offset
+        difficulty_id, correct, n_options, n_explanations, n_tags = _RECORD_HEADER.unpack_from(mm, start)
+        count = 3 + n_options + n_explanations + n_tags
+        ids = struct.unpack_from(f'<{count}I', mm, start + _RECORD_HEADER.size)
+        
+        # _string() inlined: this loop is most of the cost of loading a subtopic
+        refs, blob = self._refs, self._string_blob
+        strings = []
+        for string_id in ids:
+            offset = blob + refs[2 * string_id]
+            strings.append(mm[offset:offset + refs[2 * string_id + 1]].decode('utf-8'))
+        difficulty = self._difficulty(difficulty_id)
+        
+        options_end = 3 + n_options
+        explanations_end = options_end + n_explanations
+        return Question(
+            id=strings[0],
+            question=strings[1],
+            options=strings[3:options_end],
+            correct_option_index=correct,
+            explanation=strings[2],
+            option_explanations=strings[options_end:explanations_end],
+            difficulty=difficulty,
+            tags=strings[explanations_end:]
+        )
+    
+    def _record_offset(self, entry: dict, index: int) -> int:
+        table = self._body + entry['questionTable']
+        return _OFFSET.unpack_from(self._mm, table + index * _OFFSET.size)[0]
+    
+    def load_question(self, filename: str, index: int) -> Optional[Question]:
+        """Decode a single question of a subtopic"""
+        entry = self.entries.get(filename)
+        if entry is None or not 0 <= index < entry['totalQuestions']:
+            return None
+        return self._decode_question(self._record_offset(entry, index))
+    
+    def load_questions(self, filename: str) -> List[Question]:
+        """Decode all questions of a subtopic"""
+        entry = self.entries.get(filename)
+        if entry is None:
+            return []
+        return [self._decode_question(self._record_offset(entry, i)) for i in range(entry['totalQuestions'])]
+    
+    def update_sources(self, sources: Dict[str, dict]) -> None:
+        """
+        Record new source fingerprints, in memory and in the bank file.
+
+        The body is copied unchanged behind the new meta block (its offsets are relative
+        to the body), replacing the file atomically. This mapping keeps reading the old
+        file. A read-only or locked bank file keeps its old fingerprints.
+        """
+        self.sources = sources
+        meta_bytes = json.dumps({**self._meta, 'sources': sources}, separators=(',', ':')).encode('utf-8')
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as file:
+                file.write(MAGIC)
+                file.write(_META_LEN.pack(len(meta_bytes)))
+                file.write(meta_bytes)
+                file.write(self._mm[self._body:])
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    
+    def close(self) -> None:
+        if isinstance(self._refs, memoryview):
+            self._refs.release()  # The mmap cannot close while a view of it is exported
+        self._mm.close()
+
+
+def open_bank(data_dir: str, filenames: Iterable[str], bank_path: Optional[str] = None) -> QuizBank:
+    """
+    Open the compiled bank for data_dir, rebuilding it first if the JSON sources changed.
+
+    The meta block is parsed once, by QuizBank, and checked against the sources from there.
+    """
+    filenames = list(filenames)
+    bank_path = bank_path or os.path.join(data_dir, BANK_FILENAME)
+    try:
+        bank: Optional[QuizBank] = QuizBank(bank_path)
+    except (OSError, ValueError, struct.error):
+        bank = None
+    
+    if bank is not None:
+        sources = current_sources(data_dir, filenames, bank.sources)
+        if sources is None:
+            bank.close()
+            bank = None
+        elif sources != bank.sources:
+            bank.update_sources(sources)
+    if bank is None:
+        compile_bank(data_dir, filenames, bank_path)
+        bank = QuizBank(bank_path)
+    return bank
+
+
+if __name__ == "__main__":
+    import argparse
+    from quiz_repository import QuizRepository
+    
+    parser = argparse.ArgumentParser(description="Compile quiz_data/*.json into a binary question bank")
+    parser.add_argument("--data-dir", default="quiz_data", help="Directory containing the quiz JSON files")
+    parser.add_argument("--output", default=None, help=f"Output path (default: <data-dir>/{BANK_FILENAME})")
+    parser.add_argument("--force", action="store_true", help="Rebuild even if the bank is up to date")
+    args = parser.parse_args()
+    
+    quiz_files = QuizRepository(args.data_dir, use_bank=False)._list_data_files()
+    output = args.output or os.path.join(args.data_dir, BANK_FILENAME)
+    if args.force or is_bank_stale(args.data_dir, quiz_files, output):
+        compile_bank(args.data_dir, quiz_files, output)
+        print(f"Compiled {len(quiz_files)} files into {output} ({os.path.getsize(output)} bytes)")
+    else:
+        print(f"{output} is up to date")
@@ -2,131 +2,322 @@
 Quiz Repository for loading and managing quiz data
 """
 
+import dataclasses
+import hashlib
 import json
+import logging
 import os
-from typing import Dict, List, Optional
-import streamlit as st
-from models import Field, Topic, Subtopic, Question, QuestionDifficulty
+import random
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, FrozenSet, List, Optional, Sequence, Set, Tuple
+from models import Field, Topic, Subtopic, Question
+from metrics import increment, span, timed
+from quiz_bank import QuizBank, file_sha256, open_bank
+from quiz_schema import QuizFile, QuizFileError, decode_quiz_file, load_quiz_file
+from search_index import FileDocuments, SearchFilters, SearchIndex
+
+
+logger = logging.getLogger(__name__)
+
+# Hierarchy metadata for every quiz file, kept next to the question banks
+MANIFEST_FILENAME = ".manifest.json"
+MANIFEST_VERSION = 4
+
+# Number of fully parsed subtopics kept in memory at once
+DEFAULT_MAX_CACHED_SUBTOPICS = 8
+
+# How often the shared repository checks quiz_data/ for changed files
+DEFAULT_POLL_INTERVAL_SECONDS = 5.0
+
+
+def parse_quiz_filename(filename: str) -> dict:
+    """Parse a quiz filename to extract field, topic, and subtopic information"""
+    # Format: FLD_DSC_TPC_MLG_150_STC_LRG.json
+    parts = filename.replace('.json', '').split('_')
+    
+    if len(parts) < 7:
+        return {}
+    
+    return {
+        'field_id': f"{parts[0]}_{parts[1]}",  # FLD_DSC
+        'topic_id': f"{parts[2]}_{parts[3]}",  # TPC_MLG
+        'rank': parts[4],  # 150; tells apart files that share the three IDs
+        'str_value': float(parts[4]) / 1000.0 if parts[4].isdigit() else 0.0,  # 150 -> 0.150
+        'subtopic_id': f"{parts[5]}_{parts[6]}"  # STC_LRG
+    }
+
+
+@dataclass(frozen=True)
+class BankSnapshot:
+    """
+    One immutable version of the loaded question bank.
+
+    refresh() builds a new snapshot and swaps it in with a single assignment, so readers
+    always see a consistent hierarchy and indexes while a reload is in progress.
+    """
+    version: int
+    entries: Dict[str, dict]  # file name -> manifest entry, including mtime_ns, size and sha256
+    json_files: FrozenSet[str]  # files changed since the compiled bank was opened
+    fields: List[Field]
+    subtopics_by_file: Dict[str, Subtopic]
+    fields_by_id: Dict[str, Field]
+    topics_by_id: Dict[Tuple[str, str], Topic]
+    subtopics_by_id: Dict[Tuple[str, str, str], Subtopic]
+    question_locations: Dict[str, Tuple[Subtopic, int]]
 
 
 class QuizRepository:
-    """Repository for managing quiz data"""
+    """
+    Repository for managing quiz data
+
+    A single instance is shared by every session in the process (see
+    get_shared_repository in streamlit_resources.py), so its caches are guarded by a
+    lock and the Field/Topic/Subtopic/Question objects it hands out must be treated as
+    read-only.
+
+    With poll_interval set, refresh_if_due() re-reads quiz files whose mtime or size
+    changed and publishes a new BankSnapshot; other files are not parsed again.
+    """
     
-    def __init__(self, data_dir: str = "quiz_data"):
+    def __init__(self, data_dir: str = "quiz_data", lazy: bool = True,
+                 max_cached_subtopics: int = DEFAULT_MAX_CACHED_SUBTOPICS, use_bank: bool = True,
+                 poll_interval: Optional[float] = None):
         self.data_dir = data_dir
-        self._fields_cache: Optional[List[Field]] = None
-        self._subtopics_cache: Dict[str, Subtopic] = {}
+        self.lazy = lazy
+        self.max_cached_subtopics = max_cached_subtopics
+        self.use_bank = use_bank
+        self.poll_interval = poll_interval
+        self._bank: Optional[QuizBank] = None
+        self._lock = threading.RLock()
+        self._refresh_lock = threading.Lock()
+        self._last_poll = time.monotonic()
+        # Files the last refresh could not decode; their previous version stays live
+        self.load_errors: Dict[str, QuizFileError] = {}
+        # Why the compiled bank could not be used, if the JSON files are read instead
+        self.bank_error: Optional[str] = None
+        self._snapshot: Optional[BankSnapshot] = None
+        self._subtopics_cache: "OrderedDict[str, Subtopic]" = OrderedDict()
+        self._search_index: Optional[SearchIndex] = None
+        self._search_entries: Dict[str, dict] = {}
+        self._search_lock = threading.Lock()
+        self._strata_cache: Dict[str, Tuple[dict, Dict[str, List[int]]]] = {}
     
-    @st.cache_data
-    def _load_json_file(_self, file_path: str) -> dict:
-        """Load JSON file with caching"""
-        try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                return json.load(file)
-        except Exception as e:
-            st.error(f"Error loading {file_path}: {str(e)}")
-            return {}
-    
-    def _parse_question(self, q_data: dict) -> Question:
-        """Parse question data from JSON"""
+    @timed("repository.load_json")
+    def _load_json_file(self, file_path: str) -> QuizFile:
+        """Decode and validate a quiz file (parsed subtopics are cached by the LRU instead)"""
+        return load_quiz_file(file_path)
+    
+    @timed("repository.load_json")
+    def _load_entry(self, filename: str, fingerprint: Tuple[int, int]) -> dict:
+        """Manifest entry of a quiz file: its metadata plus the (mtime_ns, size) and hash it was read with"""
+        with open(os.path.join(self.data_dir, filename), 'rb') as file:
+            content = file.read()
+        entry = decode_quiz_file(content, filename).metadata()
+        entry['mtime_ns'], entry['size'] = fingerprint
+        entry['sha256'] = hashlib.sha256(content).hexdigest()
+        return entry
+    
+    def _unchanged_entry(self, filename: str, fingerprint: Tuple[int, int],
+                         entry: Optional[dict]) -> Optional[dict]:
+        """
+        The known entry of a file if its content is unchanged, else None.
+
+        A file whose mtime or size moved is hashed and only counts as changed if its
+        content differs, so a touch, checkout or deploy of identical files does not force
+        a reparse. The returned entry then carries the new mtime and size.
+        """
+        if entry is None:
+            return None
+        if (entry.get('mtime_ns'), entry.get('size')) == fingerprint:
+            return entry
         try:
-            difficulty = QuestionDifficulty(q_data.get('difficulty', 'MEDIUM'))
-        except ValueError:
-            difficulty = QuestionDifficulty.MEDIUM
-            
-        return Question(
-            id=q_data.get('id', ''),
-            question=q_data.get('question', ''),
-            options=q_data.get('options', []),
-            correct_option_index=q_data.get('correctOptionIndex', 0),
-            explanation=q_data.get('explanation', ''),
-            option_explanations=q_data.get('optionExplanations', []),
-            difficulty=difficulty,
-            tags=q_data.get('tags', [])
-        )
+            if not entry.get('sha256') or file_sha256(os.path.join(self.data_dir, filename)) != entry['sha256']:
+                return None
+        except OSError:
+            return None
+        return {**entry, 'mtime_ns': fingerprint[0], 'size': fingerprint[1]}
     
     def _parse_filename(self, filename: str) -> dict:
         """Parse filename to extract field, topic, and subtopic information"""
-        # Format: FLD_DSC_TPC_MLG_150_STC_LRG.json
-        parts = filename.replace('.json', '').split('_')
+        return parse_quiz_filename(filename)
+    
+    def _list_data_files(self) -> List[str]:
+        """List the quiz JSON files in the data directory"""
+        return sorted(
+            f for f in os.listdir(self.data_dir)
+            if f.endswith('.json') and f != MANIFEST_FILENAME and self._parse_filename(f)
+        )
+    
+    def _get_bank(self) -> Optional[QuizBank]:
+        """Open the compiled binary bank, rebuilding it if the JSON files changed"""
+        with self._lock:
+            if self.use_bank and self._bank is None:
+                try:
+                    self._bank = open_bank(self.data_dir, self._list_data_files())
+                except QuizFileError:
+                    raise  # The JSON files are invalid too, so there is nothing to fall back to
+                except (OSError, ValueError) as e:
+                    # Fall back to reading the JSON files directly
+                    logger.warning("Compiled quiz bank unavailable, using JSON files: %s", e)
+                    self.bank_error = str(e)
+                    self.use_bank = False
+            return self._bank
+    
+    @timed("repository.load_manifest")
+    def _load_manifest(self) -> Dict[str, dict]:
+        """
+        Load hierarchy metadata for every quiz file.
+
+        The compiled bank already carries this metadata. Without it, entries are reused
+        from the on-disk manifest while a file's content is unchanged; only new or
+        modified files are parsed again.
+        """
+        bank = self._get_bank()
+        if bank:
+            return {
+                filename: {**entry, 'mtime_ns': bank.sources[filename]['mtime_ns'],
+                           'size': bank.sources[filename]['size'],
+                           'sha256': bank.sources[filename]['sha256']}
+                for filename, entry in bank.entries.items()
+            }
         
-        if len(parts) < 7:
-            return {}
-            
-        return {
-            'field_id': f"{parts[0]}_{parts[1]}",  # FLD_DSC
-            'topic_id': f"{parts[2]}_{parts[3]}",  # TPC_MLG
-            'str_value': float(parts[4]) / 1000.0 if parts[4].isdigit() else 0.0,  # 150 -> 0.150
-            'subtopic_id': f"{parts[5]}_{parts[6]}"  # STC_LRG
-        }
+        manifest_path = os.path.join(self.data_dir, MANIFEST_FILENAME)
+        cached_files: Dict[str, dict] = {}
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as file:
+                manifest = json.load(file)
+            if manifest.get('version') == MANIFEST_VERSION:
+                cached_files = manifest.get('files', {})
+        except (OSError, ValueError):
+            pass
+        
+        entries: Dict[str, dict] = {}
+        changed = False
+        for filename in self._list_data_files():
+            stat = os.stat(os.path.join(self.data_dir, filename))
+            fingerprint = (stat.st_mtime_ns, stat.st_size)
+            cached = cached_files.get(filename)
+            entry = self._unchanged_entry(filename, fingerprint, cached)
+            if entry is None:
+                entry = self._load_entry(filename, fingerprint)
+            entries[filename] = entry
+            changed = changed or entry is not cached
+        
+        if changed or set(entries) != set(cached_files):
+            self._write_manifest(manifest_path, entries)
+        return entries
     
-    def load_subtopic_from_file(self, filename: str) -> Optional[Subtopic]:
-        """Load a single subtopic from JSON file"""
-        if filename in self._subtopics_cache:
-            return self._subtopics_cache[filename]
-            
+    def _write_manifest(self, manifest_path: str, entries: Dict[str, dict]) -> None:
+        """Persist the manifest atomically; a read-only data directory just skips it"""
+        tmp_path = f"{manifest_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                json.dump({'version': MANIFEST_VERSION, 'files': entries}, file)
+            os.replace(tmp_path, manifest_path)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+    
+    @timed("repository.parse_subtopic")
+    def _parse_subtopic(self, filename: str, from_bank: bool = True) -> Optional[Subtopic]:
+        """Parse a subtopic and all of its questions from the compiled bank or its JSON file"""
+        bank = self._get_bank() if from_bank else None
+        if bank and filename in bank.entries:
+            return self._subtopic_from_manifest(filename, bank.entries[filename], bank.load_questions(filename))
+        
         file_path = os.path.join(self.data_dir, filename)
         if not os.path.exists(file_path):
             return None
+        
+        quiz_file = self._load_json_file(file_path)
+        return Subtopic(
+            id=quiz_file.subtopic_id,
+            name=quiz_file.subtopic_name,
+            topic_id=quiz_file.topic_id,
+            field_id=quiz_file.field_id,
+            str_value=quiz_file.str_value,
+            description=quiz_file.description,
+            total_questions=len(quiz_file.questions),
+            file_name=filename,
+            questions=list(quiz_file.questions)
+        )
+    
+    def load_subtopic_from_file(self, filename: str) -> Optional[Subtopic]:
+        """Load a single subtopic from JSON file, keeping recently used ones in an LRU"""
+        with self._lock:
+            if filename in self._subtopics_cache:
+                self._subtopics_cache.move_to_end(filename)
+                increment("repository.subtopic_cache.hits")
+                return self._subtopics_cache[filename]
+            increment("repository.subtopic_cache.misses")
             
-        data = self._load_json_file(file_path)
-        if not data:
-            return None
+            from_bank = filename not in self._get_snapshot().json_files
+            subtopic = self._parse_subtopic(filename, from_bank)
+            if not subtopic:
+                return None
             
-        # Parse questions
-        questions = []
-        for q_data in data.get('questions', []):
-            question = self._parse_question(q_data)
-            questions.append(question)
-        
-        # Create subtopic
-        subtopic = Subtopic(
-            id=data.get('subtopicId', ''),
-            name=data.get('subtopicName', ''),
-            topic_id=data.get('topicId', ''),
-            field_id=data.get('fieldId', ''),
-            str_value=data.get('str', 0.0),
-            description=data.get('description', ''),
-            total_questions=len(questions),
+            self._subtopics_cache[filename] = subtopic
+            while len(self._subtopics_cache) > self.max_cached_subtopics:
+                self._subtopics_cache.popitem(last=False)  # Evict the coldest subtopic
+                increment("repository.subtopic_cache.evictions")
+            return subtopic
+    
+    def _subtopic_from_manifest(self, filename: str, entry: dict,
+                                questions: Optional[List[Question]] = None) -> Subtopic:
+        """Create a subtopic from its manifest entry, without questions unless given"""
+        return Subtopic(
+            id=entry['subtopicId'],
+            name=entry['subtopicName'],
+            topic_id=entry['topicId'],
+            field_id=entry['fieldId'],
+            str_value=entry['str'],
+            description=entry['description'],
+            total_questions=entry['totalQuestions'],
             file_name=filename,
-            questions=questions
+            questions=questions if questions is not None else []
         )
-        
-        self._subtopics_cache[filename] = subtopic
-        return subtopic
     
-    @st.cache_data
-    def get_all_fields(_self) -> List[Field]:
+    def get_all_fields(self) -> List[Field]:
         """Get all available fields with their topics and subtopics"""
-        if _self._fields_cache is not None:
-            return _self._fields_cache
-            
+        return self._get_snapshot().fields
+    
+    @property
+    def version(self) -> int:
+        """Version of the current snapshot, incremented by every refresh that changes it"""
+        return self._get_snapshot().version
+    
+    def _get_snapshot(self) -> BankSnapshot:
+        """Get the current snapshot, loading the bank on first use"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    self._snapshot = self._build_snapshot(1, self._load_manifest(), frozenset(), {})
+                snapshot = self._snapshot
+        return snapshot
+    
+    @timed("repository.build_hierarchy")
+    def _build_snapshot(self, version: int, entries: Dict[str, dict], json_files: FrozenSet[str],
+                        reusable: Dict[str, Subtopic]) -> BankSnapshot:
+        """Build the hierarchy and ID indexes, reusing subtopics of unchanged files"""
         fields_dict: Dict[str, Field] = {}
         topics_dict: Dict[str, Topic] = {}
+        subtopics_by_file: Dict[str, Subtopic] = {}
         
-        # Get all JSON files
-        json_files = [f for f in os.listdir(_self.data_dir) if f.endswith('.json')]
-        
-        for filename in json_files:
-            # Load the basic info from filename
-            file_info = _self._parse_filename(filename)
-            if not file_info:
-                continue
-                
-            # Load the full data
-            file_path = os.path.join(_self.data_dir, filename)
-            data = _self._load_json_file(file_path)
-            if not data:
-                continue
-                
-            field_id = data.get('fieldId', '')
-            topic_id = data.get('topicId', '')
+        for filename, entry in sorted(entries.items()):
+            field_id = entry['fieldId']
+            topic_id = entry['topicId']
             
             # Create field if not exists
             if field_id not in fields_dict:
                 fields_dict[field_id] = Field(
                     id=field_id,
-                    name=data.get('fieldName', ''),
+                    name=entry['fieldName'],
                     description='',
                     topics=[]
                 )
@@ -136,17 +327,23 @@ class QuizRepository:
             if topic_key not in topics_dict:
                 topics_dict[topic_key] = Topic(
                     id=topic_id,
-                    name=data.get('topicName', ''),
+                    name=entry['topicName'],
                     field_id=field_id,
                     description='',
                     subtopics=[]
                 )
                 fields_dict[field_id].topics.append(topics_dict[topic_key])
             
-            # Load subtopic
-            subtopic = _self.load_subtopic_from_file(filename)
+            # Load subtopic; lazy mode only needs names, descriptions and counts
+            if filename in reusable:
+                subtopic = reusable[filename]
+            elif self.lazy:
+                subtopic = self._subtopic_from_manifest(filename, entry)
+            else:
+                subtopic = self._parse_subtopic(filename, filename not in json_files)
             if subtopic:
                 topics_dict[topic_key].subtopics.append(subtopic)
+                subtopics_by_file[filename] = subtopic
         
         # Sort subtopics by str_value within each topic
         for field in fields_dict.values():
@@ -154,10 +351,21 @@ class QuizRepository:
                 topic.subtopics.sort(key=lambda x: x.str_value)
             
             # Sort topics in natural learning order
-            field.topics.sort(key=lambda x: _self._get_topic_order(x.id))
+            field.topics.sort(key=lambda x: self._get_topic_order(x.id))
         
-        _self._fields_cache = list(fields_dict.values())
-        return _self._fields_cache
+        fields = list(fields_dict.values())
+        fields_by_id, topics_by_id, subtopics_by_id, question_locations = self._build_indexes(fields, entries)
+        return BankSnapshot(
+            version=version,
+            entries=entries,
+            json_files=json_files,
+            fields=fields,
+            subtopics_by_file=subtopics_by_file,
+            fields_by_id=fields_by_id,
+            topics_by_id=topics_by_id,
+            subtopics_by_id=subtopics_by_id,
+            question_locations=question_locations
+        )
     
     def _get_topic_order(self, topic_id: str) -> int:
         """Define natural learning order for topics"""
@@ -170,48 +378,393 @@ class QuizRepository:
         }
         return topic_order.get(topic_id, 999)  # Unknown topics go to end
     
+    def _build_indexes(self, fields: List[Field], entries: Dict[str, dict]) -> tuple:
+        """
+        Build the field/topic/subtopic/question ID indexes from the hierarchy.
+
+        When an ID occurs more than once (e.g. two files sharing STC_DTC), the first one
+        in hierarchy order wins, matching the previous linear lookups. Question IDs come
+        from the manifest, so no questions are parsed to index them.
+        """
+        fields_by_id: Dict[str, Field] = {}
+        topics_by_id: Dict[Tuple[str, str], Topic] = {}
+        subtopics_by_id: Dict[Tuple[str, str, str], Subtopic] = {}
+        question_locations: Dict[str, Tuple[Subtopic, int]] = {}
+        
+        for field in fields:
+            fields_by_id.setdefault(field.id, field)
+            for topic in field.topics:
+                topics_by_id.setdefault((field.id, topic.id), topic)
+                for subtopic in topic.subtopics:
+                    subtopics_by_id.setdefault((field.id, topic.id, subtopic.id), subtopic)
+                    
+                    question_ids = entries.get(subtopic.file_name, {}).get('questionIds', [])
+                    for index, question_id in enumerate(question_ids):
+                        question_locations.setdefault(question_id, (subtopic, index))
+        
+        return fields_by_id, topics_by_id, subtopics_by_id, question_locations
+    
+    def refresh(self) -> bool:
+        """
+        Re-read quiz files whose content changed and publish a new snapshot.
+
+        Files whose mtime or size moved are hashed first and only parsed again if their
+        content differs; otherwise just their recorded fingerprint is updated, without a
+        new snapshot version. Subtopics of unchanged files are reused
+        and their questions stay in the compiled bank. Sessions that already hold
+        questions or hierarchy objects keep using the previous snapshot's objects.
+        Files that fail validation are recorded in load_errors and keep their previous
+        version. Returns True if anything changed.
+        """
+        with self._refresh_lock:
+            self._last_poll = time.monotonic()
+            old = self._get_snapshot()
+            
+            current: Dict[str, Tuple[int, int]] = {}
+            for filename in self._list_data_files():
+                try:
+                    stat = os.stat(os.path.join(self.data_dir, filename))
+                except OSError:
+                    continue  # Removed while listing
+                current[filename] = (stat.st_mtime_ns, stat.st_size)
+            
+            dirty: Set[str] = set()
+            touched: Dict[str, dict] = {}  # Same content, new mtime or size
+            for filename, fingerprint in current.items():
+                entry = old.entries.get(filename)
+                unchanged = self._unchanged_entry(filename, fingerprint, entry)
+                if unchanged is None:
+                    dirty.add(filename)
+                elif unchanged is not entry:
+                    touched[filename] = unchanged
+            removed = set(old.entries) - set(current)
+            if not dirty and not removed:
+                if touched:
+                    self._record_fingerprints(old, touched)
+                return False
+            increment("repository.reloads")
+            increment("repository.reloaded_files", len(dirty | removed))
+            
+            entries = {
+                filename: touched.get(filename, entry) for filename, entry in old.entries.items()
+                if filename in current and filename not in dirty
+            }
+            errors: Dict[str, QuizFileError] = {}
+            for filename in sorted(dirty):
+                try:
+                    entries[filename] = self._load_entry(filename, current[filename])
+                except (QuizFileError, OSError) as e:
+                    # Possibly mid-write; keep the previous version and retry on the next refresh
+                    if isinstance(e, QuizFileError):
+                        errors[filename] = e
+                    if filename in old.entries:
+                        entries[filename] = old.entries[filename]
+            
+            self.load_errors = errors
+            increment("repository.invalid_files", len(errors))
+            dirty = {filename for filename in dirty if entries.get(filename) is not old.entries.get(filename)}
+            if not dirty and not removed:
+                if touched:
+                    self._record_fingerprints(old, touched)
+                return False
+            
+            reusable = {
+                filename: subtopic for filename, subtopic in old.subtopics_by_file.items()
+                if filename in entries and filename not in dirty
+            }
+            json_files = frozenset((old.json_files | dirty) - removed)
+            snapshot = self._build_snapshot(old.version + 1, entries, json_files, reusable)
+            
+            with self._lock:
+                for filename in dirty | removed:
+                    self._subtopics_cache.pop(filename, None)
+                self._snapshot = snapshot
+            
+            if not self.use_bank:
+                self._write_manifest(os.path.join(self.data_dir, MANIFEST_FILENAME), entries)
+            return True
+    
+    def _record_fingerprints(self, old: BankSnapshot, touched: Dict[str, dict]) -> None:
+        """Store new mtimes and sizes of unchanged files so they are not hashed again"""
+        entries = {**old.entries, **touched}
+        with self._lock:
+            self._snapshot = dataclasses.replace(old, entries=entries)
+        bank = self._bank
+        if bank is not None:
+            sources = dict(bank.sources)
+            for filename, entry in touched.items():
+                if filename not in old.json_files and filename in sources:
+                    sources[filename] = {'mtime_ns': entry['mtime_ns'], 'size': entry['size'],
+                                         'sha256': entry['sha256']}
+            if sources != bank.sources:
+                bank.update_sources(sources)
+        if not self.use_bank:
+            self._write_manifest(os.path.join(self.data_dir, MANIFEST_FILENAME), entries)
+    
+    def refresh_if_due(self) -> bool:
+        """Run refresh() if poll_interval has elapsed and no other thread is refreshing"""
+        if self.poll_interval is None or time.monotonic() - self._last_poll < self.poll_interval:
+            return False
+        if self._refresh_lock.locked():
+            return False
+        return self.refresh()
+    
     def get_field_by_id(self, field_id: str) -> Optional[Field]:
         """Get field by ID"""
-        fields = self.get_all_fields()
-        for field in fields:
-            if field.id == field_id:
-                return field
-        return None
+        return self._get_snapshot().fields_by_id.get(field_id)
     
     def get_topic_by_id(self, field_id: str, topic_id: str) -> Optional[Topic]:
         """Get topic by ID"""
-        field = self.get_field_by_id(field_id)
-        if field:
-            for topic in field.topics:
-                if topic.id == topic_id:
-                    return topic
-        return None
+        return self._get_snapshot().topics_by_id.get((field_id, topic_id))
     
     def get_subtopic_by_id(self, field_id: str, topic_id: str, subtopic_id: str) -> Optional[Subtopic]:
         """Get subtopic by ID"""
-        topic = self.get_topic_by_id(field_id, topic_id)
-        if topic:
-            for subtopic in topic.subtopics:
-                if subtopic.id == subtopic_id:
-                    return subtopic
-        return None
+        return self._get_snapshot().subtopics_by_id.get((field_id, topic_id, subtopic_id))
+    
+    def get_subtopic_by_file(self, filename: str) -> Optional[Subtopic]:
+        """Get the subtopic of a quiz file"""
+        return self._get_snapshot().subtopics_by_file.get(filename)
+    
+    def get_question(self, question_id: str) -> Optional[Question]:
+        """
+        Get a single question by its ID (e.g. KNN_001), in its original option order.
+
+        IDs can repeat across files; the first file in hierarchy order wins. Use
+        get_question_at() when the file is known.
+        """
+        snapshot = self._get_snapshot()
+        location = snapshot.question_locations.get(question_id)
+        if not location:
+            return None
+        return self._question_at(snapshot, *location)
+    
+    def get_question_at(self, filename: str, index: Optional[int],
+                        question_id: Optional[str] = None) -> Optional[Question]:
+        """
+        Get the question at a position in a quiz file, in its original option order.
+
+        Question IDs are only unique within a file, so stored answers keep the file and
+        position. With question_id, a position that now holds another question (the file
+        was edited) falls back to looking the ID up in the same file.
+        """
+        snapshot = self._get_snapshot()
+        subtopic = snapshot.subtopics_by_file.get(filename)
+        if subtopic is None:
+            return None
+        question = self._question_at(snapshot, subtopic, index) if index is not None and index >= 0 else None
+        if question_id is None or (question is not None and question.id == question_id):
+            return question
+        index = self.question_index(filename, question_id)
+        return self._question_at(snapshot, subtopic, index) if index is not None else None
+    
+    def question_index(self, filename: str, question_id: str) -> Optional[int]:
+        """Position of a question in its quiz file, from the manifest"""
+        question_ids = self._get_snapshot().entries.get(filename, {}).get('questionIds', [])
+        try:
+            return question_ids.index(question_id)
+        except ValueError:
+            return None
+    
+    def _question_at(self, snapshot: BankSnapshot, subtopic: Subtopic, index: int) -> Optional[Question]:
+        """Get the question at a position in a subtopic, decoding only that record if possible"""
+        if (not subtopic.questions and subtopic.file_name not in self._subtopics_cache
+                and subtopic.file_name not in snapshot.json_files):
+            # Decode just this question instead of the whole subtopic
+            bank = self._get_bank()
+            if bank:
+                increment("repository.single_question_decodes")
+                return bank.load_question(subtopic.file_name, index)
+        
+        questions = self.get_subtopic_questions(subtopic)
+        return questions[index] if index < len(questions) else None
     
+    def get_search_index(self) -> SearchIndex:
+        """
+        Get the full-text and tag index of the current snapshot, building it on first use.
+
+        After a refresh, only files whose mtime or size changed are tokenized again.
+        """
+        snapshot = self._get_snapshot()
+        index = self._search_index
+        if index is not None and index.version == snapshot.version:
+            increment("repository.search_index.hits")
+            return index
+        
+        with self._search_lock:
+            index = self._search_index
+            if index is None or index.version != snapshot.version:
+                previous = index.files if index else {}
+                files = []
+                for filename, subtopic in snapshot.subtopics_by_file.items():
+                    entry = snapshot.entries[filename]
+                    old_entry = self._search_entries.get(filename)
+                    documents = previous.get(filename)
+                    if documents is None or old_entry is None or old_entry['sha256'] != entry['sha256']:
+                        parsed = self._parse_subtopic(filename, filename not in snapshot.json_files)
+                        documents = FileDocuments.from_questions(
+                            filename, subtopic.field_id, subtopic.topic_id, subtopic.id,
+                            parsed.questions if parsed else []
+                        )
+                    files.append(documents)
+                with span("repository.build_search_index"):
+                    index = SearchIndex(files, snapshot.version)
+                increment("repository.search_index.builds")
+                self._search_index = index
+                self._search_entries = snapshot.entries
+        return index
+    
+    def search(self, query: str, filters: Optional[SearchFilters] = None,
+               limit: Optional[int] = 50) -> List[Tuple[Question, Subtopic, float]]:
+        """
+        Search question text, explanations and tags across every subtopic.
+
+        Returns (question, subtopic, BM25 score) tuples, best match first. An empty query
+        lists every question allowed by the filters, e.g. all questions with a given tag.
+        """
+        snapshot = self._get_snapshot()
+        results = []
+        for hit in self.get_search_index().search(query, filters, limit):
+            subtopic = snapshot.subtopics_by_file.get(hit.file_name)
+            question = self._question_at(snapshot, subtopic, hit.index) if subtopic else None
+            if question is not None:
+                results.append((question, subtopic, hit.score))
+        return results
+    
+    def is_subtopic_loaded(self, subtopic: Subtopic) -> bool:
+        """Whether a subtopic's questions are in memory, so drawing from it reads no files"""
+        return bool(subtopic.questions) or not self.lazy or subtopic.file_name in self._subtopics_cache
+    
+    def get_subtopic_questions(self, subtopic: Subtopic) -> Sequence[Question]:
+        """Get the parsed questions of a subtopic, loading them on first use"""
+        if subtopic.questions or not self.lazy:
+            return subtopic.questions
+        loaded = self.load_subtopic_from_file(subtopic.file_name)
+        return loaded.questions if loaded else []
+    
+    @timed("selection.subtopic")
     def get_questions_for_subtopic(self, field_id: str, topic_id: str, subtopic_id: str, 
-                                 shuffle: bool = True, limit: Optional[int] = None) -> List[Question]:
-        """Get questions for a specific subtopic"""
+                                 shuffle: bool = True, limit: Optional[int] = None,
+                                 seed: Optional[int] = None,
+                                 select: Optional[Callable[[Sequence[Question], int], List[Question]]] = None
+                                 ) -> List[Question]:
+        """
+        Get questions for a specific subtopic
+
+        With shuffle, `limit` questions are sampled first and only those get a shuffled
+        option order, as views over the shared questions. The same seed reproduces the
+        same quiz. `select(questions, count)` replaces random sampling, e.g. with the
+        adaptive selector in question_selector.
+        """
         subtopic = self.get_subtopic_by_id(field_id, topic_id, subtopic_id)
         if not subtopic:
             return []
-            
-        questions = subtopic.questions.copy()
+        
+        questions = self.get_subtopic_questions(subtopic)
+        count = min(limit, len(questions)) if limit else len(questions)
+        rng = random.Random(seed)
+        
+        if select is not None:
+            chosen = select(questions, count)
+            return [q.shuffle_options(rng) for q in chosen] if shuffle else chosen
         
         if shuffle:
-            import random
-            random.shuffle(questions)
-            # Also shuffle individual question options
-            questions = [q.shuffle_options() for q in questions]
+            return [q.shuffle_options(rng) for q in rng.sample(questions, count)]
         
-        if limit:
-            questions = questions[:limit]
-            
-        return questions 
\ No newline at end of file
+        return list(questions[:count])
+    
+    
+    def _get_strata(self, snapshot: BankSnapshot, subtopic: Subtopic) -> Dict[str, List[int]]:
+        """Question positions of a subtopic grouped by difficulty, from its manifest entry"""
+        entry = snapshot.entries.get(subtopic.file_name, {})
+        cached = self._strata_cache.get(subtopic.file_name)
+        if cached and cached[0] is entry:
+            increment("repository.strata_cache.hits")
+            return cached[1]
+        increment("repository.strata_cache.misses")
+        
+        strata: Dict[str, List[int]] = {}
+        for position, difficulty in enumerate(entry.get('questionDifficulties', [])):
+            strata.setdefault(difficulty, []).append(position)
+        self._strata_cache[subtopic.file_name] = (entry, strata)
+        return strata
+    
+    @timed("selection.mixed")
+    def get_mixed_questions(self, subtopics: Sequence[Subtopic], count: int, shuffle: bool = True,
+                            seed: Optional[int] = None, weights: Optional[Sequence[float]] = None
+                            ) -> List[Tuple[Question, Subtopic]]:
+        """
+        Draw `count` questions across several subtopics, e.g. a whole topic or field.
+
+        Sampling is stratified by (subtopic, difficulty): each stratum gets a share of the
+        quiz proportional to its size, scaled by the subtopic's weight (its question
+        count when weights is None). Positions are drawn from the per-subtopic difficulty
+        index and only the chosen questions are decoded, so the union of all candidates
+        is never loaded or shuffled. Returns (question, subtopic) pairs.
+        """
+        snapshot = self._get_snapshot()
+        if weights is None:
+            weights = [subtopic.total_questions for subtopic in subtopics]
+        
+        # Strata of each difficulty: (subtopic, positions, weight)
+        by_difficulty: Dict[str, List[Tuple[Subtopic, List[int], float]]] = {}
+        for subtopic, weight in zip(subtopics, weights):
+            strata = self._get_strata(snapshot, subtopic)
+            size = sum(len(positions) for positions in strata.values())
+            for difficulty, positions in strata.items():
+                by_difficulty.setdefault(difficulty, []).append(
+                    (subtopic, positions, weight * len(positions) / size)
+                )
+        
+        # Split the quiz across difficulties first, then each difficulty's share across subtopics
+        rng = random.Random(seed)
+        difficulties = sorted(by_difficulty)
+        per_difficulty = _allocate(
+            [sum(len(positions) for _, positions, _ in by_difficulty[d]) for d in difficulties],
+            [sum(weight for _, _, weight in by_difficulty[d]) for d in difficulties],
+            count, rng
+        )
+        chosen: List[Tuple[Question, Subtopic]] = []
+        for difficulty, difficulty_count in zip(difficulties, per_difficulty):
+            strata = by_difficulty[difficulty]
+            allocation = _allocate([len(positions) for _, positions, _ in strata],
+                                   [weight for _, _, weight in strata], difficulty_count, rng)
+            for (subtopic, positions, _), k in zip(strata, allocation):
+                for position in sorted(rng.sample(positions, k)):
+                    question = self._question_at(snapshot, subtopic, position)
+                    if question is not None:
+                        chosen.append((question, subtopic))
+        
+        if shuffle:
+            rng.shuffle(chosen)
+            return [(question.shuffle_options(rng), subtopic) for question, subtopic in chosen]
+        return chosen
+
+
+def _allocate(capacities: Sequence[int], weights: Sequence[float], count: int,
+              rng: random.Random) -> List[int]:
+    """
+    Split count across strata in proportion to weights, never exceeding a stratum's capacity.
+
+    Each stratum gets the whole part of its share; the fractional parts are rounded by
+    systematic sampling with a random start, so a stratum whose share is 0.3 gets one
+    question 30% of the time and the total is always exact.
+    """
+    allocation = [0] * len(capacities)
+    target = min(count, sum(c for c, w in zip(capacities, weights) if w > 0))
+    open_strata = [i for i, (c, w) in enumerate(zip(capacities, weights)) if c > 0 and w > 0]
+    
+    while sum(allocation) < target and open_strata:
+        remaining = target - sum(allocation)
+        total = sum(weights[i] for i in open_strata)
+        point = rng.random()
+        cumulative = 0.0
+        for i in open_strata:
+            share = remaining * weights[i] / total
+            whole = int(share)
+            cumulative += share - whole
+            if cumulative > point:
+                whole += 1
+                point += 1.0
+            allocation[i] += min(whole, capacities[i] - allocation[i])
+        open_strata = [i for i in open_strata if allocation[i] < capacities[i]]
+    return allocation
@@ -0,0 +1,315 @@
+"""
+Typed decoder and validator for GnanaVana quiz files
+
+decode_quiz_file() parses a quiz_data/ JSON file and validates it in the same pass that
+builds its Question objects: required fields and their types, known difficulty labels,
+the correct option index against the option count, the optionExplanations length and
+duplicate question IDs. Every problem is reported with its JSON path in one
+QuizFileError instead of being defaulted away. orjson is used for parsing when it is
+installed, with the standard library json module as the fallback.
+
+Usage:
+    python quiz_schema.py [--data-dir quiz_data] [--workers 4] [--output schema_report.json]
+"""
+
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from models import Question, QuestionDifficulty
+
+try:
+    import orjson
+except ImportError:  # Optional speed-up; json gives the same results
+    orjson = None
+
+
+# Problems listed per file before the rest are summarized
+MAX_REPORTED_ERRORS = 20
+
+_DIFFICULTIES = {difficulty.value: difficulty for difficulty in QuestionDifficulty}
+
+
+def json_loads(content: bytes) -> Any:
+    """Parse JSON bytes with orjson if available, else the json module"""
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content.decode('utf-8'))
+
+
+class QuizFileError(ValueError):
+    """A quiz file that cannot be parsed or breaks the schema"""
+    
+    def __init__(self, file_name: str, errors: List[str]):
+        self.file_name = file_name
+        self.errors = errors
+        shown = "; ".join(errors[:3])
+        more = f" (+{len(errors) - 3} more)" if len(errors) > 3 else ""
+        super().__init__(f"{file_name}: {shown}{more}")
+
+
+@dataclass(frozen=True)
+class QuizFile:
+    """One decoded and validated quiz_data/ file"""
+    file_name: str
+    field_id: str
+    field_name: str
+    topic_id: str
+    topic_name: str
+    subtopic_id: str
+    subtopic_name: str
+    str_value: float
+    description: str
+    questions: Tuple[Question, ...]
+    
+    def metadata(self) -> dict:
+        """Hierarchy metadata for the manifest and the compiled bank, leaving out the questions"""
+        return {
+            'fieldId': self.field_id,
+            'fieldName': self.field_name,
+            'topicId': self.topic_id,
+            'topicName': self.topic_name,
+            'subtopicId': self.subtopic_id,
+            'subtopicName': self.subtopic_name,
+            'str': self.str_value,
+            'description': self.description,
+            'totalQuestions': len(self.questions),
+            'questionIds': [question.id for question in self.questions],
+            'questionDifficulties': [question.difficulty.value for question in self.questions]
+        }
+
+
+class _Decoder:
+    """Collects schema problems while walking one file"""
+    
+    def __init__(self):
+        self.errors: List[str] = []
+    
+    def error(self, path: str, message: str) -> None:
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f"{path}: {message}")
+        elif len(self.errors) == MAX_REPORTED_ERRORS:
+            self.errors.append("further problems not shown")
+    
+    def string(self, data: dict, key: str, path: str, required: bool = True) -> str:
+        value = data.get(key)
+        if value is None and not required:
+            return ''
+        if not isinstance(value, str) or (required and not value.strip()):
+            self.error(f"{path}{key}", "missing" if value is None else "must be a non-empty string")
+            return ''
+        return value
+    
+    def strings(self, data: dict, key: str, path: str, required: bool = True) -> List[str]:
+        value = data.get(key)
+        if value is None and not required:
+            return []
+        if not isinstance(value, list):
+            self.error(f"{path}{key}", "missing" if value is None else "must be a list")
+            return []
+        for i, item in enumerate(value):
+            if not isinstance(item, str) or not item.strip():
+                self.error(f"{path}{key}[{i}]", "must be a non-empty string")
+        return value
+    
+    def question(self, data: Any, path: str) -> Optional[Question]:
+        if not isinstance(data, dict):
+            self.error(path, "must be an object")
+            return None
+        prefix = f"{path}."
+        errors_before = len(self.errors)
+        
+        question_id = self.string(data, 'id', prefix)
+        text = self.string(data, 'question', prefix)
+        explanation = self.string(data, 'explanation', prefix)
+        options = self.strings(data, 'options', prefix)
+        option_explanations = self.strings(data, 'optionExplanations', prefix, required=False)
+        tags = self.strings(data, 'tags', prefix, required=False)
+        
+        if isinstance(data.get('options'), list) and len(options) < 2:
+            self.error(f"{prefix}options", f"needs at least 2 options, got {len(options)}")
+        if option_explanations and len(option_explanations) != len(options):
+            self.error(f"{prefix}optionExplanations",
+                       f"has {len(option_explanations)} entries for {len(options)} options")
+        
+        correct = data.get('correctOptionIndex')
+        if isinstance(correct, bool) or not isinstance(correct, int):
+            self.error(f"{prefix}correctOptionIndex", "missing" if correct is None else "must be an integer")
+        elif not 0 <= correct < len(options):
+            self.error(f"{prefix}correctOptionIndex", f"{correct} is out of range for {len(options)} options")
+        
+        difficulty = _DIFFICULTIES.get(data.get('difficulty'))
+        if difficulty is None:
+            self.error(f"{prefix}difficulty", f"must be one of {', '.join(_DIFFICULTIES)}, "
+                                              f"got {data.get('difficulty')!r}")
+        
+        if len(self.errors) > errors_before:
+            return None
+        return Question(
+            id=question_id,
+            question=text,
+            options=options,
+            correct_option_index=correct,
+            explanation=explanation,
+            option_explanations=option_explanations,
+            difficulty=difficulty,
+            tags=tags
+        )
+
+
+def decode_quiz_file(content: bytes, file_name: str) -> QuizFile:
+    """Parse and validate a quiz file; raises QuizFileError listing every problem found"""
+    try:
+        data = json_loads(content)
+    except ValueError as e:  # json.JSONDecodeError, orjson.JSONDecodeError and bad UTF-8
+        raise QuizFileError(file_name, [f"invalid JSON: {e}"]) from None
+    if not isinstance(data, dict):
+        raise QuizFileError(file_name, ["top level must be an object"])
+    
+    decoder = _Decoder()
+    header = {key: decoder.string(data, key, '') for key in
+              ('fieldId', 'fieldName', 'topicId', 'topicName', 'subtopicId', 'subtopicName')}
+    description = decoder.string(data, 'description', '', required=False)
+    str_value = data.get('str', 0.0)
+    if isinstance(str_value, bool) or not isinstance(str_value, (int, float)):
+        decoder.error('str', "must be a number")
+    
+    raw_questions = data.get('questions')
+    questions: List[Question] = []
+    if not isinstance(raw_questions, list) or not raw_questions:
+        decoder.error('questions', "must be a non-empty list")
+    else:
+        seen: Dict[str, int] = {}
+        for i, q_data in enumerate(raw_questions):
+            question = decoder.question(q_data, f"questions[{i}]")
+            if question is None:
+                continue
+            if question.id in seen:
+                decoder.error(f"questions[{i}].id", f"duplicates questions[{seen[question.id]}] ({question.id})")
+            seen.setdefault(question.id, i)
+            questions.append(question)
+    
+    if decoder.errors:
+        raise QuizFileError(file_name, decoder.errors)
+    return QuizFile(
+        file_name=file_name,
+        field_id=header['fieldId'],
+        field_name=header['fieldName'],
+        topic_id=header['topicId'],
+        topic_name=header['topicName'],
+        subtopic_id=header['subtopicId'],
+        subtopic_name=header['subtopicName'],
+        str_value=float(str_value),
+        description=description,
+        questions=tuple(questions)
+    )
+
+
+def load_quiz_file(file_path: str) -> QuizFile:
+    """Read and decode one quiz file from disk"""
+    with open(file_path, 'rb') as file:
+        content = file.read()
+    return decode_quiz_file(content, os.path.basename(file_path))
+
+
+def load_quiz_files(data_dir: str) -> Tuple[List[QuizFile], List[QuizFileError]]:
+    """
+    Every quiz file in data_dir, in name order, plus an error for each file that could
+    not be read or decoded. Tools built on this must report the skipped files, since
+    their output no longer covers the whole bank.
+    """
+    quiz_files = []
+    skipped = []
+    for name in sorted(os.listdir(data_dir)):
+        if name.endswith('.json') and not name.startswith('.'):
+            try:
+                quiz_files.append(load_quiz_file(os.path.join(data_dir, name)))
+            except QuizFileError as e:
+                skipped.append(e)
+            except OSError as e:
+                skipped.append(QuizFileError(name, [f"cannot read: {e}"]))
+    return quiz_files, skipped
+
+
+def report_skipped_files(skipped: List[QuizFileError]) -> List[dict]:
+    """Print the files a tool left out to stderr; returns them as report entries"""
+    for error in skipped:
+        print(f"skipped {error}", file=sys.stderr)
+    if skipped:
+        print(f"{len(skipped)} invalid quiz files were skipped; run quiz_schema.py for the full list of problems",
+              file=sys.stderr)
+    return [{'file': error.file_name, 'errors': error.errors} for error in skipped]
+
+
+def validate_file(file_path: str) -> dict:
+    """Per-file report entry; runs in a worker process, so it returns plain data"""
+    start = time.perf_counter()
+    report = {'file': os.path.basename(file_path), 'ok': True, 'questions': 0, 'errors': []}
+    try:
+        quiz_file = load_quiz_file(file_path)
+        report['questions'] = len(quiz_file.questions)
+        report['subtopicId'] = quiz_file.subtopic_id
+        report['questionIds'] = [question.id for question in quiz_file.questions]
+    except QuizFileError as e:
+        report['ok'] = False
+        report['errors'] = e.errors
+    except OSError as e:
+        report['ok'] = False
+        report['errors'] = [f"cannot read: {e}"]
+    report['ms'] = round((time.perf_counter() - start) * 1000, 2)
+    return report
+
+
+def cross_file_warnings(reports: List[dict]) -> List[str]:
+    """Question IDs that appear in more than one file; allowed, but lookups by ID are ambiguous"""
+    owners: Dict[str, List[str]] = {}
+    for report in reports:
+        for question_id in report.get('questionIds', ()):
+            owners.setdefault(question_id, []).append(report['file'])
+    return [
+        f"question ID {question_id} appears in {', '.join(sorted(set(files)))}"
+        for question_id, files in sorted(owners.items()) if len(files) > 1
+    ]
+
+
+if __name__ == "__main__":
+    import argparse
+    from concurrent.futures import ProcessPoolExecutor
+    
+    parser = argparse.ArgumentParser(description="Validate every quiz file in quiz_data/ against the schema")
+    parser.add_argument("--data-dir", default="quiz_data", help="Directory containing the quiz JSON files")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: one per CPU)")
+    parser.add_argument("--output", default=None, help="Also write the per-file report as JSON")
+    args = parser.parse_args()
+    
+    paths = sorted(
+        os.path.join(args.data_dir, name) for name in os.listdir(args.data_dir)
+        if name.endswith('.json') and not name.startswith('.')
+    )
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        reports = list(pool.map(validate_file, paths, chunksize=4))
+    elapsed = time.perf_counter() - start
+    
+    warnings = cross_file_warnings(reports)
+    for report in reports:
+        status = "ok " if report['ok'] else "ERR"
+        print(f"{status} {report['file']:<45} {report['questions']:>5} questions {report['ms']:>8.1f} ms")
+        for error in report['errors']:
+            print(f"      {error}")
+    for warning in warnings:
+        print(f"warning: {warning}")
+    
+    failed = sum(not report['ok'] for report in reports)
+    print(f"{len(reports) - failed}/{len(reports)} files valid, "
+          f"{sum(r['questions'] for r in reports)} questions, {len(warnings)} warnings in {elapsed:.2f}s "
+          f"({'orjson' if orjson else 'json'})")
+    if args.output:
+        for report in reports:
+            report.pop('questionIds', None)
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump({'files': reports, 'warnings': warnings}, file, indent=2)
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,633 @@
+"""
+Headless HTTP quiz service for GnanaVana
+
+Serves the question bank and quiz sessions as JSON over HTTP/1.1, for clients such as
+the Android app that cannot drive Streamlit reruns. It runs on one asyncio event loop
+over the same QuizRepository, QuizSession and AttemptStore as app.py, so finished
+quizzes show up in the app's results history.
+
+Responses that depend only on the bank (the hierarchy and each question as presented)
+are serialized once per bank snapshot and served with an ETag; a matching
+If-None-Match gets 304 Not Modified. Quiz state responses splice the cached question
+bytes in rather than serializing the question again. Active quizzes are kept in a
+bounded LRU and dropped after they have been idle for --idle-minutes. Starting a quiz
+on a subtopic that is not in memory reads it on a worker thread, so the loop keeps
+serving other learners meanwhile.
+
+Endpoints:
+    GET  /health
+    GET  /fields                            fields, topics and subtopics (ETag)
+    POST /quizzes                           start a quiz: {"fieldId", "topicId", "subtopicId"
+                                            or "subtopicIds", "count", "shuffle", "seed", "learnerId"}
+    GET  /quizzes/{quiz_id}                 progress and the current question
+    GET  /quizzes/{quiz_id}/questions/{i}   one question, without its answer (ETag)
+    POST /quizzes/{quiz_id}/answers         answer the current question: {"option", "index"}
+    GET  /quizzes/{quiz_id}/result          score and breakdown of a completed quiz (ETag)
+    GET  /attempts/{attempt_id}             a saved result from the attempt store
+    GET  /metrics                           Prometheus text, when GNANAVANA_METRICS=1
+
+Usage:
+    python quiz_service.py [--host 127.0.0.1] [--port 8600] [--data-dir quiz_data] [--db quiz_history.db]
+"""
+
+import asyncio
+import hashlib
+import json
+import random
+import secrets
+import sys
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Dict, List, Optional, Tuple
+
+from answer_log import DIFFICULTY_ORDER
+from attempt_store import DEFAULT_DB_PATH, AttemptStore, encode_permutation
+import metrics
+from metrics import increment, span
+from models import Question, QuizResult, QuizSession, Subtopic, new_answer_array
+from quiz_repository import DEFAULT_POLL_INTERVAL_SECONDS, QuizRepository
+from quiz_schema import json_loads
+
+try:
+    import orjson
+except ImportError:  # Optional speed-up; json gives the same results
+    orjson = None
+
+
+DEFAULT_PORT = 8600
+DEFAULT_QUESTIONS = 20
+MAX_QUESTIONS = 50
+
+# Active quizzes kept in memory; the least recently used is dropped beyond this
+MAX_ACTIVE_QUIZZES = 50_000
+DEFAULT_IDLE_SECONDS = 30 * 60
+
+# Parsed subtopics kept by the service's repository; a dedicated process can afford
+# the whole real bank instead of the Streamlit default
+DEFAULT_CACHED_SUBTOPICS = 256
+
+# Presented questions (question x option order) whose serialized form is kept
+MAX_CACHED_QUESTIONS = 20_000
+
+MAX_BODY_BYTES = 64 * 1024
+MAX_HEADERS = 64
+KEEP_ALIVE_SECONDS = 75.0
+
+REASONS = {
+    200: 'OK', 201: 'Created', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found',
+    405: 'Method Not Allowed', 409: 'Conflict', 411: 'Length Required',
+    413: 'Payload Too Large', 500: 'Internal Server Error'
+}
+
+
+def json_dumps(payload) -> bytes:
+    """Serialize compact UTF-8 JSON with orjson if available, else the json module"""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+@dataclass(frozen=True)
+class Response:
+    status: int
+    body: bytes = b''
+    etag: Optional[str] = None
+    content_type: str = 'application/json'
+
+
+def json_response(payload, status: int = 200) -> Response:
+    return Response(status, json_dumps(payload))
+
+
+def cacheable_response(body: bytes) -> Response:
+    """A response whose body only changes with the bank, tagged with a hash of its bytes"""
+    return Response(200, body, f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"')
+
+
+def error_response(status: int, message: str) -> Response:
+    return json_response({'error': message}, status)
+
+
+class RequestError(Exception):
+    """A client error answered with its status code and message"""
+    
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+@dataclass
+class ServiceQuiz:
+    """One learner's quiz held by the service"""
+    quiz_id: str
+    learner_id: str
+    quiz: QuizSession
+    subtopics: List[Subtopic]  # Subtopic of each question
+    started_at: float = field(default_factory=time.time)
+    question_shown_at: float = field(default_factory=time.monotonic)
+    last_active: float = field(default_factory=time.monotonic)
+    latencies: List[float] = field(default_factory=list)
+    result: Optional[Response] = None
+
+
+class QuizService:
+    """Request handling for the HTTP API, independent of the transport"""
+    
+    def __init__(self, repository: QuizRepository, store: Optional[AttemptStore] = None,
+                 idle_seconds: float = DEFAULT_IDLE_SECONDS, max_quizzes: int = MAX_ACTIVE_QUIZZES):
+        self.repository = repository
+        self.store = store
+        self.idle_seconds = idle_seconds
+        self.max_quizzes = max_quizzes
+        self.quizzes: "OrderedDict[str, ServiceQuiz]" = OrderedDict()  # Least recently active first
+        self._cache_version = -1
+        self._hierarchy: Optional[Response] = None
+        self._questions: "OrderedDict[tuple, Response]" = OrderedDict()
+        # SQLite allows one writer at a time; a single thread queues writes instead of
+        # letting connections on several threads back off against the lock
+        self._store_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="attempt-store")
+    
+    def warm(self) -> None:
+        """Serialize the hierarchy and load subtopics before the first learner arrives"""
+        self.hierarchy()
+        subtopics = [
+            subtopic for field_ in self.repository.get_all_fields()
+            for topic in field_.topics for subtopic in topic.subtopics
+        ]
+        for subtopic in subtopics[:self.repository.max_cached_subtopics]:
+            self.repository.get_subtopic_questions(subtopic)
+    
+    async def _in_store(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._store_executor, func, *args)
+    
+    async def handle(self, method: str, path: str, body: bytes) -> Response:
+        """Route one request; client errors become 4xx responses"""
+        parts = [part for part in path.split('?', 1)[0].split('/') if part]
+        route = parts[0] if parts else ''
+        with span(f"service.{method.lower()}.{route or 'root'}"):
+            try:
+                return await self._route(method, parts, body)
+            except RequestError as e:
+                return error_response(e.status, str(e))
+    
+    async def _route(self, method: str, parts: List[str], body: bytes) -> Response:
+        if method == 'GET':
+            if parts == ['health']:
+                return json_response({'status': 'ok', 'bankVersion': self.repository.version,
+                                      'activeQuizzes': len(self.quizzes)})
+            if parts == ['fields']:
+                return self.hierarchy()
+            if parts == ['metrics'] and metrics.ENABLED:
+                return Response(200, metrics.REGISTRY.to_prometheus().encode('utf-8'),
+                                content_type='text/plain; version=0.0.4; charset=utf-8')
+            if len(parts) == 2 and parts[0] == 'quizzes':
+                return self.quiz_state(self._get_quiz(parts[1]))
+            if len(parts) == 4 and parts[0] == 'quizzes' and parts[2] == 'questions':
+                return self.question(self._get_quiz(parts[1]), parts[3])
+            if len(parts) == 3 and parts[0] == 'quizzes' and parts[2] == 'result':
+                return self.result(self._get_quiz(parts[1]))
+            if len(parts) == 2 and parts[0] == 'attempts':
+                return await self.attempt(parts[1])
+        elif method == 'POST':
+            if parts == ['quizzes']:
+                return await self.start_quiz(self._parse_body(body))
+            if len(parts) == 3 and parts[0] == 'quizzes' and parts[2] == 'answers':
+                return await self.submit_answer(self._get_quiz(parts[1]), self._parse_body(body))
+        else:
+            raise RequestError(405, f"Method {method} is not supported")
+        raise RequestError(404, "Not found")
+    
+    @staticmethod
+    def _parse_body(body: bytes) -> dict:
+        try:
+            payload = json_loads(body) if body else {}
+        except ValueError:
+            raise RequestError(400, "Request body must be JSON") from None
+        if not isinstance(payload, dict):
+            raise RequestError(400, "Request body must be a JSON object")
+        return payload
+    
+    def _get_quiz(self, quiz_id: str) -> ServiceQuiz:
+        service_quiz = self.quizzes.get(quiz_id)
+        if service_quiz is None:
+            raise RequestError(404, "Unknown or expired quiz")
+        service_quiz.last_active = time.monotonic()
+        self.quizzes.move_to_end(quiz_id)
+        return service_quiz
+    
+    def _check_cache_version(self) -> None:
+        """Drop serialized bank responses once a refresh published a new snapshot"""
+        version = self.repository.version
+        if version != self._cache_version:
+            self._cache_version = version
+            self._hierarchy = None
+            self._questions.clear()
+    
+    def hierarchy(self) -> Response:
+        self._check_cache_version()
+        if self._hierarchy is None:
+            self._hierarchy = cacheable_response(json_dumps({
+                'version': self._cache_version,
+                'fields': [
+                    {
+                        'id': field_.id,
+                        'name': field_.name,
+                        'description': field_.description,
+                        'topics': [
+                            {
+                                'id': topic.id,
+                                'name': topic.name,
+                                'description': topic.description,
+                                'subtopics': [
+                                    {
+                                        'id': subtopic.id,
+                                        'name': subtopic.name,
+                                        'description': subtopic.description,
+                                        'str': subtopic.str_value,
+                                        'totalQuestions': subtopic.total_questions
+                                    }
+                                    for subtopic in topic.subtopics
+                                ]
+                            }
+                            for topic in field_.topics
+                        ]
+                    }
+                    for field_ in self.repository.get_all_fields()
+                ]
+            }))
+        return self._hierarchy
+    
+    def _question_response(self, question: Question, subtopic: Subtopic) -> Response:
+        """The question as presented, without its answer; shared by every quiz showing it"""
+        self._check_cache_version()
+        key = (subtopic.file_name, question.id, getattr(question, 'permutation', None))
+        response = self._questions.get(key)
+        if response is None:
+            response = cacheable_response(json_dumps({
+                'id': question.id,
+                'question': question.question,
+                'options': list(question.options),
+                'difficulty': question.difficulty.value,
+                'tags': list(question.tags),
+                'subtopicId': subtopic.id,
+                'subtopicName': subtopic.name
+            }))
+            self._questions[key] = response
+            if len(self._questions) > MAX_CACHED_QUESTIONS:
+                self._questions.popitem(last=False)
+        else:
+            self._questions.move_to_end(key)
+        return response
+    
+    def question(self, service_quiz: ServiceQuiz, index: str) -> Response:
+        quiz = service_quiz.quiz
+        if not index.isdigit() or int(index) >= len(quiz.questions):
+            raise RequestError(404, f"Question index must be 0-{len(quiz.questions) - 1}")
+        return self._question_response(quiz.questions[int(index)], service_quiz.subtopics[int(index)])
+    
+    def quiz_state(self, service_quiz: ServiceQuiz, status: int = 200) -> Response:
+        quiz = service_quiz.quiz
+        state = json_dumps({
+            'quizId': service_quiz.quiz_id,
+            'learnerId': service_quiz.learner_id,
+            'seed': quiz.seed,
+            'index': quiz.current_question_index,
+            'total': quiz.total_questions,
+            'score': quiz.correct_answers,
+            'completed': quiz.is_completed
+        })
+        current = quiz.get_current_question()
+        if current is None:
+            return Response(status, state)
+        # Splice in the cached question bytes instead of serializing the question again
+        question = self._question_response(current, service_quiz.subtopics[quiz.current_question_index])
+        return Response(status, state[:-1] + b',"question":' + question.body + b'}')
+    
+    async def start_quiz(self, payload: dict) -> Response:
+        field_id, topic_id = payload.get('fieldId'), payload.get('topicId')
+        count = payload.get('count', DEFAULT_QUESTIONS)
+        seed = payload.get('seed')
+        learner_id = payload.get('learnerId') or f"api-{uuid.uuid4().hex[:12]}"
+        if not isinstance(field_id, str) or not isinstance(topic_id, str):
+            raise RequestError(400, "fieldId and topicId are required")
+        if isinstance(count, bool) or not isinstance(count, int) or not 1 <= count <= MAX_QUESTIONS:
+            raise RequestError(400, f"count must be an integer from 1 to {MAX_QUESTIONS}")
+        if seed is None:
+            seed = random.randrange(2 ** 32)
+        elif isinstance(seed, bool) or not isinstance(seed, int):
+            raise RequestError(400, "seed must be an integer")
+        if not isinstance(learner_id, str) or len(learner_id) > 64:
+            raise RequestError(400, "learnerId must be a string of at most 64 characters")
+        shuffle = bool(payload.get('shuffle', True))
+        
+        subtopic_ids = payload.get('subtopicIds')
+        mixed = subtopic_ids is not None
+        if not mixed:
+            subtopic_ids = [payload.get('subtopicId')]
+        if not isinstance(subtopic_ids, list) or not subtopic_ids or not all(isinstance(s, str) for s in subtopic_ids):
+            raise RequestError(400, "subtopicId (or a list of subtopicIds) is required")
+        subtopics = [self.repository.get_subtopic_by_id(field_id, topic_id, s) for s in subtopic_ids]
+        if None in subtopics:
+            raise RequestError(404, "Unknown field, topic or subtopic")
+        
+        draw = (subtopics, mixed, count, shuffle, seed)
+        if all(self.repository.is_subtopic_loaded(subtopic) for subtopic in subtopics):
+            questions, question_subtopics = self._draw_questions(*draw)
+        else:
+            # Reading and decoding a cold subtopic takes milliseconds; keep the loop serving
+            increment("service.cold_draws")
+            questions, question_subtopics = await asyncio.to_thread(self._draw_questions, *draw)
+        if not questions:
+            raise RequestError(404, "No questions found for this subtopic")
+        
+        quiz = QuizSession(
+            field_id=field_id,
+            topic_id=topic_id,
+            subtopic_id='' if mixed else subtopic_ids[0],
+            questions=questions,
+            current_question_index=0,
+            user_answers=new_answer_array(len(questions)),
+            correct_answers=0,
+            total_questions=len(questions),
+            is_completed=False,
+            seed=seed,
+            question_subtopics=question_subtopics if mixed else None
+        )
+        service_quiz = ServiceQuiz(secrets.token_urlsafe(12), learner_id, quiz, question_subtopics)
+        self.quizzes[service_quiz.quiz_id] = service_quiz
+        while len(self.quizzes) > self.max_quizzes:
+            self.quizzes.popitem(last=False)
+            increment("service.quizzes_evicted")
+        increment("service.quizzes_started")
+        return self.quiz_state(service_quiz, status=201)
+    
+    def _draw_questions(self, subtopics: List[Subtopic], mixed: bool, count: int, shuffle: bool,
+                        seed: int) -> Tuple[List[Question], List[Subtopic]]:
+        """A quiz's questions and the subtopic of each"""
+        if mixed:
+            picked = self.repository.get_mixed_questions(subtopics, count, shuffle=shuffle, seed=seed)
+            return [question for question, _ in picked], [subtopic for _, subtopic in picked]
+        subtopic = subtopics[0]
+        questions = self.repository.get_questions_for_subtopic(
+            subtopic.field_id, subtopic.topic_id, subtopic.id, shuffle=shuffle, limit=count, seed=seed
+        )
+        return questions, subtopics * len(questions)
+    
+    async def submit_answer(self, service_quiz: ServiceQuiz, payload: dict) -> Response:
+        quiz = service_quiz.quiz
+        if quiz.is_completed:
+            raise RequestError(409, "Quiz is already completed")
+        position = quiz.current_question_index
+        index = payload.get('index', position)
+        if index != position:
+            raise RequestError(409, f"Question {index} is not the current question ({position})")
+        question = quiz.get_current_question()
+        option = payload.get('option')
+        if isinstance(option, bool) or not isinstance(option, int) or not 0 <= option < len(question.options):
+            raise RequestError(400, f"option must be an integer from 0 to {len(question.options) - 1}")
+        
+        now = time.monotonic()
+        is_correct = quiz.answer_question(option)
+        service_quiz.latencies.append(now - service_quiz.question_shown_at)
+        service_quiz.question_shown_at = now
+        option_explanations = question.option_explanations
+        feedback = {
+            'index': position,
+            'correct': is_correct,
+            'correctOption': question.correct_option_index,
+            'explanation': question.explanation,
+            'optionExplanation': option_explanations[option] if option < len(option_explanations) else None,
+            'score': quiz.correct_answers,
+            'nextIndex': position + 1 if quiz.next_question() else None,
+            'completed': quiz.is_completed
+        }
+        if quiz.is_completed:
+            feedback['attemptId'] = await self._finish(service_quiz)
+        return json_response(feedback)
+    
+    async def _finish(self, service_quiz: ServiceQuiz) -> Optional[int]:
+        """Score the quiz, save it with its answers in the attempt store and cache the result"""
+        quiz = service_quiz.quiz
+        repository = self.repository
+        field_ = repository.get_field_by_id(quiz.field_id)
+        topic = repository.get_topic_by_id(quiz.field_id, quiz.topic_id)
+        if quiz.question_subtopics:
+            subtopic_name = f"Mixed ({len({s.file_name for s in quiz.question_subtopics})} subtopics)"
+        else:
+            subtopic_name = service_quiz.subtopics[0].name
+        
+        breakdown = dict.fromkeys(DIFFICULTY_ORDER, 0)
+        incorrect = []
+        answers = []
+        for position, question in enumerate(quiz.questions):
+            chosen = quiz.user_answers[position]
+            is_correct = chosen == question.correct_option_index
+            if is_correct:
+                breakdown[question.difficulty.value] += 1
+            else:
+                incorrect.append(question.id)
+            file_name = service_quiz.subtopics[position].file_name
+            answers.append((position, question.id, file_name, repository.question_index(file_name, question.id),
+                            encode_permutation(getattr(question, 'permutation', None)),
+                            chosen, question.original_option_index(chosen), is_correct,
+                            service_quiz.latencies[position]))
+        
+        result = QuizResult(
+            field_name=field_.name if field_ else "Unknown",
+            topic_name=topic.name if topic else "Unknown",
+            subtopic_name=subtopic_name,
+            score=quiz.correct_answers,
+            total_questions=quiz.total_questions,
+            percentage=quiz.get_score_percentage(),
+            time_taken=str(timedelta(seconds=int(time.time() - service_quiz.started_at))),
+            difficulty_breakdown=breakdown,
+            incorrect_question_ids=incorrect
+        )
+        if self.store is not None:
+            result.attempt_id = await self._in_store(
+                self.store.save_attempt, service_quiz.learner_id, quiz.field_id, quiz.topic_id,
+                quiz.subtopic_id, result, answers, time.time(), quiz.seed
+            )
+        service_quiz.result = cacheable_response(json_dumps(_result_payload(result)))
+        increment("service.quizzes_completed")
+        return result.attempt_id
+    
+    def result(self, service_quiz: ServiceQuiz) -> Response:
+        if service_quiz.result is None:
+            raise RequestError(409, "Quiz is not completed yet")
+        return service_quiz.result
+    
+    async def attempt(self, attempt_id: str) -> Response:
+        if self.store is None or not attempt_id.isdigit():
+            raise RequestError(404, "Unknown attempt")
+        result = await self._in_store(self.store.get_attempt, int(attempt_id))
+        if result is None:
+            raise RequestError(404, "Unknown attempt")
+        return cacheable_response(json_dumps(_result_payload(result)))
+    
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Drop quizzes idle past idle_seconds; returns how many were dropped"""
+        now = time.monotonic() if now is None else now
+        dropped = 0
+        while self.quizzes:
+            service_quiz = next(iter(self.quizzes.values()))
+            if now - service_quiz.last_active < self.idle_seconds:
+                break  # Ordered by last activity, so the rest are newer
+            self.quizzes.popitem(last=False)
+            dropped += 1
+        increment("service.quizzes_expired", dropped)
+        return dropped
+
+
+def _result_payload(result: QuizResult) -> dict:
+    return {
+        'attemptId': result.attempt_id,
+        'fieldName': result.field_name,
+        'topicName': result.topic_name,
+        'subtopicName': result.subtopic_name,
+        'score': result.score,
+        'total': result.total_questions,
+        'percentage': round(result.percentage, 2),
+        'timeTaken': result.time_taken,
+        'difficultyBreakdown': result.difficulty_breakdown,
+        'incorrectQuestionIds': result.incorrect_question_ids
+    }
+
+
+async def _read_request(reader: asyncio.StreamReader) -> Optional[Tuple[str, str, str, Dict[str, str], bytes]]:
+    """Read one HTTP/1.1 request, or None when the client closed an idle connection"""
+    request_line = await asyncio.wait_for(reader.readline(), KEEP_ALIVE_SECONDS)
+    if not request_line.strip():
+        return None
+    method, target, version = request_line.decode('latin-1').split()
+    headers: Dict[str, str] = {}
+    for _ in range(MAX_HEADERS):
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    else:
+        raise RequestError(400, "Too many headers")
+    if 'transfer-encoding' in headers:
+        raise RequestError(411, "Send a Content-Length instead of a chunked body")
+    length = int(headers.get('content-length', 0))
+    if length > MAX_BODY_BYTES:
+        raise RequestError(413, f"Request bodies are limited to {MAX_BODY_BYTES} bytes")
+    body = await reader.readexactly(length) if length else b''
+    return method, target, version, headers, body
+
+
+def _encode_response(response: Response, keep_alive: bool, not_modified: bool) -> bytes:
+    status = 304 if not_modified else response.status
+    head = [f"HTTP/1.1 {status} {REASONS.get(status, 'Unknown')}"]
+    if response.etag:
+        head.append(f"ETag: {response.etag}")
+        head.append("Cache-Control: no-cache")
+    if not not_modified:
+        head.append(f"Content-Type: {response.content_type}")
+        head.append(f"Content-Length: {len(response.body)}")
+    if not keep_alive:
+        head.append("Connection: close")
+    return ("\r\n".join(head) + "\r\n\r\n").encode('latin-1') + (b'' if not_modified else response.body)
+
+
+async def _serve_connection(service: QuizService, reader: asyncio.StreamReader,
+                            writer: asyncio.StreamWriter) -> None:
+    try:
+        while True:
+            try:
+                request = await _read_request(reader)
+            except RequestError as e:
+                writer.write(_encode_response(error_response(e.status, str(e)), False, False))
+                break
+            except (ValueError, asyncio.LimitOverrunError):
+                writer.write(_encode_response(error_response(400, "Malformed request"), False, False))
+                break
+            if request is None:
+                break
+            method, target, version, headers, body = request
+            
+            try:
+                response = await service.handle(method, target, body)
+            except Exception:  # A bug in one handler must not take the connection loop down
+                traceback.print_exc()
+                response = error_response(500, "Internal server error")
+            
+            keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+            not_modified = (
+                response.etag is not None and response.status == 200
+                and response.etag in (tag.strip() for tag in headers.get('if-none-match', '').split(','))
+            )
+            if not_modified:
+                increment("service.not_modified")
+            writer.write(_encode_response(response, keep_alive, not_modified))
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+        pass  # Idle keep-alive connection or client went away
+    finally:
+        writer.close()
+
+
+async def _maintain(service: QuizService, poll_interval: float) -> None:
+    """Pick up edited quiz_data files and drop idle quizzes in the background"""
+    last_sweep = time.monotonic()
+    while True:
+        await asyncio.sleep(poll_interval)
+        try:
+            await asyncio.to_thread(service.repository.refresh)
+        except Exception:  # Keep serving the current snapshot; load_errors lists bad files
+            traceback.print_exc()
+        if time.monotonic() - last_sweep >= 60:
+            service.sweep()
+            last_sweep = time.monotonic()
+
+
+async def serve(service: QuizService, host: str = "127.0.0.1", port: int = DEFAULT_PORT,
+                poll_interval: float = DEFAULT_POLL_INTERVAL_SECONDS) -> None:
+    """Serve the API until cancelled"""
+    service.warm()
+    server = await asyncio.start_server(
+        lambda reader, writer: _serve_connection(service, reader, writer), host, port, backlog=4096
+    )
+    maintenance = asyncio.create_task(_maintain(service, poll_interval))
+    bound_host, bound_port = server.sockets[0].getsockname()[:2]
+    print(f"GnanaVana quiz service listening on http://{bound_host}:{bound_port}", flush=True)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        maintenance.cancel()
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Serve GnanaVana quizzes as a JSON HTTP API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="0 picks a free port")
+    parser.add_argument("--data-dir", default="quiz_data", help="Directory containing the quiz JSON files")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="Attempt store shared with the Streamlit app")
+    parser.add_argument("--no-store", action="store_true", help="Do not save finished quizzes")
+    parser.add_argument("--cached-subtopics", type=int, default=DEFAULT_CACHED_SUBTOPICS,
+                        help="Parsed subtopics kept in memory")
+    parser.add_argument("--idle-minutes", type=float, default=DEFAULT_IDLE_SECONDS / 60,
+                        help="Drop quizzes idle for this long")
+    args = parser.parse_args()
+    
+    service = QuizService(
+        QuizRepository(args.data_dir, max_cached_subtopics=args.cached_subtopics),
+        store=None if args.no_store else AttemptStore(args.db),
+        idle_seconds=args.idle_minutes * 60
+    )
+    try:
+        asyncio.run(serve(service, args.host, args.port))
+    except KeyboardInterrupt:
+        sys.exit(0)
@@ -0,0 +1,230 @@
+"""
+Full-text and tag search over the GnanaVana question bank
+
+Question text, explanations and tags are tokenized once per quiz file into
+FileDocuments. SearchIndex merges those into an inverted index (term -> NumPy arrays of
+document ids and weighted term frequencies) plus tag postings, and ranks matches with
+BM25. Queries touch only the postings of their own terms, so a search across the whole
+bank takes milliseconds, and a hot reload only re-tokenizes the files that changed.
+"""
+
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from models import Question
+
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:['\-][a-z0-9]+)*")
+
+STOPWORDS = frozenset("""
+a an and are as at be by can does for from how in is it its of on or that the this
+to what when which while who why will with
+""".split())
+
+# Tags are short, curated descriptions of a question, so their terms count for more
+TAG_WEIGHT = 2.0
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens without stopwords, with plurals folded to the singular"""
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        if len(token) > 4 and token.endswith('ies'):
+            token = token[:-3] + 'y'
+        elif len(token) > 3 and token.endswith('s') and not token.endswith(('ss', 'us', 'is')):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def normalize_tag(tag: str) -> str:
+    """'Gradient_Descent', 'gradient-descent' and 'gradient descent' are the same tag"""
+    return ' '.join(re.split(r"[\s_\-]+", tag.strip().lower()))
+
+
+@dataclass(frozen=True)
+class SearchFilters:
+    """Restrictions applied to search results; unset fields match everything"""
+    field_id: Optional[str] = None
+    topic_id: Optional[str] = None
+    subtopic_id: Optional[str] = None
+    difficulties: Tuple[str, ...] = ()  # Any of these QuestionDifficulty values
+    tags: Tuple[str, ...] = ()  # All of these tags
+
+
+@dataclass(frozen=True)
+class FileDocuments:
+    """Tokenized questions of one quiz file, reusable across index rebuilds"""
+    file_name: str
+    field_id: str
+    topic_id: str
+    subtopic_id: str
+    question_ids: Tuple[str, ...]
+    difficulties: Tuple[str, ...]
+    terms: Tuple[Dict[str, float], ...]  # Weighted term frequencies per question
+    tags: Tuple[Tuple[str, ...], ...]  # Normalized tags per question
+    
+    @classmethod
+    def from_questions(cls, file_name: str, field_id: str, topic_id: str, subtopic_id: str,
+                       questions: Sequence[Question]) -> 'FileDocuments':
+        terms = []
+        for question in questions:
+            frequencies: Dict[str, float] = Counter(tokenize(question.question))
+            for token in tokenize(question.explanation):
+                frequencies[token] += 1.0
+            for tag in question.tags:
+                for token in tokenize(tag):
+                    frequencies[token] += TAG_WEIGHT
+            terms.append(dict(frequencies))
+        
+        return cls(
+            file_name=file_name,
+            field_id=field_id,
+            topic_id=topic_id,
+            subtopic_id=subtopic_id,
+            question_ids=tuple(q.id for q in questions),
+            difficulties=tuple(q.difficulty.value for q in questions),
+            terms=tuple(terms),
+            tags=tuple(tuple(normalize_tag(tag) for tag in q.tags) for q in questions)
+        )
+
+
+@dataclass(frozen=True)
+class SearchHit:
+    """Position of a matching question in the bank and its BM25 score"""
+    file_name: str
+    index: int  # Question number within the file
+    question_id: str
+    score: float
+
+
+class SearchIndex:
+    """Immutable inverted index over a set of FileDocuments"""
+    
+    def __init__(self, files: Iterable[FileDocuments], version: int = 0):
+        self.version = version
+        self.files: Dict[str, FileDocuments] = {}
+        
+        file_names: List[str] = []
+        doc_file: List[int] = []
+        doc_index: List[int] = []
+        lengths: List[float] = []
+        postings: Dict[str, Tuple[List[int], List[float]]] = {}
+        tag_postings: Dict[str, List[int]] = {}
+        field_ids: List[str] = []
+        topic_ids: List[str] = []
+        subtopic_ids: List[str] = []
+        difficulties: List[str] = []
+        
+        for documents in files:
+            self.files[documents.file_name] = documents
+            file_number = len(file_names)
+            file_names.append(documents.file_name)
+            for index, (terms, tags) in enumerate(zip(documents.terms, documents.tags)):
+                doc = len(doc_file)
+                doc_file.append(file_number)
+                doc_index.append(index)
+                lengths.append(sum(terms.values()))
+                for term, frequency in terms.items():
+                    docs, frequencies = postings.setdefault(term, ([], []))
+                    docs.append(doc)
+                    frequencies.append(frequency)
+                for tag in set(tags):
+                    tag_postings.setdefault(tag, []).append(doc)
+            count = len(documents.question_ids)
+            field_ids.extend([documents.field_id] * count)
+            topic_ids.extend([documents.topic_id] * count)
+            subtopic_ids.extend([documents.subtopic_id] * count)
+            difficulties.extend(documents.difficulties)
+        
+        self._file_names = file_names
+        self._doc_file = np.array(doc_file, dtype=np.int32)
+        self._doc_index = np.array(doc_index, dtype=np.int32)
+        self._lengths = np.array(lengths, dtype=np.float32)
+        self._average_length = float(self._lengths.mean()) if len(lengths) else 0.0
+        self._postings = {
+            term: (np.array(docs, dtype=np.int32), np.array(frequencies, dtype=np.float32))
+            for term, (docs, frequencies) in postings.items()
+        }
+        self._tag_postings = {tag: np.array(docs, dtype=np.int32) for tag, docs in tag_postings.items()}
+        # All normalized tags, most used first
+        self.tags: List[str] = sorted(tag_postings, key=lambda tag: (-len(tag_postings[tag]), tag))
+        self._field_ids = np.array(field_ids, dtype=object)
+        self._topic_ids = np.array(topic_ids, dtype=object)
+        self._subtopic_ids = np.array(subtopic_ids, dtype=object)
+        self._difficulties = np.array(difficulties, dtype=object)
+    
+    def __len__(self) -> int:
+        return len(self._doc_file)
+    
+    def _filter_mask(self, filters: SearchFilters) -> Optional[np.ndarray]:
+        """Boolean mask of the documents allowed by the filters, or None for all of them"""
+        mask = None
+        
+        def restrict(allowed: np.ndarray) -> None:
+            nonlocal mask
+            mask = allowed if mask is None else mask & allowed
+        
+        if filters.field_id:
+            restrict(self._field_ids == filters.field_id)
+        if filters.topic_id:
+            restrict(self._topic_ids == filters.topic_id)
+        if filters.subtopic_id:
+            restrict(self._subtopic_ids == filters.subtopic_id)
+        if filters.difficulties:
+            restrict(np.isin(self._difficulties, list(filters.difficulties)))
+        for tag in filters.tags:
+            allowed = np.zeros(len(self), dtype=bool)
+            allowed[self._tag_postings.get(normalize_tag(tag), [])] = True
+            restrict(allowed)
+        return mask
+    
+    def search(self, query: str, filters: Optional[SearchFilters] = None,
+               limit: Optional[int] = 50) -> List[SearchHit]:
+        """
+        Rank questions matching any query term with BM25.
+
+        An empty query returns every question allowed by the filters in bank order,
+        e.g. all questions tagged "gradient descent". A query with no indexed terms, such
+        as only stop words ("what is the"), matches nothing.
+        """
+        mask = self._filter_mask(filters) if filters else None
+        terms = [term for term in dict.fromkeys(tokenize(query)) if term in self._postings]
+        
+        if not terms:
+            if query.strip():
+                return []  # Nothing in the bank matches the query
+            docs = np.flatnonzero(mask) if mask is not None else np.arange(len(self))
+            docs = docs[:limit] if limit else docs
+            return [self._hit(doc, 0.0) for doc in docs]
+        
+        scores = np.zeros(len(self), dtype=np.float32)
+        n_docs = len(self)
+        for term in terms:
+            docs, frequencies = self._postings[term]
+            idf = np.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            norm = K1 * (1 - B + B * self._lengths[docs] / self._average_length)
+            scores[docs] += idf * frequencies * (K1 + 1) / (frequencies + norm)
+        
+        if mask is not None:
+            scores[~mask] = 0.0
+        matches = np.flatnonzero(scores)
+        if limit and len(matches) > limit:
+            matches = matches[np.argpartition(-scores[matches], limit - 1)[:limit]]
+        matches = matches[np.argsort(-scores[matches], kind='stable')]
+        return [self._hit(doc, float(scores[doc])) for doc in matches]
+    
+    def _hit(self, doc: int, score: float) -> SearchHit:
+        file_name = self._file_names[self._doc_file[doc]]
+        index = int(self._doc_index[doc])
+        return SearchHit(file_name, index, self.files[file_name].question_ids[index], score)
@@ -0,0 +1,239 @@
+"""
+Load test for the GnanaVana quiz service
+
+Simulates concurrent learners against quiz_service.py over keep-alive HTTP connections:
+each one fetches the hierarchy, revalidates it with its ETag, starts a quiz on a random
+subtopic, answers every question and fetches the result. Learners start over
+--ramp-seconds and pause --think-ms (randomized by +/-50%) before each request, like
+people reading a question; --think-ms 0 turns the test into a saturation run. Every
+request is timed. The report (JSON) has p50/p90/p99 latency overall and per step,
+throughput, status counts and the server's peak memory.
+
+Without --url a local service is started on a free port, with its attempt store in a
+temporary directory so the test never writes to the real quiz_history.db. Client and
+server share the machine, so on few cores the latencies include client overhead.
+
+Usage:
+    python service_load_test.py [--learners 1000] [--questions 10] [--think-ms 1000]
+                                [--ramp-seconds 5] [--url http://127.0.0.1:8600]
+                                [--output service_load_test.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from load_test import percentiles
+
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class Client:
+    """One keep-alive HTTP/1.1 connection issuing JSON requests"""
+    
+    def __init__(self, host: str, port: int, timings: Dict[str, List[float]], statuses: Counter,
+                 think: float = 0.0, rng: Optional[random.Random] = None):
+        self.host = host
+        self.port = port
+        self.timings = timings
+        self.statuses = statuses
+        self.think = think
+        self.rng = rng or random.Random()
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+    
+    async def request(self, step: str, method: str, path: str, payload=None,
+                      headers: Optional[Dict[str, str]] = None) -> Tuple[int, Dict[str, str], object]:
+        if self.think:
+            await asyncio.sleep(self.think * self.rng.uniform(0.5, 1.5))
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+        head = [f"{method} {path} HTTP/1.1", f"Host: {self.host}", f"Content-Length: {len(body)}"]
+        head.extend(f"{name}: {value}" for name, value in (headers or {}).items())
+        
+        start = time.perf_counter()
+        self.writer.write(("\r\n".join(head) + "\r\n\r\n").encode('latin-1') + body)
+        status = int((await self.reader.readline()).split()[1])
+        response_headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            response_headers[name.strip().lower()] = value.strip()
+        length = int(response_headers.get('content-length', 0))
+        content = await self.reader.readexactly(length) if length else b''
+        self.timings[step].append(time.perf_counter() - start)
+        self.statuses[status] += 1
+        return status, response_headers, json.loads(content) if content else None
+    
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+
+
+async def learner_journey(client: Client, rng: random.Random, questions: int) -> int:
+    """One learner from the hierarchy to the result; returns the number of answers"""
+    status, headers, hierarchy = await client.request("hierarchy", "GET", "/fields")
+    await client.request("hierarchy_revalidate", "GET", "/fields",
+                         headers={'If-None-Match': headers.get('etag', '')})
+    field = rng.choice(hierarchy['fields'])
+    topic = rng.choice(field['topics'])
+    subtopic = rng.choice(topic['subtopics'])
+    
+    status, _, state = await client.request("start_quiz", "POST", "/quizzes", {
+        'fieldId': field['id'], 'topicId': topic['id'], 'subtopicId': subtopic['id'],
+        'count': questions, 'seed': rng.randrange(2 ** 32)
+    })
+    if status != 201:
+        raise RuntimeError(f"start_quiz returned {status}: {state}")
+    quiz_id = state['quizId']
+    answers = 0
+    question = state['question']
+    while True:
+        status, _, feedback = await client.request("answer", "POST", f"/quizzes/{quiz_id}/answers", {
+            'index': answers, 'option': rng.randrange(len(question['options']))
+        })
+        if status != 200:
+            raise RuntimeError(f"answer returned {status}: {feedback}")
+        answers += 1
+        if feedback['completed']:
+            break
+        status, _, question = await client.request(
+            "question", "GET", f"/quizzes/{quiz_id}/questions/{feedback['nextIndex']}"
+        )
+    
+    status, _, result = await client.request("result", "GET", f"/quizzes/{quiz_id}/result")
+    if status != 200 or result['total'] != answers:
+        raise RuntimeError(f"result returned {status}: {result}")
+    return answers
+
+
+async def run_load_test(host: str, port: int, learners: int, questions: int, think: float,
+                        ramp: float, seed: int) -> dict:
+    timings: Dict[str, List[float]] = defaultdict(list)
+    statuses: Counter = Counter()
+    errors: List[str] = []
+    
+    async def run(i: int) -> int:
+        rng = random.Random(seed + i)
+        await asyncio.sleep(ramp * i / learners)
+        client = Client(host, port, timings, statuses, think, rng)
+        try:
+            return await learner_journey(client, rng, questions)
+        except Exception as e:  # Report and keep going; one failed learner should not stop the run
+            errors.append(f"learner {i}: {e!r}")
+            return 0
+        finally:
+            client.close()
+    
+    # One untimed learner loads the bank and the subtopic caches, like a warm server
+    warmup = Client(host, port, defaultdict(list), Counter())
+    await learner_journey(warmup, random.Random(seed - 1), questions)
+    warmup.close()
+    
+    start = time.perf_counter()
+    answers = sum(await asyncio.gather(*(run(i) for i in range(learners))))
+    elapsed = time.perf_counter() - start
+    
+    all_requests = [sample for samples in timings.values() for sample in samples]
+    return {
+        'config': {
+            'learners': learners,
+            'questions_per_quiz': questions,
+            'think_ms': think * 1000,
+            'ramp_seconds': ramp,
+            'seed': seed,
+            'python': sys.version.split()[0]
+        },
+        'elapsed_seconds': round(elapsed, 3),
+        'throughput': {
+            'requests_per_second': round(len(all_requests) / elapsed, 1),
+            'answers_per_second': round(answers / elapsed, 1),
+            'quizzes_per_second': round((learners - len(errors)) / elapsed, 2)
+        },
+        'latency_ms': percentiles(all_requests),
+        'latency_ms_by_step': {step: percentiles(samples) for step, samples in sorted(timings.items())},
+        'statuses': {str(status): count for status, count in sorted(statuses.items())},
+        'errors': errors[:50]
+    }
+
+
+def server_peak_rss_mib(pid: int) -> Optional[float]:
+    """Peak resident memory of the spawned server (Linux only)"""
+    try:
+        with open(f"/proc/{pid}/status", encoding='ascii') as file:
+            for line in file:
+                if line.startswith('VmHWM:'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Simulate concurrent learners against quiz_service.py")
+    parser.add_argument("--learners", type=int, default=1000, help="Learners running at the same time")
+    parser.add_argument("--questions", type=int, default=10, help="Questions per quiz (1-50)")
+    parser.add_argument("--think-ms", type=float, default=1000.0,
+                        help="Mean pause before each request (0 for a saturation run)")
+    parser.add_argument("--ramp-seconds", type=float, default=5.0, help="Spread learner starts over this long")
+    parser.add_argument("--url", default=None, help="Test a running service instead of starting one")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default=None, help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+    
+    process = None
+    workdir = None
+    try:
+        if args.url:
+            url = urlsplit(args.url)
+            host, port = url.hostname, url.port or 80
+        else:
+            workdir = tempfile.mkdtemp(prefix="gnanavana-service-")
+            process = subprocess.Popen(
+                [sys.executable, os.path.join(APP_DIR, "quiz_service.py"), "--port", "0",
+                 "--data-dir", os.path.join(APP_DIR, "quiz_data"),
+                 "--db", os.path.join(workdir, "quiz_history.db")],
+                cwd=APP_DIR, stdout=subprocess.PIPE, text=True
+            )
+            line = process.stdout.readline()
+            if not line.startswith("GnanaVana quiz service listening"):
+                raise RuntimeError(f"Service did not start: {line!r}")
+            url = urlsplit(line.split()[-1])
+            host, port = url.hostname, url.port
+        
+        report = asyncio.run(run_load_test(host, port, args.learners, args.questions, args.think_ms / 1000,
+                                           args.ramp_seconds, args.seed))
+        if process is not None:
+            report['server_max_rss_mib'] = server_peak_rss_mib(process.pid)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=10)
+        if workdir is not None:
+            shutil.rmtree(workdir, ignore_errors=True)
+    
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+    return 1 if report['errors'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,245 @@
+"""
+Bounded per-session state for GnanaVana
+
+Each browser session keeps its heavy state, the active quiz and the answer log, in one
+LearnerSession object. A process-wide SessionManager tracks those objects and, from a
+background thread, compacts sessions that have been idle past a threshold: the quiz is
+reduced to question IDs, option permutations and an answer array, and pickled together
+with the trimmed answer log into one zlib-compressed blob. Idle tabs then stop pinning
+parsed questions that the shared repository's LRU has already evicted. The next access
+from the session restores everything from the shared repository transparently.
+"""
+
+import pickle
+import threading
+import time
+import weakref
+import zlib
+from array import array
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import streamlit as st
+
+from answer_log import AnswerLog
+from attempt_store import decode_permutation, encode_permutation
+from metrics import increment, register_gauge
+from models import Question, QuizSession, ShuffledQuestion
+from quiz_repository import QuizRepository
+from streamlit_resources import get_shared_repository
+
+
+# Sessions untouched for this long are compacted
+DEFAULT_IDLE_SECONDS = 10 * 60
+
+# How often the background thread looks for idle sessions
+DEFAULT_SWEEP_INTERVAL_SECONDS = 60.0
+
+
+@dataclass(frozen=True)
+class CompactQuiz:
+    """A QuizSession reduced to IDs and arrays; questions are looked up again on restore"""
+    field_id: str
+    topic_id: str
+    subtopic_id: str
+    seed: Optional[int]
+    mixed: bool
+    current_question_index: int
+    correct_answers: int
+    is_completed: bool
+    question_files: Tuple[str, ...]  # Quiz file of each question in a mixed quiz, else empty
+    question_ids: Tuple[str, ...]
+    permutations: Tuple[Optional[str], ...]  # encode_permutation of each question's option order
+    answers: bytes  # user_answers as signed bytes
+    
+    @classmethod
+    def from_quiz(cls, quiz: QuizSession) -> 'CompactQuiz':
+        return cls(
+            field_id=quiz.field_id,
+            topic_id=quiz.topic_id,
+            subtopic_id=quiz.subtopic_id,
+            seed=quiz.seed,
+            mixed=bool(quiz.question_subtopics),
+            current_question_index=quiz.current_question_index,
+            correct_answers=quiz.correct_answers,
+            is_completed=quiz.is_completed,
+            question_files=tuple(subtopic.file_name for subtopic in quiz.question_subtopics or ()),
+            question_ids=tuple(q.id for q in quiz.questions),
+            permutations=tuple(encode_permutation(getattr(q, 'permutation', None)) for q in quiz.questions),
+            answers=quiz.user_answers.tobytes()
+        )
+    
+    def restore(self, repository: QuizRepository) -> Optional[QuizSession]:
+        """Rebuild the quiz, or None if one of its files or questions no longer exists"""
+        if self.mixed:
+            files = self.question_files
+        else:
+            subtopic = repository.get_subtopic_by_id(self.field_id, self.topic_id, self.subtopic_id)
+            if subtopic is None:
+                return None
+            files = (subtopic.file_name,) * len(self.question_ids)
+        
+        by_file: Dict[str, Dict[str, Question]] = {}
+        questions = []
+        subtopics = []
+        for filename, question_id, permutation in zip(files, self.question_ids, self.permutations):
+            subtopic = repository.get_subtopic_by_file(filename)
+            if subtopic is None:
+                return None
+            if filename not in by_file:
+                by_file[filename] = {}
+                for question in repository.get_subtopic_questions(subtopic):
+                    by_file[filename].setdefault(question.id, question)
+            question = by_file[filename].get(question_id)
+            order = decode_permutation(permutation)
+            if question is None or (order and len(order) != len(question.options)):
+                return None
+            questions.append(ShuffledQuestion(base=question, permutation=order) if order else question)
+            subtopics.append(subtopic)
+        
+        user_answers = array('b')
+        user_answers.frombytes(self.answers)
+        return QuizSession(
+            field_id=self.field_id,
+            topic_id=self.topic_id,
+            subtopic_id=self.subtopic_id,
+            questions=questions,
+            current_question_index=self.current_question_index,
+            user_answers=user_answers,
+            correct_answers=self.correct_answers,
+            total_questions=len(questions),
+            is_completed=self.is_completed,
+            seed=self.seed,
+            question_subtopics=subtopics if self.mixed else None
+        )
+
+
+class LearnerSession:
+    """
+    Heavy state of one browser session, safe to compact from another thread.
+
+    Reading current_quiz or answer_log marks the session active and restores it first
+    if it was compacted.
+    """
+    
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.last_active = time.monotonic()
+        self.restore_failed = False  # The compacted quiz could not be rebuilt
+        self._current_quiz: Optional[QuizSession] = None
+        self._answer_log: Optional[AnswerLog] = AnswerLog()
+        self._packed: Optional[bytes] = None
+    
+    @property
+    def is_compacted(self) -> bool:
+        return self._packed is not None
+    
+    @property
+    def current_quiz(self) -> Optional[QuizSession]:
+        with self.lock:
+            self._activate()
+            return self._current_quiz
+    
+    @current_quiz.setter
+    def current_quiz(self, quiz: Optional[QuizSession]) -> None:
+        with self.lock:
+            self._activate()
+            self._current_quiz = quiz
+    
+    @property
+    def answer_log(self) -> AnswerLog:
+        with self.lock:
+            self._activate()
+            return self._answer_log
+    
+    def _activate(self) -> None:
+        self.last_active = time.monotonic()
+        if self._packed is not None:
+            self._restore(get_shared_repository())
+    
+    def compact(self) -> int:
+        """Replace the quiz and answer log with one compressed blob; returns its size"""
+        with self.lock:
+            if self._packed is not None or (self._current_quiz is None and not len(self._answer_log)):
+                return 0
+            quiz = CompactQuiz.from_quiz(self._current_quiz) if self._current_quiz else None
+            self._packed = zlib.compress(pickle.dumps((quiz, self._answer_log), pickle.HIGHEST_PROTOCOL))
+            self._current_quiz = None
+            self._answer_log = None
+            increment("sessions.compacted")
+            return len(self._packed)
+    
+    def _restore(self, repository: QuizRepository) -> None:
+        quiz, answer_log = pickle.loads(zlib.decompress(self._packed))
+        self._packed = None
+        self._answer_log = answer_log
+        self._current_quiz = quiz.restore(repository) if quiz else None
+        self.restore_failed = quiz is not None and self._current_quiz is None
+        increment("sessions.restored")
+
+
+class SessionManager:
+    """Tracks every live LearnerSession in the process and compacts idle ones"""
+    
+    def __init__(self, idle_seconds: float = DEFAULT_IDLE_SECONDS,
+                 sweep_interval: Optional[float] = DEFAULT_SWEEP_INTERVAL_SECONDS):
+        self.idle_seconds = idle_seconds
+        self._lock = threading.Lock()
+        # Streamlit drops the session state of closed tabs; weak references follow suit
+        self._sessions: "weakref.WeakSet[LearnerSession]" = weakref.WeakSet()
+        self._stop = threading.Event()
+        if sweep_interval:
+            threading.Thread(target=self._run, args=(sweep_interval,), name="session-sweeper", daemon=True).start()
+    
+    def register(self, session: LearnerSession) -> None:
+        with self._lock:
+            self._sessions.add(session)
+    
+    def sessions(self) -> List[LearnerSession]:
+        with self._lock:
+            return list(self._sessions)
+    
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Compact every session idle past idle_seconds; returns how many were compacted"""
+        now = time.monotonic() if now is None else now
+        compacted = 0
+        for session in self.sessions():
+            if session.is_compacted or now - session.last_active < self.idle_seconds:
+                continue
+            if not session.lock.acquire(blocking=False):
+                continue  # Mid-rerun, so not idle after all
+            try:
+                if now - session.last_active >= self.idle_seconds:
+                    compacted += bool(session.compact())
+            finally:
+                session.lock.release()
+        return compacted
+    
+    def _run(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            try:
+                self.sweep()
+            except Exception:  # Keep sweeping; a failed pass leaves sessions uncompacted
+                continue
+    
+    def stop(self) -> None:
+        self._stop.set()
+
+
+@st.cache_resource(show_spinner=False)
+def get_shared_session_manager() -> SessionManager:
+    """Get the process-wide session manager and start its idle sweeper"""
+    manager = SessionManager()
+    register_gauge("sessions.live", lambda: len(manager.sessions()))
+    register_gauge("sessions.compacted_now", lambda: sum(s.is_compacted for s in manager.sessions()))
+    return manager
+
+
+def get_learner_session() -> LearnerSession:
+    """Get this browser session's LearnerSession, creating and registering it on first use"""
+    session = st.session_state.get('learner_session')
+    if session is None:
+        session = LearnerSession()
+        st.session_state.learner_session = session
+        get_shared_session_manager().register(session)
+    return session
@@ -0,0 +1,47 @@
+"""
+Process-wide objects shared by every Streamlit session of GnanaVana
+
+The repository, attempt store and metrics endpoint are created once per process with
+st.cache_resource. They live here rather than in the modules that define them, so the
+quiz service and the command-line tools can import those modules without Streamlit.
+"""
+
+from http.server import ThreadingHTTPServer
+from typing import Optional
+
+import streamlit as st
+
+from attempt_store import DEFAULT_DB_PATH, AttemptStore
+from metrics import register_gauge, start_metrics_server
+from quiz_repository import DEFAULT_POLL_INTERVAL_SECONDS, QuizRepository
+
+
+@st.cache_resource(show_spinner=False)
+def get_shared_repository(data_dir: str = "quiz_data") -> QuizRepository:
+    """
+    Get the process-wide repository shared by every session.
+
+    st.cache_resource hands out the same instance on every call instead of pickling
+    and unpickling the whole hierarchy the way st.cache_data does.
+    """
+    repository = QuizRepository(data_dir, poll_interval=DEFAULT_POLL_INTERVAL_SECONDS)
+    register_gauge("repository.subtopic_cache.size", lambda: len(repository._subtopics_cache))
+    register_gauge("repository.snapshot_version", lambda: repository.version)
+    return repository
+
+
+def invalidate_shared_repository() -> None:
+    """Drop the shared repository; the next get_shared_repository call reloads the bank"""
+    get_shared_repository.clear()
+
+
+@st.cache_resource(show_spinner=False)
+def get_shared_attempt_store(db_path: str = DEFAULT_DB_PATH) -> AttemptStore:
+    """Get the process-wide attempt store shared by every session"""
+    return AttemptStore(db_path)
+
+
+@st.cache_resource(show_spinner=False)
+def get_shared_metrics_server() -> Optional[ThreadingHTTPServer]:
+    """Start the local metrics endpoint once per process; None when it is not running"""
+    return start_metrics_server()
@@ -0,0 +1,39 @@
+import os
+import shutil
+import sys
+
+import pytest
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+DATA_DIR = os.path.join(APP_DIR, "quiz_data")
+
+
+def _quiz_file_names():
+    return sorted(name for name in os.listdir(DATA_DIR) if name.endswith('.json') and not name.startswith('.'))
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    """A copy of a few quiz_data files, so tests can edit and touch them"""
+    copy = tmp_path / "quiz_data"
+    copy.mkdir()
+    for name in _quiz_file_names()[:3]:
+        shutil.copy2(os.path.join(DATA_DIR, name), copy / name)
+    return str(copy)
+
+
+@pytest.fixture
+def spare_quiz_file():
+    """Path of a quiz_data file that data_dir does not copy, for tests that add one"""
+    return os.path.join(DATA_DIR, _quiz_file_names()[3])
+
+
+@pytest.fixture
+def repository(data_dir):
+    """A QuizRepository over data_dir, with its hierarchy loaded"""
+    from quiz_repository import QuizRepository
+    repository = QuizRepository(data_dir)
+    repository.get_all_fields()
+    return repository
@@ -0,0 +1,56 @@
+import os
+import subprocess
+import sys
+
+from answer_log import AnswerLog
+from models import Question, QuestionDifficulty
+
+
+def _question(question_id, difficulty):
+    return Question(id=question_id, question="?", options=("a", "b", "c"), correct_option_index=0,
+                    explanation="", option_explanations=("", "", ""), difficulty=difficulty, tags=("t",))
+
+
+def _log():
+    log = AnswerLog(capacity=2)
+    first = log.start_attempt()
+    for position, (difficulty, chosen) in enumerate([(QuestionDifficulty.EASY, 0), (QuestionDifficulty.HARD, 0),
+                                                     (QuestionDifficulty.HARD, 2)]):
+        question = _question(f"Q{position}", difficulty)
+        log.append(first, position, question, "S", "Subtopic", chosen, chosen == 0, 1.5)
+    second = log.start_attempt()
+    log.append(second, 0, _question("Q9", QuestionDifficulty.MEDIUM), "S", "Subtopic", 1, False, 2.0)
+    return log, first, second
+
+
+def test_attempt_summary():
+    log, first, second = _log()
+    assert log.attempt_summary(first) == {
+        'correct': 2,
+        'answered': 3,
+        'difficulty_breakdown': {'EASY': 1, 'MEDIUM': 0, 'HARD': 1},
+        'incorrect_question_ids': ["Q2"]
+    }
+    assert log.attempt_summary(second)['incorrect_question_ids'] == ["Q9"]
+
+
+def test_attempt_columns_keep_answer_order():
+    log, first, _ = _log()
+    rows = log.attempt_columns(first)
+    assert rows['position'].tolist() == [0, 1, 2]
+    assert rows['chosen_option'].tolist() == [0, 0, 2]
+    assert rows['is_correct'].tolist() == [True, True, False]
+
+
+def test_finishing_a_quiz_does_not_import_pandas():
+    script = (
+        "import sys\n"
+        "sys.path.insert(0, 'tests')\n"
+        "from test_answer_log import _log\n"
+        "log, first, _ = _log()\n"
+        "log.attempt_summary(first)\n"
+        "log.attempt_columns(first)\n"
+        "assert 'pandas' not in sys.modules\n"
+    )
+    app_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    subprocess.run([sys.executable, "-c", script], cwd=app_dir, check=True)
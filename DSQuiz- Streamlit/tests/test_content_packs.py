@@ -0,0 +1,58 @@
+import dataclasses
+import os
+
+import pytest
+
+from content_packs import DeltaError, apply_delta, canonical_content, make_delta
+from quiz_schema import load_quiz_file
+
+
+@pytest.fixture
+def pack(data_dir):
+    """Canonical pack content of a real quiz file and the QuizFile it came from"""
+    quiz_file = load_quiz_file(os.path.join(data_dir, sorted(os.listdir(data_dir))[0]))
+    return quiz_file, canonical_content(quiz_file)
+
+
+def _edited(quiz_file, questions):
+    return canonical_content(dataclasses.replace(quiz_file, questions=tuple(questions)))
+
+
+def test_delta_of_one_edited_question(pack):
+    quiz_file, base = pack
+    questions = list(quiz_file.questions)
+    questions[1] = dataclasses.replace(questions[1], explanation=questions[1].explanation + " (Revised.)")
+    target = _edited(quiz_file, questions)
+    
+    delta = make_delta(base, target)
+    assert apply_delta(base, delta) == target
+    assert len(delta) < len(target) // 4
+
+
+@pytest.mark.parametrize("change", ["insert", "delete", "reverse", "same"])
+def test_delta_roundtrip(pack, change):
+    quiz_file, base = pack
+    questions = list(quiz_file.questions)
+    if change == "insert":
+        questions.insert(2, dataclasses.replace(questions[0], id="NEW_001", question="A brand new question?"))
+    elif change == "delete":
+        del questions[0]
+    elif change == "reverse":
+        questions.reverse()
+    target = _edited(quiz_file, questions)
+    
+    assert apply_delta(base, make_delta(base, target)) == target
+
+
+@pytest.mark.parametrize("base, target", [(b"", b"new\ncontent\n"), (b"old\ncontent\n", b""), (b"", b"")])
+def test_delta_roundtrip_empty(base, target):
+    assert apply_delta(base, make_delta(base, target)) == target
+
+
+def test_delta_rejects_other_base(pack):
+    _, base = pack
+    delta = make_delta(base, base + b"\n")
+    with pytest.raises(DeltaError):
+        apply_delta(base[:-1], delta)
+    with pytest.raises(DeltaError):
+        apply_delta(base, delta[:20])
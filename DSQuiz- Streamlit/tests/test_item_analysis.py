@@ -0,0 +1,19 @@
+from item_analysis import original_options
+
+
+def test_stored_original_option_is_kept():
+    assert original_options([2, 0], [1, 3], ["2,0,1,3", None]).tolist() == [2, 0]
+
+
+def test_missing_original_option_is_mapped_through_permutation():
+    # Shown position 1 held original option 0
+    assert original_options([None], [1], ["2,0,1,3"]).tolist() == [0]
+
+
+def test_unshuffled_answer_keeps_chosen_option():
+    assert original_options([None], [3], [None]).tolist() == [3]
+
+
+def test_unknown_options_are_minus_one():
+    result = original_options([None, None, None], [None, -1, 4], ["1,0,2,3", "1,0,2,3", "1,0,2,3"])
+    assert result.tolist() == [-1, -1, -1]
@@ -0,0 +1,78 @@
+import sqlite3
+
+import pytest
+
+import attempt_store
+import leaderboard
+from leaderboard import OVERALL
+
+
+@pytest.fixture
+def connection():
+    connection = sqlite3.connect(":memory:")
+    connection.executescript(attempt_store.SCHEMA)
+    leaderboard.ensure_schema(connection)
+    yield connection
+    connection.close()
+
+
+SCOPE = ("FLD_DSC", "TPC_MLG", "STC_LRG")
+
+
+def _record(connection, user_id, percentage, finished_at, correct=None, subtopic=SCOPE):
+    correct = round(percentage / 10) if correct is None else correct
+    leaderboard.record_attempt(connection, user_id, *subtopic, percentage, correct, 10, finished_at)
+
+
+def _board(connection, order='best', scope=OVERALL):
+    return [entry.user_id for entry in leaderboard.get_top_learners(connection, scope, 10, order)]
+
+
+def _assert_ranks_match_board(connection, order):
+    for position, user_id in enumerate(_board(connection, order), start=1):
+        assert leaderboard.get_learner_rank(connection, user_id, OVERALL, order) == position
+
+
+def test_best_score_ties_go_to_the_earlier_score(connection):
+    _record(connection, "late", 80.0, finished_at=20.0)
+    _record(connection, "early", 80.0, finished_at=10.0)
+    _record(connection, "top", 90.0, finished_at=30.0)
+    # A later equal score does not move the learner's best_at
+    _record(connection, "early", 80.0, finished_at=40.0)
+    
+    assert _board(connection) == ["top", "early", "late"]
+    _assert_ranks_match_board(connection, 'best')
+
+
+def test_complete_ties_are_ordered_by_user_id(connection):
+    for user_id in ("carol", "alice", "bob"):
+        _record(connection, user_id, 70.0, finished_at=5.0)
+    
+    for order in ('best', 'correct'):
+        assert _board(connection, order) == ["alice", "bob", "carol"]
+        _assert_ranks_match_board(connection, order)
+
+
+def test_correct_answer_ties_go_to_the_earlier_learner(connection):
+    _record(connection, "b", 50.0, finished_at=1.0, correct=5)
+    _record(connection, "a", 50.0, finished_at=2.0, correct=5)
+    _record(connection, "b", 30.0, finished_at=3.0, correct=3)
+    _record(connection, "a", 30.0, finished_at=4.0, correct=3)
+    _record(connection, "c", 100.0, finished_at=5.0, correct=8)
+    
+    assert _board(connection, 'correct') == ["b", "a", "c"]
+    _assert_ranks_match_board(connection, 'correct')
+
+
+def test_scopes_and_cohort_stats(connection):
+    _record(connection, "a", 40.0, finished_at=1.0)
+    _record(connection, "a", 80.0, finished_at=2.0)
+    _record(connection, "b", 60.0, finished_at=3.0, subtopic=("FLD_DSC", "", ""))  # Mixed quiz
+    
+    overall = leaderboard.get_cohort_stats(connection)
+    assert (overall.attempts, overall.learners, overall.mean) == (3, 2, 60.0)
+    assert overall.percentiles[50] == 60.0
+    subtopic = leaderboard.get_cohort_stats(connection, SCOPE)
+    assert (subtopic.attempts, subtopic.learners, subtopic.maximum) == (2, 1, 80.0)
+    assert leaderboard.get_scopes(connection) == [(SCOPE, 2)]
+    assert leaderboard.get_learner_rank(connection, "b", SCOPE) is None
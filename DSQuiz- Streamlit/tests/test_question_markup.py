@@ -0,0 +1,40 @@
+import dataclasses
+
+from models import Question, QuestionDifficulty, ShuffledQuestion
+from question_markup import QuestionMarkupCache
+
+
+def _question(text="What is 1 + 1?"):
+    return Question(id="Q1", question=text, options=("2", "3", "4"), correct_option_index=0, explanation="",
+                    option_explanations=("", "", ""), difficulty=QuestionDifficulty.EASY, tags=())
+
+
+class CollidingQuestion(Question):
+    """Every instance has the same hash, as two unlucky questions might"""
+    __slots__ = ()
+    
+    def __hash__(self):
+        return 0
+
+
+def test_equal_questions_share_markup():
+    cache = QuestionMarkupCache()
+    first = cache.get(_question())
+    assert cache.get(_question()) is first
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_permutation_changes_labels():
+    cache = QuestionMarkupCache()
+    shuffled = cache.get(ShuffledQuestion(_question(), (2, 0, 1)))
+    assert shuffled.option_labels == ("A. 4", "B. 2", "C. 3")
+    assert cache.get(_question()).option_labels == ("A. 2", "B. 3", "C. 4")
+
+
+def test_edited_question_with_same_id_and_hash():
+    cache = QuestionMarkupCache()
+    original = CollidingQuestion(*dataclasses.astuple(_question()))
+    edited = CollidingQuestion(*dataclasses.astuple(_question("What is 2 + 2?")))
+    assert hash(original) == hash(edited)
+    assert cache.get(original).heading == "### What is 1 + 1?"
+    assert cache.get(edited).heading == "### What is 2 + 2?"
@@ -0,0 +1,61 @@
+import threading
+
+import numpy as np
+
+from models import Question, QuestionDifficulty
+from question_selector import DEFAULT_DISCRIMINATION, DIFFICULTY_PRIOR, ItemStats
+
+
+def _question(difficulty=QuestionDifficulty.MEDIUM):
+    return Question(id="Q", question="?", options=("a", "b"), correct_option_index=0, explanation="",
+                    option_explanations=("", ""), difficulty=difficulty, tags=())
+
+
+def test_unknown_items_use_label_prior():
+    stats = ItemStats()
+    questions = [_question(QuestionDifficulty.EASY), _question(QuestionDifficulty.HARD)]
+    a, b = stats.parameters(questions, [("a.json", 0), ("a.json", 1)])
+    assert a.tolist() == [DEFAULT_DISCRIMINATION] * 2
+    assert b.tolist() == [DIFFICULTY_PRIOR[QuestionDifficulty.EASY], DIFFICULTY_PRIOR[QuestionDifficulty.HARD]]
+
+
+def test_wrong_answers_raise_difficulty():
+    stats = ItemStats()
+    keys = [("a.json", 0)] * 20 + [("a.json", 1)] * 20
+    is_correct = np.array([False] * 20 + [True] * 20)
+    stats.update(keys, is_correct, np.full(40, 50.0))
+    _, b = stats.parameters([_question(), _question()], [("a.json", 0), ("a.json", 1)])
+    assert b[0] > 0 > b[1]
+
+
+def test_parameters_while_updating():
+    stats = ItemStats()
+    questions = [_question() for _ in range(200)]
+    keys = [("a.json", i) for i in range(200)]
+    rng = np.random.default_rng(0)
+    errors = []
+    done = threading.Event()
+    
+    def read():
+        try:
+            while not done.is_set():
+                a, b = stats.parameters(questions, keys)
+                assert np.isfinite(a).all() and np.isfinite(b).all()
+        except Exception as error:  # Reported from the main thread
+            errors.append(error)
+    
+    readers = [threading.Thread(target=read) for _ in range(2)]
+    for reader in readers:
+        reader.start()
+    try:
+        # Every update adds a new item, so the index grows while readers use it
+        for i in range(200):
+            batch = [keys[i]] + [keys[j] for j in rng.integers(0, i + 1, size=5)]
+            stats.update(batch, rng.random(len(batch)) < 0.5, rng.random(len(batch)) * 100)
+    finally:
+        done.set()
+        for reader in readers:
+            reader.join()
+    assert errors == []
+    assert len(stats.current.index) == 200
+    assert stats.current.answers.sum() == 200 * 6
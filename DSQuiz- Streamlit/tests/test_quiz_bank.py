@@ -0,0 +1,60 @@
+import os
+
+import pytest
+
+from quiz_bank import QuizBank, compile_bank, is_bank_stale, open_bank
+from quiz_schema import load_quiz_file
+
+
+def _filenames(data_dir):
+    return sorted(os.listdir(data_dir))
+
+
+@pytest.fixture
+def bank(data_dir, tmp_path):
+    path = compile_bank(data_dir, _filenames(data_dir), str(tmp_path / "bank.bin"))
+    bank = QuizBank(path)
+    yield bank
+    bank.close()
+
+
+def test_load_question_roundtrip(data_dir, bank):
+    for filename in _filenames(data_dir):
+        expected = load_quiz_file(os.path.join(data_dir, filename)).questions
+        assert bank.entries[filename]['totalQuestions'] == len(expected)
+        for index, question in enumerate(expected):
+            assert bank.load_question(filename, index) == question
+
+
+def test_load_questions_roundtrip(data_dir, bank):
+    for filename in _filenames(data_dir):
+        assert bank.load_questions(filename) == list(load_quiz_file(os.path.join(data_dir, filename)).questions)
+
+
+def test_load_question_out_of_range(data_dir, bank):
+    filename = _filenames(data_dir)[0]
+    assert bank.load_question(filename, -1) is None
+    assert bank.load_question(filename, bank.entries[filename]['totalQuestions']) is None
+    assert bank.load_question("missing.json", 0) is None
+
+
+def test_touch_is_not_stale(data_dir, tmp_path):
+    bank_path = str(tmp_path / "bank.bin")
+    compile_bank(data_dir, _filenames(data_dir), bank_path)
+    touched = os.path.join(data_dir, _filenames(data_dir)[0])
+    os.utime(touched, ns=(1_000_000_000, 1_000_000_000))
+    assert not is_bank_stale(data_dir, _filenames(data_dir), bank_path)
+    
+    # open_bank records the new mtime, so the next check needs no hashing
+    open_bank(data_dir, _filenames(data_dir), bank_path).close()
+    reopened = QuizBank(bank_path)
+    assert reopened.sources[_filenames(data_dir)[0]]['mtime_ns'] == 1_000_000_000
+    reopened.close()
+
+
+def test_edit_is_stale(data_dir, tmp_path):
+    bank_path = str(tmp_path / "bank.bin")
+    compile_bank(data_dir, _filenames(data_dir), bank_path)
+    with open(os.path.join(data_dir, _filenames(data_dir)[0]), 'ab') as file:
+        file.write(b"\n")
+    assert is_bank_stale(data_dir, _filenames(data_dir), bank_path)
@@ -0,0 +1,128 @@
+import json
+import os
+import random
+import shutil
+
+import pytest
+
+from quiz_repository import _allocate
+
+
+def _names(data_dir):
+    return sorted(name for name in os.listdir(data_dir) if not name.startswith('.'))
+
+
+def _edit_first_question(data_dir, name, text):
+    path = os.path.join(data_dir, name)
+    with open(path, encoding='utf-8') as file:
+        data = json.load(file)
+    data['questions'][0]['question'] = text
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(data, file)
+
+
+def test_edit_swaps_snapshot_and_keeps_untouched_subtopics(data_dir, repository):
+    edited, untouched = _names(data_dir)[:2]
+    old_edited = repository.get_subtopic_by_file(edited)
+    old_questions = repository.get_subtopic_questions(old_edited)
+    untouched_questions = repository.get_subtopic_questions(repository.get_subtopic_by_file(untouched))
+    
+    _edit_first_question(data_dir, edited, "An edited question?")
+    assert repository.refresh()
+    assert repository.version == 2
+    
+    subtopic = repository.get_subtopic_by_file(edited)
+    assert not repository.is_subtopic_loaded(subtopic)
+    assert repository.get_subtopic_questions(subtopic)[0].question == "An edited question?"
+    # Sessions holding the previous questions keep them
+    assert old_questions[0].question != "An edited question?"
+    
+    kept = repository.get_subtopic_by_file(untouched)
+    assert repository.is_subtopic_loaded(kept)
+    assert repository.get_subtopic_questions(kept) is untouched_questions
+
+
+def test_added_and_deleted_files(data_dir, repository, spare_quiz_file):
+    deleted = _names(data_dir)[0]
+    added = os.path.basename(spare_quiz_file)
+    shutil.copy2(spare_quiz_file, os.path.join(data_dir, added))
+    os.remove(os.path.join(data_dir, deleted))
+    
+    assert repository.refresh()
+    assert repository.get_subtopic_by_file(deleted) is None
+    subtopic = repository.get_subtopic_by_file(added)
+    assert len(repository.get_subtopic_questions(subtopic)) == subtopic.total_questions
+    files = {s.file_name for f in repository.get_all_fields() for t in f.topics for s in t.subtopics}
+    assert files == set(_names(data_dir))
+
+
+def test_touch_with_same_content_is_ignored(data_dir, repository):
+    touched = _names(data_dir)[0]
+    subtopic = repository.get_subtopic_by_file(touched)
+    repository.get_subtopic_questions(subtopic)
+    os.utime(os.path.join(data_dir, touched), ns=(1_000_000_000, 1_000_000_000))
+    
+    assert not repository.refresh()
+    assert repository.version == 1
+    assert repository.get_subtopic_by_file(touched) is subtopic
+    assert repository.is_subtopic_loaded(subtopic)
+    # The new mtime is recorded, so the next refresh does not hash the file again
+    assert repository._get_snapshot().entries[touched]['mtime_ns'] == 1_000_000_000
+    assert not repository.refresh()
+
+
+def test_invalid_edit_keeps_previous_version(data_dir, repository):
+    broken = _names(data_dir)[0]
+    questions = list(repository.get_subtopic_questions(repository.get_subtopic_by_file(broken)))
+    with open(os.path.join(data_dir, broken), 'w', encoding='utf-8') as file:
+        file.write('{"questions": [')
+    
+    assert not repository.refresh()
+    assert broken in repository.load_errors
+    assert list(repository.get_subtopic_questions(repository.get_subtopic_by_file(broken))) == questions
+
+
+@pytest.mark.parametrize("capacities, weights, count", [
+    ([10, 10, 10], [1, 1, 1], 10),
+    ([2, 50, 3], [5, 1, 5], 20),
+    ([4, 0, 6], [1, 1, 0], 50),
+])
+def test_allocation_sums_to_limit_within_capacity(capacities, weights, count):
+    for seed in range(20):
+        allocation = _allocate(capacities, weights, count, random.Random(seed))
+        usable = sum(c for c, w in zip(capacities, weights) if w > 0)
+        assert sum(allocation) == min(count, usable)
+        assert all(0 <= k <= c for k, c in zip(allocation, capacities))
+        assert all(k == 0 for k, w in zip(allocation, weights) if w == 0)
+
+
+def _all_subtopics(repository):
+    return [s for f in repository.get_all_fields() for t in f.topics for s in t.subtopics]
+
+
+def test_mixed_questions_respect_limit_and_capacity(repository):
+    subtopics = _all_subtopics(repository)
+    total = sum(s.total_questions for s in subtopics)
+    for count in (1, 25, total, total + 10):
+        picked = repository.get_mixed_questions(subtopics, count, seed=count)
+        assert len(picked) == min(count, total)
+        keys = [(subtopic.file_name, question.base.id) for question, subtopic in picked]
+        assert len(set(keys)) == len(keys)
+        for subtopic in subtopics:
+            assert sum(s is subtopic for _, s in picked) <= subtopic.total_questions
+
+
+def test_mixed_questions_are_reproducible(repository):
+    subtopics = _all_subtopics(repository)
+    
+    def draw(seed):
+        return [(s.file_name, q.id, q.permutation) for q, s in repository.get_mixed_questions(subtopics, 30, seed=seed)]
+    
+    assert draw(7) == draw(7)
+    assert draw(7) != draw(8)
+
+
+def test_mixed_questions_follow_weights(repository):
+    subtopics = _all_subtopics(repository)
+    picked = repository.get_mixed_questions(subtopics, 20, seed=1, weights=[1, 0, 0])
+    assert {s.file_name for _, s in picked} == {subtopics[0].file_name}
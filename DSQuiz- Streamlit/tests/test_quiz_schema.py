@@ -0,0 +1,24 @@
+import os
+
+import pytest
+
+from quiz_schema import QuizFileError, decode_quiz_file, load_quiz_files
+
+
+def test_load_quiz_files_reports_invalid_files(data_dir):
+    names = sorted(os.listdir(data_dir))
+    with open(os.path.join(data_dir, "broken.json"), 'w', encoding='utf-8') as file:
+        file.write('{"fieldId": "F"}')
+    
+    quiz_files, skipped = load_quiz_files(data_dir)
+    assert [quiz_file.file_name for quiz_file in quiz_files] == names
+    assert [error.file_name for error in skipped] == ["broken.json"]
+    assert "fieldName: missing" in skipped[0].errors
+
+
+def test_decode_reports_every_problem():
+    with pytest.raises(QuizFileError) as raised:
+        decode_quiz_file(b'{"fieldId": "F", "questions": []}', "bad.json")
+    assert raised.value.file_name == "bad.json"
+    assert "questions: must be a non-empty list" in raised.value.errors
+    assert len(raised.value.errors) > 1
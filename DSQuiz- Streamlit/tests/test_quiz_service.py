@@ -0,0 +1,153 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import quiz_service
+from quiz_service import QuizService
+
+
+class Client:
+    """One keep-alive HTTP/1.1 connection to a QuizService on an ephemeral port"""
+    
+    def __init__(self, service: QuizService):
+        self.service = service
+    
+    async def __aenter__(self):
+        self.server = await asyncio.start_server(
+            lambda reader, writer: quiz_service._serve_connection(self.service, reader, writer), "127.0.0.1", 0
+        )
+        port = self.server.sockets[0].getsockname()[1]
+        self.reader, self.writer = await asyncio.open_connection("127.0.0.1", port)
+        return self
+    
+    async def __aexit__(self, *exc):
+        self.writer.close()
+        await self.writer.wait_closed()
+        self.server.close()
+        await self.server.wait_closed()
+    
+    async def request(self, method, path, payload=None, headers=None):
+        body = json.dumps(payload).encode() if payload is not None else b""
+        head = [f"{method} {path} HTTP/1.1", "Host: test", f"Content-Length: {len(body)}"]
+        head += [f"{name}: {value}" for name, value in (headers or {}).items()]
+        self.writer.write(("\r\n".join(head) + "\r\n\r\n").encode() + body)
+        status = int((await self.reader.readline()).split()[1])
+        response_headers = {}
+        while (line := await self.reader.readline()) != b"\r\n":
+            name, _, value = line.decode().partition(":")
+            response_headers[name.strip().lower()] = value.strip()
+        length = int(response_headers.get("content-length", 0))
+        data = json.loads(await self.reader.readexactly(length)) if length else None
+        return status, response_headers, data
+
+
+@pytest.fixture
+def service(repository):
+    return QuizService(repository)
+
+
+def _run(service, scenario):
+    async def main():
+        async with Client(service) as client:
+            await scenario(client)
+    asyncio.run(main())
+
+
+def _first_topic(repository):
+    field = repository.get_all_fields()[0]
+    return field, field.topics[0]
+
+
+def test_fields_etag_gets_not_modified(service):
+    async def scenario(client):
+        status, headers, data = await client.request("GET", "/fields")
+        assert status == 200 and data["fields"]
+        etag = headers["etag"]
+        status, headers, data = await client.request("GET", "/fields", headers={"If-None-Match": etag})
+        assert (status, headers["etag"], data) == (304, etag, None)
+        status, _, data = await client.request("GET", "/fields", headers={"If-None-Match": '"other"'})
+        assert status == 200 and data["fields"]
+    _run(service, scenario)
+
+
+def test_question_etag(repository, service):
+    field, topic = _first_topic(repository)
+    
+    async def scenario(client):
+        status, _, quiz = await client.request("POST", "/quizzes", {
+            "fieldId": field.id, "topicId": topic.id, "subtopicId": topic.subtopics[0].id, "count": 3, "seed": 1})
+        assert status == 201
+        path = f"/quizzes/{quiz['quizId']}/questions/0"
+        _, headers, question = await client.request("GET", path)
+        assert question == quiz["question"] and "correctOptionIndex" not in question
+        status, _, _ = await client.request("GET", path, headers={"If-None-Match": headers["etag"]})
+        assert status == 304
+        status, _, _ = await client.request("GET", f"/quizzes/{quiz['quizId']}/questions/3")
+        assert status == 404
+    _run(service, scenario)
+
+
+def test_fields_etag_changes_with_the_bank(data_dir, repository, service):
+    subtopic = _first_topic(repository)[1].subtopics[0]
+    path = os.path.join(data_dir, subtopic.file_name)
+    
+    async def scenario(client):
+        _, headers, _ = await client.request("GET", "/fields")
+        etag = headers["etag"]
+        
+        with open(path, encoding="utf-8") as file:
+            data = json.load(file)
+        data["subtopicName"] = "Renamed"
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(data, file)
+        assert repository.refresh()
+        status, headers, fields = await client.request("GET", "/fields", headers={"If-None-Match": etag})
+        assert status == 200 and headers["etag"] != etag
+        assert fields["version"] == 2 and "Renamed" in json.dumps(fields)
+    _run(service, scenario)
+
+
+def test_mixed_quiz(repository, service):
+    field, topic = _first_topic(repository)
+    ids = [subtopic.id for subtopic in topic.subtopics]
+    
+    async def scenario(client):
+        status, _, quiz = await client.request("POST", "/quizzes", {
+            "fieldId": field.id, "topicId": topic.id, "subtopicIds": ids, "count": 12, "seed": 5})
+        assert status == 201
+        assert quiz["total"] == 12 and quiz["question"]["subtopicId"] in ids
+        subtopics = {(await client.request("GET", f"/quizzes/{quiz['quizId']}/questions/{i}"))[2]["subtopicId"]
+                     for i in range(12)}
+        assert subtopics <= set(ids)
+    _run(service, scenario)
+
+
+@pytest.mark.parametrize("change, status", [
+    ({"subtopicIds": []}, 400),
+    ({"subtopicIds": "STC_ABC"}, 400),
+    ({"subtopicIds": ["STC_ABC", 7]}, 400),
+    ({"subtopicIds": ["STC_UNKNOWN"]}, 404),
+    ({"count": 0}, 400),
+    ({"count": True}, 400),
+    ({"seed": "1"}, 400),
+    ({"topicId": None}, 400),
+])
+def test_invalid_mixed_quiz_requests(repository, service, change, status):
+    field, topic = _first_topic(repository)
+    payload = {"fieldId": field.id, "topicId": topic.id, "subtopicIds": [topic.subtopics[0].id], "count": 5}
+    payload.update(change)
+    
+    async def scenario(client):
+        response_status, _, data = await client.request("POST", "/quizzes", payload)
+        assert response_status == status and data["error"]
+    _run(service, scenario)
+
+
+def test_service_does_not_import_streamlit():
+    script = "import sys, quiz_service, content_packs, benchmarks; assert 'streamlit' not in sys.modules"
+    app_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    subprocess.run([sys.executable, "-c", script], cwd=app_dir, check=True)
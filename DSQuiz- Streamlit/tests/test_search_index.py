@@ -0,0 +1,53 @@
+from models import Question, QuestionDifficulty
+from search_index import FileDocuments, SearchFilters, SearchIndex, tokenize
+
+
+def _question(question_id, text, difficulty=QuestionDifficulty.EASY, tags=()):
+    return Question(id=question_id, question=text, options=("a", "b"), correct_option_index=0, explanation="",
+                    option_explanations=("", ""), difficulty=difficulty, tags=tags)
+
+
+def _index():
+    regression = FileDocuments.from_questions("reg.json", "FLD_DSC", "TPC_MLG", "STC_LRG", [
+        _question("R1", "What does gradient descent minimize?", tags=("Gradient_Descent",)),
+        _question("R2", "Which loss does linear regression use?", QuestionDifficulty.HARD, ("Loss Functions",)),
+    ])
+    trees = FileDocuments.from_questions("trees.json", "FLD_DSC", "TPC_MLG", "STC_DTC", [
+        _question("T1", "How are decision trees pruned?", QuestionDifficulty.HARD, ("gradient-descent",)),
+    ])
+    return SearchIndex([regression, trees], version=1)
+
+
+def _ids(hits):
+    return [hit.question_id for hit in hits]
+
+
+def test_tokenize_drops_stopwords_and_folds_plurals():
+    assert tokenize("What are the Decision Trees' properties?") == ["decision", "tree", "property"]
+
+
+def test_query_ranks_matches():
+    hits = _index().search("gradient descent")
+    assert _ids(hits) == ["R1"]
+    assert hits[0].file_name == "reg.json" and hits[0].index == 0 and hits[0].score > 0
+
+
+def test_empty_query_lists_filtered_questions():
+    index = _index()
+    assert _ids(index.search("")) == ["R1", "R2", "T1"]
+    assert _ids(index.search("  ", SearchFilters(difficulties=("HARD",)))) == ["R2", "T1"]
+    assert _ids(index.search("", limit=1)) == ["R1"]
+
+
+def test_unknown_or_stopword_query_matches_nothing():
+    index = _index()
+    assert index.search("quantum") == []
+    assert index.search("what is the") == []
+
+
+def test_tag_filters_normalize_and_combine():
+    index = _index()
+    assert _ids(index.search("", SearchFilters(tags=("gradient descent",)))) == ["R1", "T1"]
+    assert _ids(index.search("", SearchFilters(tags=("Gradient-Descent",), subtopic_id="STC_DTC"))) == ["T1"]
+    assert _ids(index.search("pruned", SearchFilters(tags=("loss functions",)))) == []
+    assert index.tags[0] == "gradient descent"
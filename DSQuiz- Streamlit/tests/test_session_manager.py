@@ -0,0 +1,96 @@
+import os
+
+import pytest
+
+import session_manager
+from models import QuizSession, new_answer_array
+from session_manager import LearnerSession, SessionManager
+
+
+@pytest.fixture
+def shared_repository(repository, monkeypatch):
+    monkeypatch.setattr(session_manager, "get_shared_repository", lambda: repository)
+    return repository
+
+
+def _subtopics(repository):
+    return [s for f in repository.get_all_fields() for t in f.topics for s in t.subtopics]
+
+
+def _session(quiz):
+    session = LearnerSession()
+    session.current_quiz = quiz
+    attempt = session.answer_log.start_attempt()
+    for position in range(2):
+        question = quiz.questions[position]
+        is_correct = quiz.answer_question(position % 2)
+        session.answer_log.append(attempt, position, question, "S", "Subtopic", position % 2, is_correct, 1.0)
+        quiz.next_question()
+    return session, attempt
+
+
+def _subtopic_quiz(repository):
+    subtopic = _subtopics(repository)[0]
+    questions = repository.get_questions_for_subtopic(subtopic.field_id, subtopic.topic_id, subtopic.id,
+                                                      limit=5, seed=3)
+    return QuizSession(field_id=subtopic.field_id, topic_id=subtopic.topic_id, subtopic_id=subtopic.id,
+                       questions=questions, current_question_index=0, user_answers=new_answer_array(5),
+                       correct_answers=0, total_questions=5, is_completed=False, seed=3)
+
+
+def _assert_same_quiz(restored, quiz):
+    assert restored.questions == quiz.questions
+    assert [q.permutation for q in restored.questions] == [q.permutation for q in quiz.questions]
+    assert restored.user_answers == quiz.user_answers
+    assert (restored.current_question_index, restored.correct_answers) == (quiz.current_question_index,
+                                                                           quiz.correct_answers)
+
+
+def test_compact_and_restore_subtopic_quiz(shared_repository):
+    quiz = _subtopic_quiz(shared_repository)
+    session, attempt = _session(quiz)
+    summary = session.answer_log.attempt_summary(attempt)
+    
+    assert session.compact() > 0
+    assert session.is_compacted
+    _assert_same_quiz(session.current_quiz, quiz)
+    assert not session.is_compacted and not session.restore_failed
+    assert session.answer_log.attempt_summary(attempt) == summary
+
+
+def test_compact_and_restore_mixed_quiz(shared_repository):
+    picked = shared_repository.get_mixed_questions(_subtopics(shared_repository), 6, seed=1)
+    quiz = QuizSession(field_id="FLD_DSC", topic_id="", subtopic_id="", questions=[q for q, _ in picked],
+                       current_question_index=0, user_answers=new_answer_array(6), correct_answers=0,
+                       total_questions=6, is_completed=False, seed=1, question_subtopics=[s for _, s in picked])
+    session, _ = _session(quiz)
+    
+    session.compact()
+    restored = session.current_quiz
+    _assert_same_quiz(restored, quiz)
+    assert [s.file_name for s in restored.question_subtopics] == [s.file_name for _, s in picked]
+
+
+def test_restore_after_file_removed(data_dir, shared_repository):
+    quiz = _subtopic_quiz(shared_repository)
+    session, attempt = _session(quiz)
+    session.compact()
+    
+    os.remove(os.path.join(data_dir, shared_repository.get_subtopic_by_id(
+        quiz.field_id, quiz.topic_id, quiz.subtopic_id).file_name))
+    shared_repository.refresh()
+    assert session.current_quiz is None
+    assert session.restore_failed
+    assert session.answer_log.attempt_summary(attempt)['answered'] == 2
+
+
+def test_sweep_compacts_idle_sessions_only(shared_repository):
+    manager = SessionManager(idle_seconds=60, sweep_interval=None)
+    idle, _ = _session(_subtopic_quiz(shared_repository))
+    active, _ = _session(_subtopic_quiz(shared_repository))
+    for session in (idle, active):
+        manager.register(session)
+    idle.last_active -= 120
+    
+    assert manager.sweep() == 1
+    assert idle.is_compacted and not active.is_compacted